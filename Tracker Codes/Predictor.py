@@ -1,5 +1,52 @@
-import random
-import numpy as np
+from __future__ import annotations  # Annotations such as np.ndarray must not import NumPy at startup
+
+import importlib
+import json
+import marshal
+import math
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, replace
+from functools import cached_property, lru_cache
+
+_IMPORT_STARTED = time.perf_counter()
+
+# --- FAST STARTUP ---
+# Listing species or validating profiles needs neither NumPy nor the profile data, yet importing
+# NumPy alone takes most of the startup time of a short CLI call or batch worker. `np` therefore
+# starts as a stand-in that imports NumPy on first attribute access and then replaces itself in
+# this module, so scoring code pays one extra lookup once. STARTUP_METRICS records where startup
+# time went (see startup_metrics()). For the quickest CLI start, run `python -m Predictor ...`:
+# unlike `python Predictor.py`, it reuses the cached bytecode instead of recompiling this file.
+STARTUP_METRICS = {}
+
+class _LazyModule:
+    """Placeholder for a heavy module bound to `binding` in this module's globals; see FAST STARTUP."""
+
+    def __init__(self, name, binding):
+        self._name = name
+        self._binding = binding
+
+    def __getattr__(self, attribute):
+        started = time.perf_counter()
+        module = importlib.import_module(self._name)
+        if globals().get(self._binding) is self:
+            globals()[self._binding] = module
+            STARTUP_METRICS[f"{self._name}_import_seconds"] = time.perf_counter() - started
+        return getattr(module, attribute)
+
+    def __repr__(self):
+        return f"<lazy module {self._name!r}>"
+
+np = _LazyModule("numpy", "np")
+
+def startup_metrics():
+    """Seconds spent importing this module, loading the profiles and importing NumPy (so far)."""
+    return {"numpy_loaded": not isinstance(np, _LazyModule), **STARTUP_METRICS}
 
 # --- 1. CONFIGURATION ---
 GRID_SIZE = 20        # 20x20 horizontal cells
@@ -11,404 +58,269 @@ LOCAL_GRID_DEGREE_SPAN = 2.0
 HALF_SPAN = LOCAL_GRID_DEGREE_SPAN / 2.0
 DEGREES_PER_CELL = LOCAL_GRID_DEGREE_SPAN / GRID_SIZE
 
+# Labels for the default 3-layer water column
+DEPTH_LABELS = ["Shallow (0-20m)", "Mid-Water (20-150m)", "Deep/Twilight (>150m)"]
+
+# Depth range in meters of each default layer, [top, bottom]; None marks the open-ended deepest bin
+DEFAULT_DEPTH_BINS = [[0, 20], [20, 150], [150, None]]
+
+def make_depth_bins(max_depth, resolution):
+    """
+    Depth bins `resolution` meters thick from the surface down to `max_depth` meters, plus an
+    open-ended bin below it (e.g., make_depth_bins(500, 10) gives 51 bins).
+    """
+    if resolution <= 0 or max_depth <= 0:
+        raise ValueError(f"Depth bins need a positive resolution and maximum depth, got {resolution} and {max_depth}.")
+    edges = np.append(np.arange(0.0, max_depth, resolution), float(max_depth))
+    return [[float(top), float(bottom)] for top, bottom in zip(edges[:-1], edges[1:])] + [[float(max_depth), None]]
+
+def check_depth_bins(depth_bins):
+    """Checks that depth bins are contiguous [top, bottom] ranges going down; only the last may be open-ended."""
+    if not depth_bins:
+        raise ValueError("At least 1 depth bin is needed.")
+    for i, depth_bin in enumerate(depth_bins):
+        top, bottom = depth_bin
+        if bottom is None and i != len(depth_bins) - 1:
+            raise ValueError(f"Only the deepest depth bin can be open-ended, bin {i} is not.")
+        if bottom is not None and not bottom > top:
+            raise ValueError(f"Depth bin {i} must end below its top, got [{top}, {bottom}].")
+        if i and top != depth_bins[i - 1][1]:
+            raise ValueError(f"Depth bin {i} starts at {top} m, expected {depth_bins[i - 1][1]} m.")
+
+def _bin_centers(depth_bins):
+    centers = []
+    for i, (top, bottom) in enumerate(depth_bins):
+        if bottom is None:
+            above = depth_bins[i - 1][1] - depth_bins[i - 1][0] if i else 2.0 * max(top, 1.0)
+            bottom = top + above
+        centers.append((top + bottom) / 2.0)
+    return centers
+
+def depth_bin_centers(depth_bins):
+    """
+    Representative depth (meters) of each bin: its middle. An open-ended bin is placed half the
+    thickness of the bin above it below its top (215 m for the default Deep bin).
+    """
+    return np.array(_bin_centers(depth_bins), dtype=float)
+
+# Depths at which the 3 values of a profile's depth_preference apply (10, 85 and 215 m)
+DEPTH_PREFERENCE_DEPTHS = tuple(_bin_centers(DEFAULT_DEPTH_BINS))
+
+_DEFAULT_DEPTH_BIN_TUPLES = tuple(tuple(depth_bin) for depth_bin in DEFAULT_DEPTH_BINS)  # The named layers
+
+@dataclass(frozen=True)
+class GridConfig:
+    """
+    Resolution of one local prediction grid: `size` x `size` horizontal cells and `depth_layers`
+    vertical layers covering a `degree_span` x `degree_span` area centered on the shark.
+    The sectors and the center cell are derived from these values, so coarse and fine grids
+    can be used side by side in the same process.
+    """
+    size: int = GRID_SIZE
+    depth_layers: int = DEPTH_LAYERS
+    degree_span: float = LOCAL_GRID_DEGREE_SPAN
+    depth_bins: tuple = None  # Optional [top, bottom] meters of every layer (see with_depth_bins)
+
+    def __post_init__(self):
+        if self.size < 2:
+            raise ValueError(f"Grid size must be at least 2 cells, got {self.size}.")
+        if self.depth_layers < 1:
+            raise ValueError(f"Grid needs at least 1 depth layer, got {self.depth_layers}.")
+        if self.degree_span <= 0:
+            raise ValueError(f"Grid degree span must be positive, got {self.degree_span}.")
+        if self.depth_bins is not None:
+            check_depth_bins(self.depth_bins)
+            if len(self.depth_bins) != self.depth_layers:
+                raise ValueError(f"Grid has {self.depth_layers} depth layers but {len(self.depth_bins)} depth bins.")
+            # Stored as tuples so the (frozen) config stays hashable
+            object.__setattr__(self, "depth_bins", tuple(tuple(depth_bin) for depth_bin in self.depth_bins))
+
+    def with_depth_bins(self, depth_bins):
+        """The same grid with one depth layer per bin, e.g. grid.with_depth_bins(make_depth_bins(500, 10))."""
+        return replace(self, depth_layers=len(depth_bins), depth_bins=depth_bins)
+
+    @property
+    def shape(self):
+        return (self.size, self.size, self.depth_layers)
+
+    @property
+    def half_span(self):
+        return self.degree_span / 2.0
+
+    @property
+    def degrees_per_cell(self):
+        return self.degree_span / self.size
+
+    @property
+    def center_index(self):
+        """Row/Col index of the cell holding the shark's current position (9 on the 20x20 grid)."""
+        return (self.size - 1) // 2
+
+    @cached_property
+    def sectors(self):
+        """The 4 major directional sectors (halves of the grid). Slicing is [Row, Col]"""
+        half = self.size // 2
+        return {
+            "North": (slice(0, half), slice(0, self.size)),          # Top rows (highest Lat half)
+            "South": (slice(half, self.size), slice(0, self.size)),  # Bottom rows (lowest Lat half)
+            "East": (slice(0, self.size), slice(half, self.size)),   # Right cols (highest Lon half)
+            "West": (slice(0, self.size), slice(0, half)),           # Left cols (lowest Lon half)
+        }
+
+    def depth_label(self, layer):
+        """Human-readable name of a depth layer."""
+        if self.depth_bins is not None and self.depth_bins != _DEFAULT_DEPTH_BIN_TUPLES:
+            top, bottom = self.depth_bins[layer]
+            return f"{top:g}-{bottom:g}m" if bottom is not None else f">{top:g}m"
+        if self.depth_layers == len(DEPTH_LABELS):
+            return DEPTH_LABELS[layer]
+        return f"Layer {layer + 1} of {self.depth_layers}"
+
+DEFAULT_GRID = GridConfig()
+
+# --- INSTRUMENTATION ---
+# Opt-in per-stage timings, counters and trace events. While disabled, stage() hands back one
+# shared no-op context manager and count() returns at once (a few hundred nanoseconds per
+# stage), so it can stay wired in everywhere.
+MAX_TRACE_EVENTS = 100_000
+
+class Instrumentation:
+    """Per-stage timings, counters (cells scored, bytes allocated) and Chrome trace events."""
+
+    def __init__(self):
+        self.enabled = False
+        self.trace = False
+        self.reset()
+
+    def reset(self):
+        self.stages = {}  # name -> [calls, total_ns, max_ns]
+        self.counters = {}
+        self.events = deque(maxlen=MAX_TRACE_EVENTS)
+
+    @contextmanager
+    def _timed_stage(self, name):
+        started = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter_ns() - started
+            stats = self.stages.setdefault(name, [0, 0, 0])
+            stats[0] += 1
+            stats[1] += elapsed
+            stats[2] = max(stats[2], elapsed)
+            if self.trace:
+                # Chrome trace "complete" event (chrome://tracing, Perfetto); times in microseconds
+                self.events.append({"name": name, "ph": "X", "ts": started / 1000, "dur": elapsed / 1000,
+                                    "pid": 0, "tid": threading.get_ident()})
+
+    def stage(self, name):
+        """Context manager timing one stage (no-op while disabled)."""
+        if not self.enabled:
+            return _NO_STAGE
+        return self._timed_stage(name)
+
+    def count(self, name, amount=1):
+        """Adds `amount` to a counter (no-op while disabled)."""
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def report(self):
+        """The collected stage timings (seconds) and counters as a plain dict."""
+        return {
+            "stages": {
+                name: {"calls": calls, "total_seconds": total / 1e9, "mean_seconds": total / calls / 1e9,
+                       "max_seconds": longest / 1e9}
+                for name, (calls, total, longest) in self.stages.items()
+            },
+            "counters": dict(self.counters),
+        }
+
+    def write_trace(self, path):
+        """Writes the recorded trace events as a Chrome trace JSON file."""
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump({"traceEvents": list(self.events), "displayTimeUnit": "ms"}, handle)
+
+_NO_STAGE = nullcontext()
+INSTRUMENTATION = Instrumentation()
+
+@contextmanager
+def instrumented(trace=False, reset=True):
+    """Enables instrumentation for a block and yields it; the previous state is restored afterwards."""
+    previous = (INSTRUMENTATION.enabled, INSTRUMENTATION.trace)
+    if reset:
+        INSTRUMENTATION.reset()
+    INSTRUMENTATION.enabled, INSTRUMENTATION.trace = True, trace
+    try:
+        yield INSTRUMENTATION
+    finally:
+        INSTRUMENTATION.enabled, INSTRUMENTATION.trace = previous
+
 # --- 2. SHARK HABITAT PROFILES ---
 # Weights are used to prioritize environmental factors (0.0 to 1.0).
 # Preference by Depth Layer: [Shallow (0-20m), Mid-Water (20-150m), Deep/Twilight (>150m)]
-SHARK_PROFILES = {
-    # Existing Species (Core)
-    "Great white shark": {
-        "description": "Pelagic deep-forager. Uses warm eddies (SWOT) as thermal conduits to access cold, deep prey (Twilight Zone).",
-        "preferences": {
-            "depth_preference": [0.1, 0.4, 1.0], 
-            "is_coastal": 0.1,    
-            "phytoplankton": 0.4, 
-            "eddy_strength": 1.0  # HIGH: Essential for deep foraging
-        }
-    },
-    "Tiger shark": {
-        "description": "Coastal-pelagic generalist. Favors highly productive, warmer, shallow regions (PACE/MODIS).",
-        "preferences": {
-            "depth_preference": [0.9, 0.6, 0.1], 
-            "is_coastal": 0.8,    
-            "phytoplankton": 0.9, 
-            "eddy_strength": 0.3  
-        }
-    },
-    "Bull shark": {
-        "description": "Euryhaline species. Strongest preference for shallow, coastal regions (low salinity areas/estuaries).",
-        "preferences": {
-            "depth_preference": [1.0, 0.2, 0.0], 
-            "is_coastal": 1.0,    # HIGHEST: Very strong coastal preference
-            "phytoplankton": 0.6, 
-            "eddy_strength": 0.1  
-        }
-    },
-    
-    # New Pelagic (Mako/Porbeagle)
-    "Shortfin mako shark": {
-        "description": "Fast pelagic predator. Migrates long distances, follows productive oceanic fronts.",
-        "preferences": {
-            "depth_preference": [0.3, 0.9, 0.5], 
-            "is_coastal": 0.2,    
-            "phytoplankton": 0.8, # Follows the food chain
-            "eddy_strength": 0.6  # Uses eddies to concentrate prey
-        }
-    },
-    "Longfin mako shark": {
-        "description": "Warm-water pelagic species, prefers deep offshore waters.",
-        "preferences": {
-            "depth_preference": [0.2, 0.7, 0.8], 
-            "is_coastal": 0.1,    
-            "phytoplankton": 0.7, 
-            "eddy_strength": 0.7  
-        }
-    },
-    "Porbeagle shark": {
-        "description": "Cold-temperate water species, often found near continental shelves and banks.",
-        "preferences": {
-            "depth_preference": [0.5, 0.8, 0.3], 
-            "is_coastal": 0.4,    
-            "phytoplankton": 0.7, 
-            "eddy_strength": 0.5  
-        }
-    },
-    "Salmon shark": {
-        "description": "North Pacific predator, follows salmon migrations, favors temperate surface waters.",
-        "preferences": {
-            "depth_preference": [0.8, 0.6, 0.1], 
-            "is_coastal": 0.5,    
-            "phytoplankton": 0.8, 
-            "eddy_strength": 0.4  
-        }
-    },
-
-    # New Filter Feeders
-    "Whale shark": {
-        "description": "Largest filter feeder, strictly planktonic. Strong preference for warm, highly productive surface waters.",
-        "preferences": {
-            "depth_preference": [1.0, 0.6, 0.0], # Surface feeder
-            "is_coastal": 0.3,    
-            "phytoplankton": 1.0, # CRITICAL FACTOR
-            "eddy_strength": 0.5  # Eddies concentrate plankton
-        }
-    },
-    "Basking shark": {
-        "description": "Cosmopolitan filter feeder, often near coastlines and upwelling zones.",
-        "preferences": {
-            "depth_preference": [1.0, 0.7, 0.1], 
-            "is_coastal": 0.6,    
-            "phytoplankton": 1.0, # CRITICAL FACTOR
-            "eddy_strength": 0.3  
-        }
-    },
-
-    # New Deep-Sea & Benthic
-    "Sharpnose sevengill shark (Gill Seer)": {
-        "description": "Deep-water scavenger and hunter, prefers continental slopes.",
-        "preferences": {
-            "depth_preference": [0.0, 0.3, 1.0], 
-            "is_coastal": 0.1,    
-            "phytoplankton": 0.1, 
-            "eddy_strength": 0.1  
-        }
-    },
-    "Bluntnose sixgill shark (The Deep Titan)": {
-        "description": "Largest deep-sea shark, prefers deep benthic habitats.",
-        "preferences": {
-            "depth_preference": [0.0, 0.1, 1.0], 
-            "is_coastal": 0.0,    
-            "phytoplankton": 0.0, 
-            "eddy_strength": 0.0  
-        }
-    },
-    "Broadnose sevengill shark (The Primeval Beast)": {
-        "description": "Coastal to shelf-break species, known for aggressive hunting.",
-        "preferences": {
-            "depth_preference": [0.4, 0.7, 0.5], 
-            "is_coastal": 0.7,    
-            "phytoplankton": 0.3, 
-            "eddy_strength": 0.2  
-        }
-    },
-    "Bigeyed sixgill shark (Ancient Watche_ Green Lantern)": {
-        "description": "Very deep water species, found on seamounts and mid-ocean ridges.",
-        "preferences": {
-            "depth_preference": [0.0, 0.0, 1.0], 
-            "is_coastal": 0.0,    
-            "phytoplankton": 0.0, 
-            "eddy_strength": 0.1  
-        }
-    },
-    "Greenland shark": {
-        "description": "Arctic predator. Extremely slow, favors deep, cold waters.",
-        "preferences": {
-            "depth_preference": [0.1, 0.3, 1.0], 
-            "is_coastal": 0.2,    
-            "phytoplankton": 0.1, 
-            "eddy_strength": 0.0  
-        }
-    },
-    "Velvet dogfish": {
-        "description": "Benthic species of the upper continental slope.",
-        "preferences": {
-            "depth_preference": [0.1, 0.5, 0.8], 
-            "is_coastal": 0.3,    
-            "phytoplankton": 0.1, 
-            "eddy_strength": 0.1  
-        }
-    },
-    "Bramble shark": {
-        "description": "Rare, sluggish deep-water species. Benthic, deep continental shelf/slope.",
-        "preferences": {
-            "depth_preference": [0.0, 0.4, 0.9], 
-            "is_coastal": 0.2,    
-            "phytoplankton": 0.0, 
-            "eddy_strength": 0.0  
-        }
-    },
-    "Centroscyllium species (like the Black dogfish)": {
-        "description": "Small, deep-water benthic sharks of the continental slope.",
-        "preferences": {
-            "depth_preference": [0.0, 0.2, 1.0], 
-            "is_coastal": 0.0,    
-            "phytoplankton": 0.0, 
-            "eddy_strength": 0.0  
-        }
-    },
-
-    # New Coastal & Benthic Generalists
-    "Spiny dogfish": {
-        "description": "Small, widespread coastal shark. Highly migratory along shelves.",
-        "preferences": {
-            "depth_preference": [0.8, 0.6, 0.2], 
-            "is_coastal": 0.8,    
-            "phytoplankton": 0.6, 
-            "eddy_strength": 0.2  
-        }
-    },
-    "Blue shark": {
-        "description": "Highly migratory oceanic species. Prefers cooler, productive surface waters.",
-        "preferences": {
-            "depth_preference": [0.7, 0.8, 0.4], 
-            "is_coastal": 0.2,    
-            "phytoplankton": 0.9, 
-            "eddy_strength": 0.8  
-        }
-    },
-    "Oceanic whitetip shark": {
-        "description": "Tropical/subtropical oceanic apex predator, often found around strong currents/eddies.",
-        "preferences": {
-            "depth_preference": [0.6, 0.9, 0.4], 
-            "is_coastal": 0.1,    
-            "phytoplankton": 0.7, 
-            "eddy_strength": 0.9  
-        }
-    },
-    "Blacktip reef shark": {
-        "description": "Small, shallow-water reef specialist. Strongly coastal and shallow.",
-        "preferences": {
-            "depth_preference": [1.0, 0.1, 0.0], 
-            "is_coastal": 1.0,    # Strictly coastal/reef
-            "phytoplankton": 0.7, 
-            "eddy_strength": 0.0  
-        }
-    },
-    "Leopard shark": {
-        "description": "Coastal, temperate bottom-dweller, found in bays and estuaries.",
-        "preferences": {
-            "depth_preference": [1.0, 0.3, 0.0], 
-            "is_coastal": 0.9,    
-            "phytoplankton": 0.6, 
-            "eddy_strength": 0.1  
-        }
-    },
-    "Nurse shark (cat shark)": {
-        "description": "Sluggish, nocturnal benthic species, strong preference for coral reefs and mangroves.",
-        "preferences": {
-            "depth_preference": [1.0, 0.1, 0.0], 
-            "is_coastal": 1.0,    
-            "phytoplankton": 0.5, 
-            "eddy_strength": 0.0  
-        }
-    },
-    "Blind shark (Peekaboo Shark)": {
-        "description": "Nocturnal, coastal benthic species, found in rocky reefs and kelp beds.",
-        "preferences": {
-            "depth_preference": [1.0, 0.1, 0.0], 
-            "is_coastal": 1.0,    
-            "phytoplankton": 0.5, 
-            "eddy_strength": 0.0  
-        }
-    },
-    "Bluegrey carpetshark (Ocean Tapestry)": {
-        "description": "Small, benthic reef shark of tropical waters.",
-        "preferences": {
-            "depth_preference": [1.0, 0.1, 0.0], 
-            "is_coastal": 1.0,    
-            "phytoplankton": 0.5, 
-            "eddy_strength": 0.0  
-        }
-    },
-    "Cookiecutter shark": {
-        "description": "Diel vertical migrator, specialized parasitic feeder, uses deep water for safety.",
-        "preferences": {
-            "depth_preference": [0.5, 0.5, 0.9], # Can be at any depth
-            "is_coastal": 0.0,    
-            "phytoplankton": 0.3, 
-            "eddy_strength": 0.7  # Pelagic environment
-        }
-    },
-    
-    # New Horn & Bullhead Sharks (Benthic)
-    "Horn shark (Spiral Maker)": {
-        "description": "Small, temperate, benthic ambush predator. Found on reefs and rocky bottom.",
-        "preferences": {
-            "depth_preference": [1.0, 0.3, 0.0], 
-            "is_coastal": 0.9,    
-            "phytoplankton": 0.4, 
-            "eddy_strength": 0.0  
-        }
-    },
-    "Whitespotted bullhead shark (Bullhead Phantom)": {
-        "description": "Benthic coastal species, feeds on hard-shelled invertebrates.",
-        "preferences": {
-            "depth_preference": [1.0, 0.2, 0.0], 
-            "is_coastal": 0.9,    
-            "phytoplankton": 0.4, 
-            "eddy_strength": 0.0  
-        }
-    },
-    "Crested bullhead shark (Shellbreaker)": {
-        "description": "Benthic coastal species, feeds on hard-shelled invertebrates.",
-        "preferences": {
-            "depth_preference": [1.0, 0.2, 0.0], 
-            "is_coastal": 0.9,    
-            "phytoplankton": 0.4, 
-            "eddy_strength": 0.0  
-        }
-    },
-    "Mexican hornshark (Pacific Ram)": {
-        "description": "Benthic species of the eastern Pacific, feeds on small invertebrates.",
-        "preferences": {
-            "depth_preference": [1.0, 0.3, 0.0], 
-            "is_coastal": 0.9,    
-            "phytoplankton": 0.4, 
-            "eddy_strength": 0.0  
-        }
-    },
-    
-    # New Angelsharks (Benthic Ambush)
-    "Common Angel Shark (Squatina squatina)": {
-        "description": "Flat, benthic ambush predator, prefers soft sediments near shore.",
-        "preferences": {
-            "depth_preference": [0.9, 0.3, 0.0], 
-            "is_coastal": 0.9,    
-            "phytoplankton": 0.5, 
-            "eddy_strength": 0.0  
-        }
-    },
-    "Australian Angel Shark (Squatina australis)": {
-        "description": "Flat, benthic ambush predator, temperate Australian waters.",
-        "preferences": {
-            "depth_preference": [0.9, 0.3, 0.0], 
-            "is_coastal": 0.9,    
-            "phytoplankton": 0.5, 
-            "eddy_strength": 0.0  
-        }
-    },
-    "Clouded Angel Shark (Squatina nebulosa)": {
-        "description": "Flat, benthic ambush predator, western Pacific shelf.",
-        "preferences": {
-            "depth_preference": [0.9, 0.3, 0.0], 
-            "is_coastal": 0.9,    
-            "phytoplankton": 0.5, 
-            "eddy_strength": 0.0  
-        }
-    },
-    "Brazilian Angel Shark (Squatina guggenheim)": {
-        "description": "Flat, benthic ambush predator, shallow Atlantic shelf.",
-        "preferences": {
-            "depth_preference": [0.9, 0.3, 0.0], 
-            "is_coastal": 0.9,    
-            "phytoplankton": 0.5, 
-            "eddy_strength": 0.0  
-        }
-    },
-    "Pacific Angelshark (Squatina californica)": {
-        "description": "Flat, benthic ambush predator, rocky and soft bottoms.",
-        "preferences": {
-            "depth_preference": [0.9, 0.3, 0.0], 
-            "is_coastal": 0.9,    
-            "phytoplankton": 0.5, 
-            "eddy_strength": 0.0  
-        }
-    },
-    "Smoothback Angelshark (Squatina oculata)": {
-        "description": "Flat, benthic ambush predator, Eastern Atlantic and Mediterranean.",
-        "preferences": {
-            "depth_preference": [0.9, 0.3, 0.0], 
-            "is_coastal": 0.9,    
-            "phytoplankton": 0.5, 
-            "eddy_strength": 0.0  
-        }
-    },
-    
-    # New Sawsharks (Benthic)
-    "Japanese Sawshark (Pristiophorus japonicus)": {
-        "description": "Benthic shark of the continental shelf and slope, uses saw for hunting.",
-        "preferences": {
-            "depth_preference": [0.7, 0.6, 0.3], 
-            "is_coastal": 0.7,    
-            "phytoplankton": 0.4, 
-            "eddy_strength": 0.1  
-        }
-    },
-    "African Dwarf Sawshark (Pristiophorus nancyae)": {
-        "description": "Small, deep-water sawshark, continental slope.",
-        "preferences": {
-            "depth_preference": [0.5, 0.7, 0.5], 
-            "is_coastal": 0.4,    
-            "phytoplankton": 0.3, 
-            "eddy_strength": 0.1  
-        }
-    },
-    "Longnose Sawshark (Pristiophorus nudipinnis)": {
-        "description": "Benthic shark of the continental shelf and slope.",
-        "preferences": {
-            "depth_preference": [0.7, 0.6, 0.3], 
-            "is_coastal": 0.7,    
-            "phytoplankton": 0.4, 
-            "eddy_strength": 0.1  
-        }
-    },
-    "Bahamas Sawshark (Pristiophorus schroederi)": {
-        "description": "Deep-water species of the Caribbean and Bahamas.",
-        "preferences": {
-            "depth_preference": [0.4, 0.7, 0.6], 
-            "is_coastal": 0.3,    
-            "phytoplankton": 0.3, 
-            "eddy_strength": 0.1  
-        }
-    },
-    "Sixgill Sawshark (Pliotrema warreni)": {
-        "description": "Unique sixgill sawshark, continental shelf and slope.",
-        "preferences": {
-            "depth_preference": [0.6, 0.8, 0.4], 
-            "is_coastal": 0.4,    
-            "phytoplankton": 0.3, 
-            "eddy_strength": 0.1  
-        }
-    },
-    "Shortnose Sawshark (Pristiophorus nudipinnis)": {
-        "description": "Benthic shark of the continental shelf and slope.",
-        "preferences": {
-            "depth_preference": [0.7, 0.6, 0.3], 
-            "is_coastal": 0.7,    
-            "phytoplankton": 0.4, 
-            "eddy_strength": 0.1  
-        }
-    },
-}
+# The profiles live in shark_profiles.json next to this file, keyed by species name, each with a
+# "description", its "preferences" and optional "group" / "notes". They are read on first use
+# (get_shark_profiles, or the module attribute SHARK_PROFILES), not at import, so short
+# invocations such as --list-species never pay for them. The parsed file is cached as marshal
+# data in __pycache__ and reused while the JSON file is unchanged.
+PROFILES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "shark_profiles.json")
+PROFILES_CACHE_VERSION = 1
+
+def _profiles_cache_path(path):
+    directory, file_name = os.path.split(path)
+    return os.path.join(directory, "__pycache__", f"{file_name}.marshal")
+
+def load_shark_profiles(path=PROFILES_FILE, use_cache=True):
+    """
+    Reads a profiles JSON file (see PROFILES_FILE). With `use_cache`, the compiled copy in
+    __pycache__ is used when it matches the file's modification time and size, and refreshed
+    otherwise (silently skipped where __pycache__ cannot be written).
+    """
+    started = time.perf_counter()
+    stat = os.stat(path)
+    key = (PROFILES_CACHE_VERSION, stat.st_mtime_ns, stat.st_size)
+    cache_path = _profiles_cache_path(path)
+    profiles = None
+    if use_cache:
+        try:
+            with open(cache_path, "rb") as handle:
+                cached_key, cached_profiles = marshal.load(handle)
+            if tuple(cached_key) == key:
+                profiles = cached_profiles
+        except (OSError, EOFError, ValueError, TypeError):
+            pass  # Missing or unreadable cache: fall back to the JSON file
+    source = "cache" if profiles is not None else "json"
+    if profiles is None:
+        with open(path, encoding="utf-8") as handle:
+            profiles = json.load(handle)
+        if not isinstance(profiles, dict):
+            raise ValueError(f"Profiles file {path} must hold a JSON object keyed by species name.")
+        if use_cache:
+            try:
+                os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                temporary = f"{cache_path}.{os.getpid()}.tmp"
+                with open(temporary, "wb") as handle:
+                    marshal.dump((key, profiles), handle)
+                os.replace(temporary, cache_path)
+            except OSError:
+                pass
+    STARTUP_METRICS["profiles_load_seconds"] = time.perf_counter() - started
+    STARTUP_METRICS["profiles_source"] = source
+    return profiles
+
+def get_shark_profiles():
+    """The SHARK_PROFILES dict, loading it from PROFILES_FILE on first use."""
+    profiles = globals().get("SHARK_PROFILES")
+    if profiles is None:
+        profiles = globals()["SHARK_PROFILES"] = load_shark_profiles()
+    return profiles
+
+def __getattr__(name):
+    # Module attributes loaded on first access (PEP 562): `from Predictor import SHARK_PROFILES`
+    # keeps working and reads the profiles file only then.
+    if name == "SHARK_PROFILES":
+        return get_shark_profiles()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Function to calculate the maximum theoretical HSI score for a profile
 def calculate_max_hsi(profile):
@@ -416,6 +328,9 @@ def calculate_max_hsi(profile):
     prefs = profile["preferences"]
     # Max Depth Preference is the maximum value in the list, as only one depth applies at a time
     max_depth_pref = max(prefs["depth_preference"])
+    if "depth_curve" in prefs:
+        # An interpolated curve never exceeds its highest point
+        max_depth_pref = max(max_depth_pref, max(value for _, value in prefs["depth_curve"]))
     
     # All other environmental factors (coastal, phyto, eddy) max out at 1.0
     # Score = Depth_Pref * 1.0 + Coastal_Pref * Coastal_Factor + ...
@@ -429,95 +344,301 @@ def calculate_max_hsi(profile):
 
 # --- 3. SIMULATED 3D OCEAN ENVIRONMENT GRID (Represents satellite data) ---
 
-def generate_simulated_environment(size, depth_layers):
+def resample_depth_profile(values, depth_layers, depth_bins=None):
     """
-    Simulates environmental data (derived from PACE, MODIS, SWOT) in 3D.
-    The coastal simulation is now conceptual: Row 0 represents the closest conceptual shore 
-    within the local 2 degree map centered on the shark's current position.
+    Resamples a Shallow -> Deep profile (e.g. a 3-element depth preference) onto `depth_layers`
+    evenly spaced layers by linear interpolation. Returns the values unchanged when the counts match.
+    With `depth_bins`, the profile is interpolated in meters instead: a 3-element profile applies
+    at DEPTH_PREFERENCE_DEPTHS and is held constant above the first and below the last of them.
+    """
+    if depth_bins is not None:
+        return interpolate_depth_curve(*depth_profile_curve(values), depth_bins)
+    values = np.asarray(values, dtype=float)
+    if len(values) == depth_layers:
+        return values
+    return np.interp(np.linspace(0, len(values) - 1, depth_layers), np.arange(len(values)), values)
+
+def depth_profile_curve(values):
     """
-    # Initialize 3D arrays
+    The (depths, values) curve of a Shallow -> Deep profile: 3 values sit at the default bin
+    centers; longer or shorter profiles are spread evenly between the shallowest and deepest of them.
+    """
+    values = np.asarray(values, dtype=float)
+    if len(values) == len(DEPTH_PREFERENCE_DEPTHS):
+        return np.array(DEPTH_PREFERENCE_DEPTHS), values
+    return np.linspace(DEPTH_PREFERENCE_DEPTHS[0], DEPTH_PREFERENCE_DEPTHS[-1], len(values)), values
+
+def interpolate_depth_curve(depths, values, depth_bins):
+    """Values of a (depths in meters, values) curve at the center of each depth bin."""
+    return np.interp(depth_bin_centers(depth_bins), depths, values)
+
+# Phytoplankton offset from the base field for the Shallow, Mid-Water and Deep layers
+PHYTOPLANKTON_DEPTH_OFFSETS = [0.3, 0.0, -0.4]
+
+# The simulated warm eddy sits slightly offshore: center at [15, 5] with a 10-cell radius on the
+# original 20x20 grid. Stored as fractions of the grid size so larger grids keep the same layout.
+EDDY_CENTER_FRACTION = (0.75, 0.25)
+EDDY_RADIUS_FRACTION = 0.5
+
+def _simulate_environment_layers(members, size, depth_layers, rng, depth_bins=None):
+    """
+    Draws the simulated layers for `members` environments at once, stacked along a leading
+    axis (members=None draws a single environment without that axis).
+    """
+    with INSTRUMENTATION.stage("generate_environment"):
+        environment = _draw_environment_layers(members, size, depth_layers, rng, depth_bins)
+    if INSTRUMENTATION.enabled:
+        INSTRUMENTATION.count("bytes_allocated", sum(layer.nbytes for layer in environment.values() if layer.base is None))
+    return environment
+
+def _draw_environment_layers(members, size, depth_layers, rng, depth_bins):
+    """The body of _simulate_environment_layers (kept apart so the instrumentation stage wraps it)."""
+    batch = () if members is None else (members,)
     shape = (size, size, depth_layers)
-    environment = {
-        "coastal_map": np.zeros(shape),
-        "phytoplankton_abundance": np.zeros(shape),
-        "eddy_strength": np.zeros(shape)
-    }
+    rows = np.arange(size, dtype=float)[:, np.newaxis]
+    cols = np.arange(size, dtype=float)[np.newaxis, :]
     
     # 1. Coastal Map (Only varies horizontally, strongest at row 0, constant across depth)
-    for i in range(size):
-        # Coastal influence decreases as row index (i) increases (moves offshore)
-        coastal_factor = 1.0 - (i / size)
-        environment["coastal_map"][i, :, :] = coastal_factor
+    # Coastal influence decreases as row index (i) increases (moves offshore)
+    coastal_map = np.empty(shape)
+    coastal_map[...] = (1.0 - rows / size)[:, :, np.newaxis]
+    if batch:
+        # Identical for every member: one read-only copy shared by the whole stack
+        coastal_map = np.broadcast_to(coastal_map, batch + shape)
             
     # 2. Phytoplankton Abundance (Highest at surface, decreases with depth - PACE/MODIS)
-    base_phyto = np.random.normal(0.5, 0.2, (size, size))
-    for i in range(size):
-        for j in range(size):
-            environment["phytoplankton_abundance"][i, j, 0] = np.clip(base_phyto[i, j] + 0.3, 0.0, 1.0) 
-            environment["phytoplankton_abundance"][i, j, 1] = np.clip(base_phyto[i, j], 0.0, 1.0)
-            environment["phytoplankton_abundance"][i, j, 2] = np.clip(base_phyto[i, j] - 0.4, 0.0, 1.0) 
+    base_phyto = rng.normal(0.5, 0.2, batch + (size, size))
+    # Other layer counts interpolate the Shallow -> Deep offsets across the water column
+    # (in meters when the depth bins are known)
+    depth_offsets = resample_depth_profile(PHYTOPLANKTON_DEPTH_OFFSETS, depth_layers, depth_bins)
+    phytoplankton = np.add(base_phyto[..., np.newaxis], depth_offsets, out=np.empty(batch + shape))
+    np.clip(phytoplankton, 0.0, 1.0, out=phytoplankton)
             
     # 3. Eddy Strength (Varies across all dimensions - SWOT/Articles)
-    base_eddy = np.random.normal(0.3, 0.2, shape)
-    
-    # Simulate a strong warm eddy slightly offshore (center at [15, 5] grid index)
-    for k in range(depth_layers):
-        for i in range(size):
-            for j in range(size):
-                dist = np.sqrt((i - 15)**2 + (j - 5)**2)
-                eddy_bump = max(0, (10 - dist) / 10) * 0.7 
-                environment["eddy_strength"][i, j, k] = np.clip(base_eddy[i, j, k] + eddy_bump, 0.0, 1.0)
+    base_eddy = rng.normal(0.3, 0.2, batch + shape)
+    
+    # Simulate a strong warm eddy slightly offshore. The distance field is computed once
+    # and broadcast across every depth layer (and member).
+    center_row, center_col = (fraction * size for fraction in EDDY_CENTER_FRACTION)
+    radius = EDDY_RADIUS_FRACTION * size
+    dist = np.sqrt((rows - center_row)**2 + (cols - center_col)**2)
+    eddy_bump = np.maximum(0, (radius - dist) / radius) * 0.7
+    eddy_strength = base_eddy
+    eddy_strength += eddy_bump[:, :, np.newaxis]
+    np.clip(eddy_strength, 0.0, 1.0, out=eddy_strength)
             
-    return environment
+    return {
+        "coastal_map": coastal_map,
+        "phytoplankton_abundance": phytoplankton,
+        "eddy_strength": eddy_strength
+    }
+
+def generate_simulated_environment(size, depth_layers, rng=None, depth_bins=None):
+    """
+    Simulates environmental data (derived from PACE, MODIS, SWOT) in 3D.
+    The coastal simulation is now conceptual: Row 0 represents the closest conceptual shore 
+    within the local 2 degree map centered on the shark's current position.
+    `rng` is a numpy.random.Generator or an integer seed; the same seed always produces the
+    same environment. When omitted, a freshly seeded generator is used.
+    `depth_bins` (meters, one per layer) places the layers in the water column, e.g. grid.depth_bins.
+    """
+    return _simulate_environment_layers(None, size, depth_layers, np.random.default_rng(rng), depth_bins)
+
+def generate_environment_ensemble(members, size, depth_layers, rng=None, depth_bins=None):
+    """
+    Simulates `members` independent environments in one go, each layer stacked into a single
+    (members, size, size, depth_layers) array. The coastal map is the same for every member and
+    is a read-only broadcast view. `rng` and `depth_bins` work as in generate_simulated_environment.
+    """
+    if members < 1:
+        raise ValueError(f"An ensemble needs at least 1 member, got {members}.")
+    return _simulate_environment_layers(members, size, depth_layers, np.random.default_rng(rng), depth_bins)
+
+# --- COMPACT ENVIRONMENTS ---
+# Every layer is clipped to [0, 1] and some fields do not vary along every axis (the coastal
+# map only changes by row), so a full float64 volume per layer is mostly wasted memory.
+# A QuantizedLayer keeps the values as uint8 codes (value = offset + scale * code) or as
+# float16/float32, with the constant axes collapsed to length 1 and broadcast on use.
+# Typical HSI error against the float64 environment, per simulated environment:
+#   float32 ~1e-7, float16 ~5e-4, uint8 ~3e-3 (see hsi_error_bound for the exact bound)
+COMPACT_DTYPES = ("uint8", "float16", "float32", "float64")
+
+class QuantizedLayer:
+    """
+    A compactly stored environment layer that still behaves like the full array where it is
+    read: `shape` is the logical shape, indexing and np.asarray decode to float64.
+    score_hsi_volume uses the stored codes directly, without decoding the whole layer.
+    """
+
+    def __init__(self, values, scale, offset, shape, max_error):
+        self.values = values          # Stored codes/values, broadcastable to `shape`
+        self.scale = scale
+        self.offset = offset
+        self.shape = tuple(shape)
+        self.max_error = max_error    # Largest absolute decoding error over the layer
+
+    @property
+    def ndim(self):
+        return len(self.shape)
+
+    @property
+    def dtype(self):
+        return np.dtype(float)
+
+    @property
+    def nbytes(self):
+        """Bytes actually stored (the collapsed, quantized values)."""
+        return self.values.nbytes
+
+    def decode(self, values=None):
+        """Float64 values of the stored codes (all of them, or the given subset)."""
+        values = self.values if values is None else values
+        if self.scale == 1.0 and self.offset == 0.0:
+            return values.astype(float)
+        return values * self.scale + self.offset
+
+    def __getitem__(self, key):
+        return self.decode(np.broadcast_to(self.values, self.shape)[key])
+
+    def __array__(self, dtype=None, copy=None):
+        decoded = np.broadcast_to(self.decode(), self.shape)
+        return decoded.astype(dtype or float, copy=True)
+
+def compact_layer(values, dtype="uint8"):
+    """
+    Stores one layer as a QuantizedLayer. Axes along which the layer is constant are collapsed
+    to length 1 (losslessly); the rest is kept as `dtype` (uint8 codes spanning the layer's
+    own min..max, or a narrower float type).
+    """
+    if dtype not in COMPACT_DTYPES:
+        raise ValueError(f"Unsupported compact dtype '{dtype}'; expected one of {', '.join(COMPACT_DTYPES)}.")
+    values = np.asarray(values, dtype=float)
+    reduced = values
+    for axis in range(values.ndim):
+        first = reduced.take([0], axis=axis)
+        if reduced.shape[axis] > 1 and np.array_equal(reduced, np.broadcast_to(first, reduced.shape)):
+            reduced = first
+    reduced = np.ascontiguousarray(reduced)
+    
+    if dtype == "uint8":
+        low, high = float(reduced.min()), float(reduced.max())
+        scale = (high - low) / 255.0 if high > low else 1.0
+        stored = np.round((reduced - low) / scale).astype(np.uint8)
+        offset = low
+    else:
+        stored, scale, offset = reduced.astype(dtype), 1.0, 0.0
+    layer = QuantizedLayer(stored, scale, offset, values.shape, 0.0)
+    layer.max_error = float(np.max(np.abs(layer.decode() - reduced))) if reduced.size else 0.0
+    return layer
+
+def compact_environment(environment, dtype="uint8"):
+    """Converts the HSI factor layers of an environment to QuantizedLayers (other keys are kept)."""
+    compact = dict(environment)
+    for layer_name, _ in HSI_FACTORS:
+        compact[layer_name] = compact_layer(environment[layer_name], dtype)
+    return compact
+
+def environment_nbytes(environment):
+    """Bytes held by the HSI factor layers of an environment (broadcast views count once)."""
+    total = 0
+    for layer_name, _ in HSI_FACTORS:
+        layer = environment[layer_name]
+        if isinstance(layer, np.ndarray) and 0 in layer.strides:
+            layer = layer.base if layer.base is not None else layer
+        total += layer.nbytes
+    return total
+
+def hsi_error_bound(environment, table=None):
+    """
+    Largest possible HSI difference, over all species, between scoring a compact environment
+    and scoring the float64 data it was built from: sum over factors of |weight| x max_error.
+    """
+    table = table or get_profile_table()
+    errors = np.array([getattr(environment[layer_name], "max_error", 0.0) for layer_name, _ in HSI_FACTORS])
+    return float(np.max(np.abs(table.factor_weights) @ errors))
 
 # --- UTILITY FUNCTIONS: MAPPING ---
 
-def map_lat_lon_to_grid(lat, lon, start_lat, start_lon):
+def wrap_longitude(lon):
+    """
+    Wraps longitudes into [-180, 180] (e.g., 190 -> -170 when crossing the 180/-180 meridian).
+    Accepts scalars or NumPy arrays; 180 and -180 are both kept as they are.
+    """
+    lon = np.asarray(lon, dtype=float)
+    wrapped = (lon + 180.0) % 360.0 - 180.0
+    # The modulo sends +180 to -180; keep the eastern edge where it was
+    wrapped = np.where((wrapped == -180.0) & (lon > 0), 180.0, wrapped)
+    return wrapped[()]
+
+def normalize_lat_lon(lat, lon):
+    """
+    Brings coordinates that ran past a pole or the antimeridian back onto the globe.
+    Crossing a pole folds the latitude back (e.g., 95 -> 85) and moves to the opposite
+    meridian (lon + 180); longitudes are then wrapped into [-180, 180]. Accepts arrays.
+    """
+    lat = np.asarray(lat, dtype=float)
+    lon = np.asarray(lon, dtype=float)
+    past_north = lat > 90.0
+    past_south = lat < -90.0
+    lat = np.where(past_north, 180.0 - lat, np.where(past_south, -180.0 - lat, lat))
+    lon = np.where(past_north | past_south, lon + 180.0, lon)
+    return lat[()], wrap_longitude(lon)
+
+def map_lat_lon_to_grid(lat, lon, start_lat, start_lon, grid=DEFAULT_GRID):
     """
     Converts a global Lat/Lon to its Row/Col grid index within the local 2-degree map 
     centered on the start_lat/start_lon. (Not currently used for input, but kept for calculation.)
+    Accepts scalars or whole NumPy coordinate arrays (e.g., a GPS track) and returns matching
+    index arrays. Longitudes are compared the short way round, so positions on the other side
+    of the antimeridian land in the right cells; latitudes are clipped to the poles.
     """
+    lat = np.clip(np.asarray(lat, dtype=float), -90.0, 90.0)
+    
     # Calculate difference from the center (start_lat/lon)
     lat_diff = lat - start_lat
-    lon_diff = lon - start_lon
+    lon_diff = wrap_longitude(np.asarray(lon, dtype=float) - start_lon)
     
-    # Normalize difference to a 0.0 to 1.0 scale within the HALF_SPAN
-    normalized_lat = (lat_diff + HALF_SPAN) / LOCAL_GRID_DEGREE_SPAN
-    normalized_lon = (lon_diff + HALF_SPAN) / LOCAL_GRID_DEGREE_SPAN
+    # Normalize difference to a 0.0 to 1.0 scale within the half span
+    normalized_lat = (lat_diff + grid.half_span) / grid.degree_span
+    normalized_lon = (lon_diff + grid.half_span) / grid.degree_span
     
-    # Map normalized values to grid indices (0 to GRID_SIZE - 1)
-    # Row 0 of the grid is the lowest Lat boundary (Lat - HALF_SPAN)
-    row = GRID_SIZE - 1 - int(normalized_lat * GRID_SIZE)
-    col = int(normalized_lon * GRID_SIZE)
+    # Map normalized values to grid indices (0 to grid.size - 1)
+    # Row 0 of the grid is the highest Lat boundary (Lat + half span)
+    row = grid.size - 1 - np.floor(normalized_lat * grid.size).astype(int)
+    col = np.floor(normalized_lon * grid.size).astype(int)
 
-    row = np.clip(row, 0, GRID_SIZE - 1)
-    col = np.clip(col, 0, GRID_SIZE - 1)
+    row = np.clip(row, 0, grid.size - 1)
+    col = np.clip(col, 0, grid.size - 1)
 
-    return row, col
+    return row[()], col[()]
 
-def map_grid_to_lat_lon_relative(row, col, start_lat, start_lon):
+def map_grid_to_lat_lon_relative(row, col, start_lat, start_lon, grid=DEFAULT_GRID):
     """
     Converts 0-indexed Row/Col grid coordinates back to global Lat/Lon.
+    Accepts scalars or index arrays. Results past a pole or the antimeridian are
+    normalized back onto the globe (see normalize_lat_lon).
     """
+    row = np.asarray(row)
+    col = np.asarray(col)
     # Use (index + 0.5) to target the center of the grid cell
     
     # Map column (Longitude)
-    normalized_lon = (col + 0.5) / GRID_SIZE
-    lon_offset = normalized_lon * LOCAL_GRID_DEGREE_SPAN - HALF_SPAN
+    normalized_lon = (col + 0.5) / grid.size
+    lon_offset = normalized_lon * grid.degree_span - grid.half_span
     lon = start_lon + lon_offset
     
     # Map row (Latitude). Row 0 is the highest Latitude edge of the span.
-    normalized_lat = 1.0 - (row + 0.5) / GRID_SIZE
-    lat_offset = normalized_lat * LOCAL_GRID_DEGREE_SPAN - HALF_SPAN
+    normalized_lat = 1.0 - (row + 0.5) / grid.size
+    lat_offset = normalized_lat * grid.degree_span - grid.half_span
     lat = start_lat + lat_offset
 
-    return lat, lon
+    return normalize_lat_lon(lat, lon)
 
 # --- INPUT FUNCTIONS (No change) ---
 def ask_for_shark_type():
     """Prompts the user to select the shark type."""
     print("\n--- Shark Species Selection ---")
-    available_sharks = list(SHARK_PROFILES.keys())
+    available_sharks = list(get_shark_profiles().keys())
     print("Available sharks for prediction:")
     # Sort the list alphabetically for easier selection
     available_sharks.sort() 
@@ -536,7 +657,7 @@ def ask_for_shark_type():
         except ValueError:
             print("Error: Please enter a valid number.")
 
-def ask_for_current_location():
+def ask_for_current_location(grid=DEFAULT_GRID):
     """Prompts the user for a starting location using global Lat/Lon and Depth."""
     print("\n--- Starting Location Input (Global Coordinates) ---")
     
@@ -562,163 +683,951 @@ def ask_for_current_location():
     # 3. Get Depth
     while True:
         try:
-            depth_input = input(f"Enter the current DEPTH LAYER (0=Shallow, 1=Mid, 2=Deep): ")
+            if grid.depth_layers == len(DEPTH_LABELS):
+                depth_input = input(f"Enter the current DEPTH LAYER (0=Shallow, 1=Mid, 2=Deep): ")
+            else:
+                depth_input = input(f"Enter the current DEPTH LAYER (0=Surface to {grid.depth_layers - 1}=Deepest): ")
             depth = int(depth_input)
-            if 0 <= depth < DEPTH_LAYERS: break
-            else: print(f"Error: Depth must be 0, 1, or 2.")
+            if 0 <= depth < grid.depth_layers: break
+            else: print(f"Error: Depth must be between 0 and {grid.depth_layers - 1}.")
         except ValueError: print("Error: Please enter a valid integer.")
             
-    # For internal processing, the start point is always the center of the 20x20 grid (index 9, 9)
+    # For internal processing, the start point is always the center of the grid (index 9, 9 on 20x20)
     # The actual coordinates are passed to the prediction mapping functions.
-    start_row = 9 
-    start_col = 9 
+    start_row = grid.center_index
+    start_col = grid.center_index
     
     return lat, lon, start_row, start_col, depth
 
-# --- 4. MIGRATION PREDICTION LOGIC (Updated for 6-month scale) ---
+# --- 4. VECTORIZED HSI SCORING ENGINE ---
+
+# Each environment layer paired with the profile preference that weights it.
+# The order matches the per-cell HSI formula, so the summation order (and the result) is unchanged.
+HSI_FACTORS = (
+    ("coastal_map", "is_coastal"),
+    ("phytoplankton_abundance", "phytoplankton"),
+    ("eddy_strength", "eddy_strength"),
+)
+
+# --- COMPILED PROFILE TABLE ---
+# The nested SHARK_PROFILES dicts are compiled once into contiguous weight arrays, looked up by
+# species index. The table is built on first use; call invalidate_profile_table() after changing
+# SHARK_PROFILES so the next lookup recompiles it. A new table can also be installed as a whole
+# (set_profile_table, used by profile_registry.py to hot-reload the profile files). Installing is
+# a single reference swap: code scoring a batch takes the table once and passes it down, so it
+# sees either the old or the new species set, never a mix.
+
+@dataclass(frozen=True)
+class ProfileTable:
+    """Weights of every species as arrays: one row per species, in `names` order."""
+    names: tuple
+    index: dict             # Species name -> row
+    factor_weights: np.ndarray  # (n_species, n_factors) preferences, in HSI_FACTORS order
+    depth_weights: np.ndarray   # (n_species, profile depth layers) depth preferences
+    max_hsi: np.ndarray         # (n_species,) theoretical maximum HSI
+    depth_curves: tuple = ()    # Per species, (depths in meters, preferences) used with depth bins
+    tracker_species: dict = None  # Tracker001.ino profile id (e.g. "S20") -> species name
+    version: int = 0            # Set when installed (see set_profile_table); changes with every swap
+
+    def species_index(self, shark_type):
+        """Row of a species, given its name or its index."""
+        if isinstance(shark_type, (int, np.integer)):
+            if not 0 <= shark_type < len(self.names):
+                raise IndexError(f"Species index {shark_type} is out of range (0-{len(self.names) - 1}).")
+            return int(shark_type)
+        try:
+            return self.index[shark_type]
+        except KeyError:
+            raise KeyError(f"Unknown shark type '{shark_type}'.") from None
+
+    @cached_property
+    def _resampled_depth_weights(self):
+        return {}
+
+    def depth_weights_for(self, depth_layers, depth_bins=None):
+        """
+        Depth preferences resampled onto `depth_layers` layers (cached per layer count). With
+        `depth_bins`, each species' depth curve is interpolated at the bin centers in meters.
+        """
+        key = depth_layers if depth_bins is None else tuple(tuple(depth_bin) for depth_bin in depth_bins)
+        weights = self._resampled_depth_weights.get(key)
+        if weights is None:
+            if depth_bins is None:
+                weights = [resample_depth_profile(row, depth_layers) for row in self.depth_weights]
+            else:
+                if len(depth_bins) != depth_layers:
+                    raise ValueError(f"Got {len(depth_bins)} depth bins for {depth_layers} depth layers.")
+                weights = [interpolate_depth_curve(depths, values, depth_bins) for depths, values in self.depth_curves]
+            weights = np.ascontiguousarray(weights)
+            weights.flags.writeable = False
+            self._resampled_depth_weights[key] = weights
+        return weights
+
+def validate_profile(name, profile):
+    """Checks one SHARK_PROFILES entry against the expected schema; raises ValueError if it does not match."""
+    prefs = profile.get("preferences") if isinstance(profile, dict) else None
+    if not isinstance(prefs, dict):
+        raise ValueError(f"Profile '{name}' has no 'preferences' dict.")
+    
+    depth_preference = prefs.get("depth_preference")
+    if not isinstance(depth_preference, (list, tuple)) or not depth_preference:
+        raise ValueError(f"Profile '{name}': 'depth_preference' must be a non-empty list.")
+    weights = {"depth_preference": depth_preference}
+    for _, preference_name in HSI_FACTORS:
+        if preference_name not in prefs:
+            raise ValueError(f"Profile '{name}' is missing the '{preference_name}' preference.")
+        weights[preference_name] = [prefs[preference_name]]
+    
+    # Optional fine-grained profile: [[depth_m, preference], ...] going down, interpolated between points
+    if "depth_curve" in prefs:
+        depth_curve = prefs["depth_curve"]
+        if (not isinstance(depth_curve, (list, tuple)) or not depth_curve
+                or not all(isinstance(point, (list, tuple)) and len(point) == 2 for point in depth_curve)):
+            raise ValueError(f"Profile '{name}': 'depth_curve' must be a non-empty list of [depth_m, preference] pairs.")
+        depths = [depth for depth, _ in depth_curve]
+        if any(isinstance(depth, bool) or not isinstance(depth, (int, float)) or depth < 0 for depth in depths):
+            raise ValueError(f"Profile '{name}': 'depth_curve' depths must be non-negative numbers of meters.")
+        if any(deeper <= shallower for shallower, deeper in zip(depths, depths[1:])):
+            raise ValueError(f"Profile '{name}': 'depth_curve' depths must increase strictly, got {depths}.")
+        weights["depth_curve"] = [value for _, value in depth_curve]
+    
+    # Optional link to the tracker firmware's profile (Tracker001.ino SHARK_PROFILES[])
+    tracker = profile.get("tracker")
+    if tracker is not None and not (isinstance(tracker, dict) and isinstance(tracker.get("id"), str) and tracker["id"]):
+        raise ValueError(f"Profile '{name}': 'tracker' must be an object with a non-empty 'id'.")
+    
+    # Every weight is a number between 0.0 and 1.0
+    for preference_name, values in weights.items():
+        for value in values:
+            if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0.0 <= value <= 1.0:
+                raise ValueError(f"Profile '{name}': '{preference_name}' weights must be numbers from 0.0 to 1.0, got {value!r}.")
+
+def validate_profiles(profiles):
+    """Checks every profile (see validate_profile) and that they all have as many depth preferences."""
+    if not profiles:
+        raise ValueError("Cannot compile an empty profile table.")
+    for name, profile in profiles.items():
+        validate_profile(name, profile)
+    depth_lengths = {len(profile["preferences"]["depth_preference"]) for profile in profiles.values()}
+    if len(depth_lengths) != 1:
+        raise ValueError(f"All profiles need the same number of depth preferences, found {sorted(depth_lengths)}.")
+    tracker_species = {}
+    for name, profile in profiles.items():
+        if "tracker" in profile:
+            tracker_id = profile["tracker"]["id"]
+            if tracker_id in tracker_species:
+                raise ValueError(f"Tracker id {tracker_id} is used by both '{tracker_species[tracker_id]}' and '{name}'.")
+            tracker_species[tracker_id] = name
+
+def compile_profile_table(profiles):
+    """Validates the profiles and compiles them into a ProfileTable."""
+    validate_profiles(profiles)
+    names = tuple(profiles.keys())
+    
+    factor_weights = np.array([
+        [profiles[name]["preferences"][preference_name] for _, preference_name in HSI_FACTORS]
+        for name in names
+    ], dtype=float)
+    depth_weights = np.array([profiles[name]["preferences"]["depth_preference"] for name in names], dtype=float)
+    max_hsi = np.array([calculate_max_hsi(profiles[name]) for name in names])
+    depth_curves = []
+    for name, row in zip(names, depth_weights):
+        if "depth_curve" in profiles[name]["preferences"]:
+            curve = np.array(profiles[name]["preferences"]["depth_curve"], dtype=float)
+            depth_curves.append((curve[:, 0], curve[:, 1]))
+        else:
+            depth_curves.append(depth_profile_curve(row))
+    for array in (factor_weights, depth_weights, max_hsi, *(array for curve in depth_curves for array in curve)):
+        array.flags.writeable = False
+    
+    return ProfileTable(
+        names=names,
+        index={name: i for i, name in enumerate(names)},
+        factor_weights=factor_weights,
+        depth_weights=depth_weights,
+        max_hsi=max_hsi,
+        depth_curves=tuple(depth_curves),
+        tracker_species={profiles[name]["tracker"]["id"]: name for name in names if "tracker" in profiles[name]},
+    )
+
+_profile_table = None
+_profile_table_version = 0
+_profile_table_lock = threading.Lock()
+
+def get_profile_table():
+    """Returns the compiled table of SHARK_PROFILES, compiling it on first use."""
+    table = _profile_table
+    if table is None:
+        table = set_profile_table(compile_profile_table(get_shark_profiles()))
+    return table
+
+def set_profile_table(table, profiles=None):
+    """
+    Installs a compiled ProfileTable (and the `profiles` dict it was compiled from, as
+    SHARK_PROFILES) in one swap. Returns the installed table, stamped with a new version.
+    """
+    global _profile_table, _profile_table_version
+    with _profile_table_lock:
+        _profile_table_version += 1
+        table = replace(table, version=_profile_table_version)
+        if profiles is not None:
+            globals()["SHARK_PROFILES"] = profiles
+        _profile_table = table
+    return table
+
+def invalidate_profile_table():
+    """Drops the compiled table; call after editing SHARK_PROFILES. The next lookup recompiles it."""
+    global _profile_table
+    _profile_table = None
+
+# --- HSI VOLUMES ---
+
+def score_hsi_volume(factor_weights, depth_weights, environment):
+    """
+    Calculates the Habitat Suitability Index for every 3D cell of the environment at once.
+    HSI = Depth_Pref[k] * 1.0 + sum(Factor_Pref * Factor_Value), evaluated as whole-array
+    operations instead of a per-cell Python loop. `factor_weights` follows HSI_FACTORS order and
+    `depth_weights` has one entry per depth layer. Returns a (rows, cols, depth) array; stacked
+    environments (e.g., an ensemble) keep their leading axes.
+    """
+    shape = environment[HSI_FACTORS[0][0]].shape
+    
+    # Depth preference only varies along the depth axis, so it broadcasts across rows and columns
+    scores = np.empty(shape)
+    scores[...] = depth_weights * 1.0
+    
+    # Add each weighted environmental factor in turn (same order as the original per-cell sum)
+    for (layer_name, _), weight in zip(HSI_FACTORS, factor_weights):
+        layer = environment[layer_name]
+        if isinstance(layer, QuantizedLayer):
+            # Fold the decoding into the weight and broadcast the collapsed axes
+            scores += (weight * layer.scale) * layer.values
+            scores += weight * layer.offset
+        else:
+            scores += weight * layer
+    if INSTRUMENTATION.enabled:
+        INSTRUMENTATION.count("cells_scored", scores.size)
+        INSTRUMENTATION.count("bytes_allocated", scores.nbytes)
+    return scores
+
+def calculate_hsi_volume(profile, environment):
+    """Calculates the HSI volume for a profile dict (see score_hsi_volume)."""
+    prefs = profile["preferences"]
+    depth_layers = environment[HSI_FACTORS[0][0]].shape[-1]
+    factor_weights = [prefs[preference_name] for _, preference_name in HSI_FACTORS]
+    return score_hsi_volume(factor_weights, resample_depth_profile(prefs["depth_preference"], depth_layers), environment)
+
+def calculate_species_hsi_volume(shark_type, environment, table=None, depth_bins=None):
+    """
+    Calculates the HSI volume for one species (name or index) from the compiled profile table.
+    `depth_bins` (meters, one per layer) interpolates the species' depth curve onto the layers.
+    """
+    table = table or get_profile_table()
+    i = table.species_index(shark_type)
+    depth_layers = environment[HSI_FACTORS[0][0]].shape[-1]
+    return score_hsi_volume(table.factor_weights[i], table.depth_weights_for(depth_layers, depth_bins)[i], environment)
+
+# --- STREAMING COLUMN REDUCTION ---
+# Most callers only need the best score of each water column and the layer it occurs in. With
+# fine depth bins the full (rows, cols, depth) volume gets large, so the column reduction scores
+# COLUMN_CHUNK_LAYERS layers at a time and keeps a running max/argmax: memory stays at one
+# chunk however many layers the water column has.
+COLUMN_CHUNK_LAYERS = 16
+
+def _environment_view(environment, index):
+    """
+    The environment's HSI layers restricted by `index`, a tuple of slices for the trailing axes
+    (views, no copies). Quantized layers keep their codes, so scores of the view are bit-identical
+    to the same cells of the whole volume.
+    """
+    view = {}
+    for layer_name, _ in HSI_FACTORS:
+        layer = environment[layer_name]
+        key = (Ellipsis,) + tuple(index)
+        if isinstance(layer, QuantizedLayer):
+            # Collapsed (length 1) axes broadcast over any slice, so they are kept whole
+            lead = layer.ndim - len(index)
+            values_key = (Ellipsis,) + tuple(
+                slice(None) if layer.values.shape[lead + axis] == 1 else axis_slice
+                for axis, axis_slice in enumerate(index)
+            )
+            shape = layer.shape[:lead] + tuple(
+                len(range(*axis_slice.indices(length))) for axis_slice, length in zip(index, layer.shape[lead:])
+            )
+            view[layer_name] = QuantizedLayer(layer.values[values_key], layer.scale, layer.offset, shape, layer.max_error)
+        else:
+            view[layer_name] = layer[key]
+    return view
+
+def score_column_max(shark_type, environment, table=None, depth_bins=None, chunk_layers=COLUMN_CHUNK_LAYERS):
+    """
+    Best HSI of every water column and the depth layer it occurs in, without materializing the
+    whole HSI volume. Returns two (..., rows, cols) arrays equal to np.max / np.argmax over the
+    depth axis of calculate_species_hsi_volume (ties resolve to the shallowest layer, as argmax does).
+    """
+    table = table or get_profile_table()
+    i = table.species_index(shark_type)
+    depth_layers = environment[HSI_FACTORS[0][0]].shape[-1]
+    factor_weights = table.factor_weights[i]
+    depth_weights = table.depth_weights_for(depth_layers, depth_bins)[i]
+    
+    best_scores = best_layers = None
+    for start in range(0, depth_layers, chunk_layers):
+        layers = slice(start, min(start + chunk_layers, depth_layers))
+        scores = score_hsi_volume(factor_weights, depth_weights[layers], _environment_view(environment, (layers,)))
+        chunk_best = scores.max(axis=-1)
+        chunk_layers_best = scores.argmax(axis=-1)
+        if best_scores is None:
+            best_scores, best_layers = chunk_best, chunk_layers_best
+            continue
+        # Strictly better only, so an earlier (shallower) layer keeps ties
+        better = chunk_best > best_scores
+        best_scores[better] = chunk_best[better]
+        best_layers[better] = chunk_layers_best[better] + start
+    return best_scores, best_layers
+
+def score_column(shark_type, environment, row, col, table=None, depth_bins=None):
+    """HSI of every depth layer of one water column (the same values as the full volume holds there)."""
+    table = table or get_profile_table()
+    i = table.species_index(shark_type)
+    depth_layers = environment[HSI_FACTORS[0][0]].shape[-1]
+    column = _environment_view(environment, (slice(row, row + 1), slice(col, col + 1), slice(None)))
+    scores = score_hsi_volume(table.factor_weights[i], table.depth_weights_for(depth_layers, depth_bins)[i], column)
+    return scores[..., 0, 0, :]
+
+def stack_environment_layers(environment):
+    """Stacks the HSI factor layers into a single (factor, rows, cols, depth) array, in HSI_FACTORS order."""
+    return np.stack([environment[layer_name] for layer_name, _ in HSI_FACTORS])
+
+def build_species_weight_matrix(species_names, depth_layers=DEPTH_LAYERS, table=None, depth_bins=None):
+    """
+    Gathers the weights of the given species (names or indices) from the compiled profile table.
+    Returns (factor_weights, depth_weights) shaped (n_species, n_factors) and (n_species, depth_layers).
+    """
+    table = table or get_profile_table()
+    rows = [table.species_index(name) for name in species_names]
+    return table.factor_weights[rows], table.depth_weights_for(depth_layers, depth_bins)[rows]
+
+def calculate_multi_species_hsi(species_names, environment, depth_bins=None, table=None):
+    """
+    Scores every species against the environment in one matrix product:
+    (species x factor) weights @ (factor x cell) layers, plus each species' depth preference.
+    Returns a (n_species, rows, cols, depth) array. Values match calculate_hsi_volume
+    up to floating-point rounding (the terms are summed in a different order).
+    """
+    layers = stack_environment_layers(environment)
+    factor_weights, depth_weights = build_species_weight_matrix(species_names, layers.shape[3], table, depth_bins)
+    cell_shape = layers.shape[1:]
+    
+    scores = factor_weights @ layers.reshape(layers.shape[0], -1)
+    scores = scores.reshape((len(species_names),) + cell_shape)
+    scores += depth_weights[:, np.newaxis, np.newaxis, :] * 1.0
+    return scores
 
-def predict_next_location(shark_type, environment):
+def score_multi_species_column_max(species_names, environment, table=None, depth_bins=None,
+                                   chunk_layers=COLUMN_CHUNK_LAYERS):
+    """
+    Multi-species score_column_max: the best HSI of every water column and its depth layer, for
+    every species, shaped (n_species, rows, cols). Each chunk of depth layers is scored with the
+    same matrix product as calculate_multi_species_hsi, so only one chunk of the
+    (species, rows, cols, depth) volume is held at a time.
+    """
+    depth_layers = environment[HSI_FACTORS[0][0]].shape[-1]
+    factor_weights, depth_weights = build_species_weight_matrix(species_names, depth_layers, table, depth_bins)
+    
+    best_scores = best_layers = None
+    for start in range(0, depth_layers, chunk_layers):
+        layers = slice(start, min(start + chunk_layers, depth_layers))
+        stacked = stack_environment_layers(_environment_view(environment, (layers,)))
+        scores = (factor_weights @ stacked.reshape(stacked.shape[0], -1)).reshape((len(species_names),) + stacked.shape[1:])
+        scores += depth_weights[:, np.newaxis, np.newaxis, layers] * 1.0
+        chunk_best = scores.max(axis=-1)
+        chunk_layers_best = scores.argmax(axis=-1)
+        if best_scores is None:
+            best_scores, best_layers = chunk_best, chunk_layers_best
+            continue
+        # Strictly better only, so an earlier (shallower) layer keeps ties
+        better = chunk_best > best_scores
+        best_scores[better] = chunk_best[better]
+        best_layers[better] = chunk_layers_best[better] + start
+    return best_scores, best_layers
+
+# --- 5. MIGRATION PREDICTION LOGIC (Updated for 6-month scale) ---
+
+# The 4 major directional sectors of the default local grid. Slicing is [Row, Col]
+DIRECTIONAL_SECTORS = DEFAULT_GRID.sectors
+
+# The 6-month migration vector (approx. 15 degrees) for each direction.
+# This vector determines the long-distance destination
+MIGRATION_DELTAS = {
+    "North": (15.0, 0.0),  # (Delta Lat, Delta Lon)
+    "South": (-15.0, 0.0),
+    "East": (0.0, 15.0),
+    "West": (0.0, -15.0),
+}
+
+# Distance of the 6-month migration jump along the chosen heading (degrees)
+MIGRATION_DISTANCE = 15.0
+
+# --- SECTOR ENGINE (Summed-area tables) ---
+# Sector averages come from integral images of max_scores_2d, so each sector costs a constant
+# number of lookups instead of another pass over its cells:
+#  - a rectangular summed-area table for axis-aligned regions (the 4 half-grid sectors), and
+#  - a polar summed-area table over (bearing bin, ring bin) around the grid center for compass
+#    wedges and ring regions. Wedge edges are resolved to the angular bin size (0.125° by
+#    default, so 4/8/16/32-point compass edges fall exactly on bin edges) and ring radii to
+#    the ring width (1 cell by default). A cell belongs to the bin of its center.
+
+COMPASS_POINTS = [
+    "North", "North-Northeast", "Northeast", "East-Northeast",
+    "East", "East-Southeast", "Southeast", "South-Southeast",
+    "South", "South-Southwest", "Southwest", "West-Southwest",
+    "West", "West-Northwest", "Northwest", "North-Northwest",
+]
+
+@dataclass(frozen=True)
+class WedgeSector:
+    """
+    A compass wedge from `start_bearing` clockwise to `end_bearing` (degrees, 0 = North,
+    90 = East), optionally limited to a ring of radii (in cells) around the grid center.
+    Equal start and end bearings cover the full circle, which makes a pure ring region.
+    """
+    name: str
+    start_bearing: float
+    end_bearing: float
+    inner_radius: float = 0.0
+    outer_radius: float = None   # None reaches the grid corners
+
+    @property
+    def span(self):
+        span = (self.end_bearing - self.start_bearing) % 360.0
+        return span if span > 0 else 360.0
+
+    @property
+    def heading(self):
+        """Center bearing of the wedge; the migration heading when this sector wins."""
+        return (self.start_bearing + self.span / 2.0) % 360.0
+
+def compass_sectors(count):
+    """
+    Splits the compass into `count` equal wedges centered on the compass headings
+    (North first, then clockwise). 4, 8 and 16 wedges are named after the compass points.
+    """
+    if count < 1:
+        raise ValueError(f"Need at least 1 compass sector, got {count}.")
+    width = 360.0 / count
+    sectors = []
+    for k in range(count):
+        heading = k * width
+        if len(COMPASS_POINTS) % count == 0:
+            name = COMPASS_POINTS[k * len(COMPASS_POINTS) // count]
+        else:
+            name = f"Bearing {heading:05.1f}°"
+        sectors.append(WedgeSector(name, (heading - width / 2.0) % 360.0, (heading + width / 2.0) % 360.0))
+    return sectors
+
+def compass_angular_resolution(count):
+    """Coarsest bearing bin size that puts every edge of compass_sectors(count) on a bin edge."""
+    return 180.0 / count
+
+def heading_migration_delta(bearing, distance=MIGRATION_DISTANCE):
+    """(Delta Lat, Delta Lon) of a `distance`-degree jump along a compass bearing."""
+    radians = math.radians(bearing)
+    return (round(distance * math.cos(radians), 9), round(distance * math.sin(radians), 9))
+
+def _integral_image(values):
+    """
+    Zero-padded cumulative sum over the last two axes: table[..., i, j] = values[..., :i, :j].sum().
+    Leading axes (e.g., species) are independent tables with exactly the values each would get alone.
+    """
+    table = np.zeros(values.shape[:-2] + (values.shape[-2] + 1, values.shape[-1] + 1))
+    np.cumsum(values, axis=-2, out=table[..., 1:, 1:])
+    np.cumsum(table[..., 1:, 1:], axis=-1, out=table[..., 1:, 1:])
+    return table
+
+@lru_cache(maxsize=32)
+def _polar_cell_bins(rows, cols, angular_resolution, ring_width):
+    """
+    Bearing bin and ring bin of every cell, measured from the geometric center of the grid.
+    Depends only on the grid shape, so it is computed once per shape.
+    """
+    dy = (rows - 1) / 2.0 - np.arange(rows, dtype=float)[:, np.newaxis]  # Row 0 is North
+    dx = np.arange(cols, dtype=float)[np.newaxis, :] - (cols - 1) / 2.0
+    bearing = np.degrees(np.arctan2(dx, dy)) % 360.0
+    angle_bin_count = int(round(360.0 / angular_resolution))
+    angle_bins = np.minimum((bearing / angular_resolution).astype(int), angle_bin_count - 1)
+    ring_bins = (np.hypot(dx, dy) / ring_width).astype(int)
+    ring_bin_count = int(ring_bins.max()) + 1
+    flat_bins = (angle_bins * ring_bin_count + ring_bins).ravel()
+    for array in (angle_bins, ring_bins, flat_bins):
+        array.flags.writeable = False
+    return angle_bins, ring_bins, flat_bins, angle_bin_count, ring_bin_count
+
+class SectorEngine:
+    """
+    Constant-cost sector sums and averages over a 2D score field (e.g., max_scores_2d).
+    Building the engine takes one pass over the field (plus one more, on the first wedge query,
+    for the polar tables); every rectangle, wedge or ring query afterwards costs a handful of
+    table lookups, whatever the sector size.
+    """
+
+    def __init__(self, field, angular_resolution=0.125, ring_width=1.0):
+        self.field = np.asarray(field, dtype=float)
+        self.angular_resolution = angular_resolution
+        self.ring_width = ring_width
+        
+        # Rectangular summed-area table
+        self._rect_sums = _integral_image(self.field)
+        
+        # Bearing/ring bins of every cell; the polar tables are only built on the first wedge query
+        self._angle_bins, self._ring_bins, self._flat_bins, self._angle_bin_count, self._ring_bin_count = (
+            _polar_cell_bins(*self.field.shape, angular_resolution, ring_width)
+        )
+
+    @cached_property
+    def _polar_tables(self):
+        """Polar summed-area tables of the cell sums and cell counts per (bearing bin, ring bin)."""
+        polar_shape = (self._angle_bin_count, self._ring_bin_count)
+        polar_size = polar_shape[0] * polar_shape[1]
+        polar_sums = np.bincount(self._flat_bins, weights=self.field.ravel(), minlength=polar_size)
+        polar_counts = np.bincount(self._flat_bins, minlength=polar_size)
+        return _integral_image(polar_sums.reshape(polar_shape)), _integral_image(polar_counts.reshape(polar_shape))
+
+    def rectangle_sum(self, r_slice, c_slice):
+        """Sum of field[r_slice, c_slice] (unit-step slices)."""
+        r0, r1, _ = r_slice.indices(self.field.shape[0])
+        c0, c1, _ = c_slice.indices(self.field.shape[1])
+        table = self._rect_sums
+        return table[r1, c1] - table[r0, c1] - table[r1, c0] + table[r0, c0]
+
+    def rectangle_mean(self, r_slice, c_slice):
+        """
+        Average of field[r_slice, c_slice] (unit-step slices). The sum comes from the summed-area
+        table, so it is rounded differently from np.mean: expect differences of a few ulps (up to
+        about 2e-15 on the default grid's HSI fields). Compare with np.isclose, not ==.
+        """
+        r0, r1, _ = r_slice.indices(self.field.shape[0])
+        c0, c1, _ = c_slice.indices(self.field.shape[1])
+        return self.rectangle_sum(r_slice, c_slice) / ((r1 - r0) * (c1 - c0))
+
+    def _wedge_bin_ranges(self, sector):
+        """The (bearing bin ranges, ring bin range) covered by a wedge sector."""
+        start = int(round(sector.start_bearing / self.angular_resolution)) % self._angle_bin_count
+        length = min(int(round(sector.span / self.angular_resolution)), self._angle_bin_count)
+        if start + length <= self._angle_bin_count:
+            angle_ranges = [(start, start + length)]
+        else:
+            # The wedge crosses North (0°): split it into two bearing ranges
+            angle_ranges = [(start, self._angle_bin_count), (0, start + length - self._angle_bin_count)]
+        
+        ring_start = min(int(round(sector.inner_radius / self.ring_width)), self._ring_bin_count)
+        ring_stop = self._ring_bin_count
+        if sector.outer_radius is not None:
+            ring_stop = min(int(round(sector.outer_radius / self.ring_width)), self._ring_bin_count)
+        return angle_ranges, (ring_start, max(ring_start, ring_stop))
+
+    def _polar_total(self, table, sector):
+        angle_ranges, (q0, q1) = self._wedge_bin_ranges(sector)
+        return sum(table[a1, q1] - table[a0, q1] - table[a1, q0] + table[a0, q0] for a0, a1 in angle_ranges)
+
+    def wedge_sum(self, sector):
+        return self._polar_total(self._polar_tables[0], sector)
+
+    def wedge_count(self, sector):
+        """Number of cells whose centers fall inside the wedge."""
+        return int(round(self._polar_total(self._polar_tables[1], sector)))
+
+    def wedge_mean(self, sector):
+        """Average of the field over a wedge; NaN when no cell center falls inside it."""
+        count = self.wedge_count(sector)
+        return self.wedge_sum(sector) / count if count else float("nan")
+
+    def wedge_mask(self, sector):
+        """Boolean (rows, cols) mask of the cells inside a wedge."""
+        angle_ranges, (q0, q1) = self._wedge_bin_ranges(sector)
+        in_bearing = np.zeros(self.field.shape, dtype=bool)
+        for a0, a1 in angle_ranges:
+            in_bearing |= (self._angle_bins >= a0) & (self._angle_bins < a1)
+        return in_bearing & (self._ring_bins >= q0) & (self._ring_bins < q1)
+
+    def sector_means(self, sectors):
+        """Average of the field over each wedge sector, keyed by sector name."""
+        return {sector.name: self.wedge_mean(sector) for sector in sectors}
+
+
+def check_environment_grid(environment, grid):
+    """Raises a ValueError when the environment layers do not have the grid's shape."""
+    shape = environment[HSI_FACTORS[0][0]].shape
+    if shape != grid.shape:
+        raise ValueError(f"Environment shape {shape} does not match the grid configuration {grid.shape}.")
+
+def predict_next_location(shark_type, environment, grid=DEFAULT_GRID, sectors=None, table=None, current_cell=None):
     """
     Calculates HSI for every cell, then aggregates scores into 4 major directional 
     sectors to determine the optimal long-distance migratory heading (6-month period).
     The prediction finds the most promising general direction (N, S, E, W) 
     within the local 2°x2° simulation and assumes a 15° migratory path.
+    `grid` describes the environment's resolution; sectors and the center cell come from it.
+    `sectors` sets the heading resolution: None keeps the 4 half-grid sectors, an integer N
+    evaluates N compass wedges (8, 16, ...), and a list of WedgeSector evaluates those wedge or
+    ring regions. A winning wedge migrates 15° along its center bearing.
+    `table` is the ProfileTable to score with (default: the current one, taken once).
+    `current_cell` is the shark's (row, col) in the environment, for windows that were shifted
+    off-center at a raster edge (default: grid.center_index).
     """
-    profile = SHARK_PROFILES[shark_type]
-    
-    # 1. Calculate HSI for every 3D cell
-    scores = np.zeros((GRID_SIZE, GRID_SIZE, DEPTH_LAYERS))
-    for i in range(GRID_SIZE):
-        for j in range(GRID_SIZE):
-            for k in range(DEPTH_LAYERS):
-                # --- Environmental Data ---
-                is_coastal = environment["coastal_map"][i, j, k]
-                phytoplankton = environment["phytoplankton_abundance"][i, j, k]
-                eddy_strength = environment["eddy_strength"][i, j, k]
-                
-                # --- Habitat Suitability Index (HSI) Calculation ---
-                score = 0
-                # All environmental factors are weighted by the shark's preference (0.0 to 1.0)
-                score += profile["preferences"]["depth_preference"][k] * 1.0 
-                score += profile["preferences"]["is_coastal"] * is_coastal
-                score += profile["preferences"]["phytoplankton"] * phytoplankton
-                score += profile["preferences"]["eddy_strength"] * eddy_strength
-                scores[i, j, k] = score
-
-    # 2. Determine the best score in each vertical water column (2D max score array)
-    # This represents the best possible HSI if the shark can dive to the optimal depth
-    max_scores_2d = np.max(scores, axis=2) 
-    
-    # 3. Define and average HSI scores across 4 major directional sectors
-    directional_indices = {
-        # Slicing is [Row, Col]
-        "North": (slice(0, 10), slice(0, 20)),   # Rows 0-9 (highest Lat half)
-        "South": (slice(10, 20), slice(0, 20)),  # Rows 10-19 (lowest Lat half)
-        "East": (slice(0, 20), slice(10, 20)),   # Cols 10-19 (highest Lon half)
-        "West": (slice(0, 20), slice(0, 10)),    # Cols 0-9 (lowest Lon half)
-    }
+    check_environment_grid(environment, grid)
+    INSTRUMENTATION.count("predictions")
+    table = table or get_profile_table()
+    
+    # 1+2. Calculate HSI for every 3D cell and keep the best score in each vertical water column
+    # (2D max score array) and the layer it occurs in. This represents the best possible HSI if
+    # the shark can dive to the optimal depth. Depth is scored in chunks, so the full volume is
+    # never held in memory, however fine the depth bins are.
+    with INSTRUMENTATION.stage("score_cells"):
+        max_scores_2d, best_layers_2d = score_column_max(shark_type, environment, table, grid.depth_bins)
     
-    directional_averages = {}
-    for direction, (r_slice, c_slice) in directional_indices.items():
-        # Get the scores for this sector and calculate the average HSI
-        sector_scores = max_scores_2d[r_slice, c_slice]
-        directional_averages[direction] = np.mean(sector_scores)
+    # 3. Average HSI scores across the directional sectors (constant cost per sector)
+    with INSTRUMENTATION.stage("sector_average"):
+        if isinstance(sectors, int):
+            engine = SectorEngine(max_scores_2d, angular_resolution=compass_angular_resolution(sectors))
+        else:
+            engine = SectorEngine(max_scores_2d)
+        if sectors is None:
+            directional_averages = {
+                direction: engine.rectangle_mean(r_slice, c_slice)
+                for direction, (r_slice, c_slice) in grid.sectors.items()
+            }
+        else:
+            wedges = compass_sectors(sectors) if isinstance(sectors, int) else list(sectors)
+            wedges_by_name = {wedge.name: wedge for wedge in wedges}
+            directional_averages = engine.sector_means(wedges)
         
-    # 4. Identify the best migratory direction
-    best_direction = max(directional_averages, key=directional_averages.get)
+    # 4. Identify the best migratory direction (sectors too small to hold a cell are skipped)
+    candidates = [direction for direction, average in directional_averages.items() if not np.isnan(average)]
+    if not candidates:
+        raise ValueError("None of the sectors contains a grid cell; use fewer sectors or a finer grid.")
+    best_direction = max(candidates, key=directional_averages.get)
     max_sector_score = directional_averages[best_direction]
     
-    # 5. Define the 6-month migration vector (approx. 15 degrees)
-    # This vector determines the long-distance destination
-    migration_delta = {
-        "North": (15.0, 0.0),  # (Delta Lat, Delta Lon)
-        "South": (-15.0, 0.0),
-        "East": (0.0, 15.0),
-        "West": (0.0, -15.0),
+    # 5. Find the absolute optimal depth *within the best sector* (for recommended start)
+    with INSTRUMENTATION.stage("optimal_depth"):
+        if sectors is None:
+            r_slice, c_slice = grid.sectors[best_direction]
+            column_max_in_sector = max_scores_2d[r_slice, c_slice]
+            best_layers_in_sector = best_layers_2d[r_slice, c_slice]
+            migration_delta = MIGRATION_DELTAS[best_direction]
+        else:
+            best_wedge = wedges_by_name[best_direction]
+            mask = engine.wedge_mask(best_wedge)
+            column_max_in_sector = max_scores_2d[mask]
+            best_layers_in_sector = best_layers_2d[mask]
+            migration_delta = heading_migration_delta(best_wedge.heading)
+        
+        # The best column of the sector (first in row-major order on ties) and its best layer:
+        # the same cell as the argmax over the sector's (row, col, depth) scores
+        optimal_depth = best_layers_in_sector.flat[np.argmax(column_max_in_sector)]
+        current_row, current_col = current_cell or (grid.center_index, grid.center_index)
+        current_scores = score_column(shark_type, environment, current_row, current_col, table, grid.depth_bins)
+
+    # Return the migration vector, optimal depth, best sector score, and current score
+    return migration_delta, optimal_depth, max_sector_score, best_direction, current_scores
+
+def predict_all_species(environment, species_names=None, grid=DEFAULT_GRID, table=None):
+    """
+    Multi-species mode of predict_next_location: scores every species (default: all of
+    SHARK_PROFILES) against the environment in a single pass and returns, per species,
+    its directional averages, best direction, migration vector, optimal depth and the
+    scores of the current (center) cell.
+    """
+    check_environment_grid(environment, grid)
+    table = table or get_profile_table()  # One snapshot for the whole batch
+    if species_names is None:
+        species_names = list(table.names)
+    
+    # 1+2. Score all species at once and keep the best score in each vertical water column, and
+    # the layer it occurs in, per species. Depth is scored in chunks, as in predict_next_location,
+    # so the (species, row, col, depth) volume is never held in memory
+    max_scores_2d, best_layers_2d = score_multi_species_column_max(species_names, environment, table, grid.depth_bins)
+    
+    # 3. Sector averages and the optimal depth inside each sector, for all species at once. The
+    # averages use per-species summed-area tables, as SectorEngine does in predict_next_location
+    directions = list(grid.sectors.keys())
+    sector_averages = np.empty((len(species_names), len(directions)))
+    sector_optimal_depths = np.empty((len(species_names), len(directions)), dtype=int)
+    rect_sums = _integral_image(max_scores_2d)
+    for d, (r_slice, c_slice) in enumerate(grid.sectors.values()):
+        r0, r1, _ = r_slice.indices(grid.size)
+        c0, c1, _ = c_slice.indices(grid.size)
+        sector_averages[:, d] = (rect_sums[:, r1, c1] - rect_sums[:, r0, c1] - rect_sums[:, r1, c0]
+                                 + rect_sums[:, r0, c0]) / ((r1 - r0) * (c1 - c0))
+        # The best column of the sector (first in row-major order on ties) and its best layer
+        column_max_in_sector = max_scores_2d[:, r_slice, c_slice].reshape(len(species_names), -1)
+        best_layers_in_sector = best_layers_2d[:, r_slice, c_slice].reshape(len(species_names), -1)
+        best_columns = np.argmax(column_max_in_sector, axis=1)
+        sector_optimal_depths[:, d] = best_layers_in_sector[np.arange(len(species_names)), best_columns]
+    
+    # Scores of the current (center) water column only
+    center = slice(grid.center_index, grid.center_index + 1)
+    current_scores = calculate_multi_species_hsi(species_names, _environment_view(environment, (center, center, slice(None))),
+                                                 grid.depth_bins, table)[:, 0, 0, :]
+    
+    # 4. Best direction per species (ties resolve in sector order, as in predict_next_location)
+    best_indices = np.argmax(sector_averages, axis=1)
+    
+    predictions = {}
+    for s, name in enumerate(species_names):
+        best_direction = directions[best_indices[s]]
+        predictions[name] = {
+            "directional_averages": dict(zip(directions, sector_averages[s])),
+            "best_direction": best_direction,
+            "migration_delta": MIGRATION_DELTAS[best_direction],
+            "max_sector_score": sector_averages[s, best_indices[s]],
+            "optimal_depth": sector_optimal_depths[s, best_indices[s]],
+            "current_scores": current_scores[s],
+        }
+    return predictions
+
+def sector_masks(grid=DEFAULT_GRID, sectors=None):
+    """
+    The directional sectors as boolean (rows, cols) cell masks. `sectors` works as in
+    predict_next_location; wedges that hold no cell center are left out.
+    Returns (names, masks, migration_deltas) with masks shaped (n_sectors, rows, cols).
+    """
+    if sectors is None:
+        names = list(grid.sectors.keys())
+        masks = np.zeros((len(names), grid.size, grid.size), dtype=bool)
+        for i, (r_slice, c_slice) in enumerate(grid.sectors.values()):
+            masks[i, r_slice, c_slice] = True
+        return names, masks, [MIGRATION_DELTAS[name] for name in names]
+    
+    wedges = compass_sectors(sectors) if isinstance(sectors, int) else list(sectors)
+    options = {"angular_resolution": compass_angular_resolution(sectors)} if isinstance(sectors, int) else {}
+    engine = SectorEngine(np.zeros((grid.size, grid.size)), **options)
+    wedge_masks = [(wedge, engine.wedge_mask(wedge)) for wedge in wedges]
+    wedge_masks = [(wedge, mask) for wedge, mask in wedge_masks if mask.any()]
+    if not wedge_masks:
+        raise ValueError("None of the sectors contains a grid cell; use fewer sectors or a finer grid.")
+    names = [wedge.name for wedge, _ in wedge_masks]
+    masks = np.array([mask for _, mask in wedge_masks])
+    return names, masks, [heading_migration_delta(wedge.heading) for wedge, _ in wedge_masks]
+
+def predict_ensemble(shark_type, ensemble, grid=DEFAULT_GRID, sectors=None, confidence=0.95, table=None):
+    """
+    Monte Carlo version of predict_next_location. `ensemble` holds K stacked environments
+    (see generate_environment_ensemble); all K are scored in one batched operation and their
+    sector averages come from a single (members x cells) @ (cells x sectors) product.
+    Returns the probability of each direction winning, the mean and `confidence` interval of
+    every sector's average HSI, and the distribution of optimal depths across members.
+    """
+    shape = ensemble[HSI_FACTORS[0][0]].shape
+    if shape[1:] != grid.shape:
+        raise ValueError(f"Ensemble members have shape {shape[1:]}, expected {grid.shape} for the grid configuration.")
+    if not 0.0 < confidence < 1.0:
+        raise ValueError(f"Confidence must be between 0 and 1, got {confidence}.")
+    
+    # 1+2. Best score in each water column of every member and the layer it occurs in (scored
+    # in depth chunks, see score_column_max), then every member's sector averages at once
+    table = table or get_profile_table()
+    max_scores_2d, best_layers_2d = score_column_max(shark_type, ensemble, table, grid.depth_bins)
+    members, depth_layers = shape[0], shape[-1]
+    max_scores_2d = max_scores_2d.reshape(members, -1)
+    best_layers_2d = best_layers_2d.reshape(members, -1)
+    names, masks, migration_deltas = sector_masks(grid, sectors)
+    flat_masks = masks.reshape(len(names), -1)
+    sector_averages = (max_scores_2d @ flat_masks.T.astype(float)) / flat_masks.sum(axis=1)
+    
+    # 3. Each member's best direction and the optimal depth inside that sector: the best layer
+    # of the sector's best column (first on ties, like an argmax over its (cell, depth) scores)
+    best_indices = np.argmax(sector_averages, axis=1)
+    optimal_depths = np.zeros(members, dtype=int)
+    for d, mask in enumerate(flat_masks):
+        chosen = best_indices == d
+        if chosen.any():
+            best_cells = np.argmax(max_scores_2d[chosen][:, mask], axis=1)
+            optimal_depths[chosen] = best_layers_2d[chosen][:, mask][np.arange(len(best_cells)), best_cells]
+    
+    # 4. Summarize the spread across members
+    direction_probabilities = np.bincount(best_indices, minlength=len(names)) / members
+    tail = (1.0 - confidence) / 2.0 * 100.0
+    lower, upper = np.percentile(sector_averages, [tail, 100.0 - tail], axis=0)
+    means = sector_averages.mean(axis=0)
+    most_likely = int(np.argmax(direction_probabilities))
+    
+    return {
+        "members": members,
+        "most_likely_direction": names[most_likely],
+        "migration_delta": migration_deltas[most_likely],
+        "direction_probabilities": dict(zip(names, direction_probabilities.tolist())),
+        "confidence": confidence,
+        "sector_hsi": {
+            name: {"mean": float(means[i]), "lower": float(lower[i]), "upper": float(upper[i])}
+            for i, name in enumerate(names)
+        },
+        "optimal_depth_distribution": (np.bincount(optimal_depths, minlength=depth_layers) / members).tolist(),
+        "current_scores_mean": score_column(shark_type, ensemble, grid.center_index, grid.center_index,
+                                            table, grid.depth_bins).mean(axis=0),
     }
 
-    # 6. Find the absolute optimal depth *within the best sector* (for recommended start)
-    r_slice, c_slice = directional_indices[best_direction]
-    scores_in_sector = scores[r_slice, c_slice, :]
+def apply_migration_delta(lat, lon, migration_delta):
+    """
+    Applies a (Delta Lat, Delta Lon) migration vector, wrapping the longitude across the 180/-180
+    meridian and folding latitudes that would run past a pole.
+    """
+    lat_delta, lon_delta = migration_delta
     
-    # Find the maximum index (row, col, depth) relative to the sector slice
-    relative_max_index = np.unravel_index(np.argmax(scores_in_sector), scores_in_sector.shape)
-    optimal_depth = relative_max_index[2]
+    # Handle longitude wrap-around (e.g., crossing the 180/-180 meridian) and pole crossings
+    optimal_lat, optimal_lon = normalize_lat_lon(lat + lat_delta, lon + lon_delta)
+    return float(optimal_lat), float(optimal_lon)
 
-    # Return the migration vector, optimal depth, best sector score, and current score
-    return migration_delta[best_direction], optimal_depth, max_sector_score, best_direction, scores[9, 9, :]
+def build_prediction_record(shark_type, lat, lon, depth, prediction, table=None):
+    """
+    Flattens a predict_next_location result for one starting position (lat, lon, depth layer)
+    into a record with the destination, optimal depth and current/max HSI.
+    """
+    table = table or get_profile_table()
+    migration_delta, optimal_depth, max_sector_score, best_direction, current_scores = prediction
+    destination_lat, destination_lon = apply_migration_delta(lat, lon, migration_delta)
+    return {
+        "species": shark_type,
+        "lat": lat,
+        "lon": lon,
+        "depth": depth,
+        "direction": best_direction,
+        "destination_lat": destination_lat,
+        "destination_lon": destination_lon,
+        "optimal_depth": int(optimal_depth),
+        "sector_hsi": float(max_sector_score),
+        "current_hsi": float(current_scores[depth]),
+        "max_hsi": float(table.max_hsi[table.species_index(shark_type)]),
+    }
 
-# --- 5. MAIN EXECUTION ---
-def run_predictor():
-    """Initializes the environment and runs predictions for the selected shark."""
+# --- 6. MAIN EXECUTION ---
+def run_predictor(seed=None, grid=DEFAULT_GRID, profile=False):
+    """
+    Initializes the environment and runs predictions for the selected shark.
+    Pass a `seed` to reproduce the same simulated environment across runs, and a
+    `grid` (GridConfig) to change the local grid resolution. With `profile`, the time spent
+    in each stage and the cells scored / bytes allocated are printed at the end.
+    """
+    if profile:
+        with instrumented() as instrumentation:
+            _run_predictor(seed, grid)
+        print_instrumentation_report(instrumentation.report())
+    else:
+        _run_predictor(seed, grid)
+
+def print_instrumentation_report(report):
+    """Prints an instrumentation report as a small table."""
+    print("\n--- Stage Timings ---")
+    for name, stats in report["stages"].items():
+        print(f"  {name:<22} {stats['calls']:6d} call(s) {stats['total_seconds'] * 1e3:10.3f} ms total {stats['mean_seconds'] * 1e3:9.3f} ms mean")
+    for name, value in report["counters"].items():
+        print(f"  {name:<22} {value:,}")
+
+def _run_predictor(seed, grid):
     print("--- 3D Predictive Habitat Model Initialized (Global Coordinates) ---")
-    print(f"Local simulation covers a {LOCAL_GRID_DEGREE_SPAN}°x{LOCAL_GRID_DEGREE_SPAN}° area to assess migratory potential.")
-    
-    ocean_environment = generate_simulated_environment(GRID_SIZE, DEPTH_LAYERS)
+    print(f"Local simulation covers a {grid.degree_span}°x{grid.degree_span}° area to assess migratory potential.")
     
-    selected_shark = ask_for_shark_type()
-    profile = SHARK_PROFILES[selected_shark]
+    ocean_environment = generate_simulated_environment(grid.size, grid.depth_layers, rng=seed, depth_bins=grid.depth_bins)
     
-    start_lat, start_lon, start_row, start_col, start_depth = ask_for_current_location()
+    with INSTRUMENTATION.stage("input"):
+        selected_shark = ask_for_shark_type()
+        start_lat, start_lon, start_row, start_col, start_depth = ask_for_current_location(grid)
     
     print(f"\nAnalyzing conditions for the {selected_shark} at: ({start_lat:.4f}°, {start_lon:.4f}°)...")
 
     # Run the 6-month migration prediction
-    (lat_delta, lon_delta), optimal_depth, max_sector_score, best_direction, current_scores = predict_next_location(selected_shark, ocean_environment)
+    with INSTRUMENTATION.stage("predict"):
+        (lat_delta, lon_delta), optimal_depth, max_sector_score, best_direction, current_scores = predict_next_location(selected_shark, ocean_environment, grid)
     
-    # Calculate the predicted 6-month destination
-    optimal_lat = start_lat + lat_delta
-    optimal_lon = start_lon + lon_delta
-    
-    # Handle longitude wrap-around (e.g., crossing the 180/-180 meridian)
-    if optimal_lon > 180.0:
-        optimal_lon -= 360.0
-    elif optimal_lon < -180.0:
-        optimal_lon += 360.0
+    with INSTRUMENTATION.stage("output"):
+        # Calculate the predicted 6-month destination (wrapping across the 180/-180 meridian and the poles)
+        optimal_lat, optimal_lon = apply_migration_delta(start_lat, start_lon, (lat_delta, lon_delta))
 
-    # The current HSI score is fixed at the center of the grid (index 9, 9)
-    current_score = current_scores[start_depth]
+        # The current HSI score is fixed at the center of the grid (grid.center_index)
+        current_score = current_scores[start_depth]
     
-    # Calculate Max HSI
-    max_hsi = calculate_max_hsi(profile)
+        # Max HSI (precomputed in the compiled profile table)
+        table = get_profile_table()
+        max_hsi = table.max_hsi[table.species_index(selected_shark)]
     
-    # Environmental factors at the current location (center of the local map, fixed row/col)
-    current_coastal_factor = ocean_environment["coastal_map"][start_row, start_col, start_depth]
-    current_eddy_influence = ocean_environment["eddy_strength"][start_row, start_col, start_depth]
-    current_phytoplankton = ocean_environment["phytoplankton_abundance"][start_row, start_col, start_depth]
+        # Environmental factors at the current location (center of the local map, fixed row/col)
+        current_coastal_factor = ocean_environment["coastal_map"][start_row, start_col, start_depth]
+        current_eddy_influence = ocean_environment["eddy_strength"][start_row, start_col, start_depth]
+        current_phytoplankton = ocean_environment["phytoplankton_abundance"][start_row, start_col, start_depth]
     
-    # Helper to interpret depth layer
-    def get_depth_label(layer):
-        return ["Shallow (0-20m)", "Mid-Water (20-150m)", "Deep/Twilight (>150m)"][layer]
+        # Helper to interpret depth layer
+        get_depth_label = grid.depth_label
         
-    print("\n--- Habitat Suitability Analysis & 6-MONTH MIGRATION PREDICTION ---")
-    
-    current_habitat = "Conceptual Open Ocean"
-    if start_row < 5:
-         current_habitat = "Conceptual Transition Zone" if current_coastal_factor > 0.4 else "Open Ocean"
-    if start_row == 0:
-        current_habitat = "Conceptual Coastal Shelf"
-    
-    # Output the results
-    print(f"\n==========================================")
-    print(f"[{selected_shark.upper()} - Migratory Potential]")
-    print(f"THEORETICAL MAXIMUM SUITABILITY: {max_hsi:.2f}")
-    print(f"==========================================")
-    
-    print(f"  --- CURRENT POSITION SUITABILITY ---")
-    print(f"  Coordinates: ({start_lat:.4f}°, {start_lon:.4f}°)")
-    print(f"  Current Depth: {get_depth_label(start_depth)} ({start_depth})")
-    print(f"  Current Suitability Score: {current_score:.2f} ({(current_score/max_hsi)*100:.1f}% of Max)")
-    print(f"  - Key Environmental Factors (Local Simulation):")
-    print(f"    - Phytoplankton (PACE/MODIS): {current_phytoplankton:.2f}")
-    print(f"    - Eddy Influence (SWOT): {current_eddy_influence:.2f}")
-    
-    print(f"  --- PREDICTED 6-MONTH MIGRATION ---")
-    print(f"  Optimal Direction: {best_direction.upper()} (Sector Avg HSI: {max_sector_score:.2f})")
-    print(f"  Predicted Destination Coordinates: ({optimal_lat:.4f}°, {optimal_lon:.4f}°)")
-    print(f"  Recommended Starting Depth for Migration: {get_depth_label(optimal_depth)}")
-    print(f"  Est. Migratory Distance: ~15 degrees Lat/Lon change.")
+        print("\n--- Habitat Suitability Analysis & 6-MONTH MIGRATION PREDICTION ---")
+    
+        current_habitat = "Conceptual Open Ocean"
+        if start_row < grid.size // 4:
+             current_habitat = "Conceptual Transition Zone" if current_coastal_factor > 0.4 else "Open Ocean"
+        if start_row == 0:
+            current_habitat = "Conceptual Coastal Shelf"
+    
+        # Output the results
+        print(f"\n==========================================")
+        print(f"[{selected_shark.upper()} - Migratory Potential]")
+        print(f"THEORETICAL MAXIMUM SUITABILITY: {max_hsi:.2f}")
+        print(f"==========================================")
+    
+        print(f"  --- CURRENT POSITION SUITABILITY ---")
+        print(f"  Coordinates: ({start_lat:.4f}°, {start_lon:.4f}°)")
+        print(f"  Current Depth: {get_depth_label(start_depth)} ({start_depth})")
+        print(f"  Current Suitability Score: {current_score:.2f} ({(current_score/max_hsi)*100:.1f}% of Max)")
+        print(f"  - Key Environmental Factors (Local Simulation):")
+        print(f"    - Phytoplankton (PACE/MODIS): {current_phytoplankton:.2f}")
+        print(f"    - Eddy Influence (SWOT): {current_eddy_influence:.2f}")
+    
+        print(f"  --- PREDICTED 6-MONTH MIGRATION ---")
+        print(f"  Optimal Direction: {best_direction.upper()} (Sector Avg HSI: {max_sector_score:.2f})")
+        print(f"  Predicted Destination Coordinates: ({optimal_lat:.4f}°, {optimal_lon:.4f}°)")
+        print(f"  Recommended Starting Depth for Migration: {get_depth_label(optimal_depth)}")
+        print(f"  Est. Migratory Distance: ~15 degrees Lat/Lon change.")
+
+# --- COMMAND LINE ---
+
+def build_arg_parser():
+    import argparse  # Only needed when run as a script; kept out of the module import
+    parser = argparse.ArgumentParser(description="Predict shark migration from habitat suitability (interactive).")
+    parser.add_argument("--list-species", action="store_true", help="print the species names and exit")
+    parser.add_argument("--validate-profiles", action="store_true", help="check the profiles file and exit")
+    parser.add_argument("--profiles-file", default=None, help=f"profiles JSON to validate (default: {os.path.basename(PROFILES_FILE)})")
+    parser.add_argument("--startup-metrics", action="store_true", help="print startup timings to stderr on exit")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the simulated environment (reproducible runs)")
+    parser.add_argument("--grid-size", type=int, default=DEFAULT_GRID.size, help="horizontal cells per side of the local grid")
+    parser.add_argument("--depth-layers", type=int, default=DEFAULT_GRID.depth_layers, help="number of depth layers")
+    parser.add_argument("--degree-span", type=float, default=DEFAULT_GRID.degree_span, help="degrees covered by the local grid")
+    parser.add_argument("--profile", action="store_true", help="print per-stage timings after the prediction")
+    return parser
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    try:
+        if args.list_species:
+            for name in get_shark_profiles():
+                print(name)
+        elif args.validate_profiles:
+            path = args.profiles_file or PROFILES_FILE
+            profiles = load_shark_profiles(path, use_cache=False)
+            validate_profiles(profiles)
+            print(f"{len(profiles)} profiles in {path} are valid.")
+        else:
+            grid = GridConfig(args.grid_size, args.depth_layers, args.degree_span)
+            run_predictor(seed=args.seed, grid=grid, profile=args.profile)
+    except (ValueError, OSError) as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+    finally:
+        if args.startup_metrics:
+            metrics = {**startup_metrics(), "seconds_since_import": time.perf_counter() - _IMPORT_STARTED}
+            print(json.dumps(metrics, indent=2), file=sys.stderr)
+    return 0
+
+STARTUP_METRICS["module_import_seconds"] = time.perf_counter() - _IMPORT_STARTED
 
 
 if __name__ == "__main__":
-    run_predictor()
+    sys.exit(main())
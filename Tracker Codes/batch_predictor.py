@@ -0,0 +1,343 @@
+"""
+Non-interactive batch prediction over a file of tag positions.
+
+Reads (species, lat, lon, depth) rows from a CSV or Parquet file, runs the 6-month migration
+prediction for every row and streams the results (direction, destination, optimal depth,
+current/max HSI) to a CSV or Parquet output file. The simulated environment is generated once
+and each species is scored once, then shared by every row of the batch.
+
+With --workers, rows are scored in chunks by a process pool. The environment arrays are placed
+in shared memory once and every worker maps them read-only instead of receiving a pickled copy.
+Output order always matches input order, whatever the worker count.
+
+With --environment-store, every row is scored on the window around its own position, cut out
+of one on-disk environment store (see environment_store.py) instead of a simulated local grid.
+
+Usage:
+    python batch_predictor.py positions.csv predictions.csv --seed 42
+    python batch_predictor.py positions.csv predictions.csv --seed 42 --workers 8
+    python batch_predictor.py positions.csv predictions.csv --environment-store region_store --workers 8
+"""
+import argparse
+import csv
+import itertools
+import multiprocessing
+import os
+import sys
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from environment_store import LAYER_NAMES, EnvironmentStore, GlobalEnvironment, open_environment_store
+from Predictor import (
+    DEFAULT_GRID,
+    GridConfig,
+    build_prediction_record,
+    generate_simulated_environment,
+    get_profile_table,
+    predict_next_location,
+)
+
+INPUT_COLUMNS = ("species", "lat", "lon", "depth")
+OUTPUT_COLUMNS = (
+    "species", "lat", "lon", "depth",
+    "direction", "destination_lat", "destination_lon",
+    "optimal_depth", "sector_hsi", "current_hsi", "max_hsi",
+)
+
+# Number of records buffered per Parquet row group when streaming the output
+PARQUET_BATCH_ROWS = 10_000
+
+# Positions sent to a pool worker per task
+DEFAULT_CHUNK_SIZE = 2_000
+
+# --- FILE FORMATS ---
+
+def get_file_format(path):
+    """Returns "csv" or "parquet" based on the file extension."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension in (".parquet", ".pq"):
+        return "parquet"
+    raise ValueError(f"Unsupported file type '{extension}' for {path} (expected .csv or .parquet).")
+
+def _import_pyarrow():
+    """Parquet support is optional: pyarrow is only imported when a Parquet file is used."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as exc:
+        raise ImportError("Parquet files require the 'pyarrow' package (pip install pyarrow).") from exc
+    return pyarrow, pyarrow.parquet
+
+# --- INPUT ---
+
+def parse_position(row, row_number, grid=DEFAULT_GRID):
+    """Validates one input row and returns it as (species, lat, lon, depth)."""
+    missing = [column for column in INPUT_COLUMNS if row.get(column) in (None, "")]
+    if missing:
+        raise ValueError(f"Row {row_number}: missing value for {', '.join(missing)}.")
+    
+    species = str(row["species"]).strip()
+    if species not in get_profile_table().index:  # The current profiles, which may be reloaded
+        raise ValueError(f"Row {row_number}: unknown species '{species}'.")
+    try:
+        lat = float(row["lat"])
+        lon = float(row["lon"])
+        depth = int(row["depth"])
+    except (TypeError, ValueError):
+        raise ValueError(f"Row {row_number}: lat/lon must be numbers and depth an integer layer.") from None
+    
+    # Same ranges the interactive prompts accept
+    if not -90.0 <= lat <= 90.0:
+        raise ValueError(f"Row {row_number}: latitude {lat} is outside -90.0 to 90.0.")
+    if not -180.0 <= lon <= 180.0:
+        raise ValueError(f"Row {row_number}: longitude {lon} is outside -180.0 to 180.0.")
+    if not 0 <= depth < grid.depth_layers:
+        raise ValueError(f"Row {row_number}: depth layer {depth} is outside 0 to {grid.depth_layers - 1}.")
+    return species, lat, lon, depth
+
+def read_positions(path, grid=DEFAULT_GRID):
+    """Yields validated (species, lat, lon, depth) positions from a CSV or Parquet file, one row at a time."""
+    if get_file_format(path) == "csv":
+        with open(path, newline="", encoding="utf-8") as handle:
+            # Row 1 is the header, so data rows start at 2
+            for row_number, row in enumerate(csv.DictReader(handle), start=2):
+                yield parse_position(row, row_number, grid)
+    else:
+        _, parquet = _import_pyarrow()
+        row_number = 0
+        for batch in parquet.ParquetFile(path).iter_batches(columns=list(INPUT_COLUMNS)):
+            for row in batch.to_pylist():
+                row_number += 1
+                yield parse_position(row, row_number, grid)
+
+# --- PREDICTION ---
+
+def predict_positions(positions, environment=None, seed=None, grid=DEFAULT_GRID, species_predictions=None,
+                      global_environment=None):
+    """
+    Yields one prediction record per (species, lat, lon, depth) position.
+    The environment is generated once (from `seed`) unless one is given, and each species is
+    scored against it only the first time it appears; later rows reuse that prediction.
+    Pass a `species_predictions` dict to keep that per-species memo across calls.
+    With a `global_environment` (GlobalEnvironment or EnvironmentStore), each row is instead
+    scored on the window around its own position, sliced out of the shared global layers, and
+    its current HSI is read at its own cell of that window (off-center at a pole or regional edge).
+    """
+    if global_environment is not None:
+        grid = global_environment.grid_for(grid)
+        for species, lat, lon, depth in positions:
+            prediction = predict_next_location(species, global_environment.window(lat, lon, grid), grid,
+                                               current_cell=global_environment.window_cell(lat, lon, grid))
+            yield build_prediction_record(species, lat, lon, depth, prediction)
+        return
+    
+    if environment is None:
+        environment = generate_simulated_environment(grid.size, grid.depth_layers, rng=seed, depth_bins=grid.depth_bins)
+    
+    if species_predictions is None:
+        species_predictions = {}
+    for species, lat, lon, depth in positions:
+        prediction = species_predictions.get(species)
+        if prediction is None:
+            prediction = species_predictions[species] = predict_next_location(species, environment, grid)
+        yield build_prediction_record(species, lat, lon, depth, prediction)
+
+# --- PARALLEL PREDICTION ---
+
+def share_environment(environment):
+    """
+    Copies each environment layer into its own shared memory block.
+    Returns (blocks, layout): the SharedMemory handles (owned by the caller, who must close and
+    unlink them) and a picklable {layer: (block_name, shape, dtype)} layout for the workers.
+    """
+    blocks = []
+    layout = {}
+    try:
+        for layer_name, layer in environment.items():
+            layer = np.ascontiguousarray(layer)
+            block = shared_memory.SharedMemory(create=True, size=max(layer.nbytes, 1))
+            blocks.append(block)
+            np.ndarray(layer.shape, dtype=layer.dtype, buffer=block.buf)[...] = layer
+            layout[layer_name] = (block.name, layer.shape, layer.dtype.str)
+    except BaseException:
+        release_shared_environment(blocks)
+        raise
+    return blocks, layout
+
+def release_shared_environment(blocks):
+    """Closes and removes the shared memory blocks created by share_environment."""
+    for block in blocks:
+        block.close()
+        block.unlink()
+
+def attach_shared_environment(layout):
+    """
+    Maps a shared environment layout back into read-only NumPy arrays (no copy).
+    Returns (environment, blocks); keep the blocks alive for as long as the arrays are used.
+    """
+    environment = {}
+    blocks = []
+    for layer_name, (block_name, shape, dtype) in layout.items():
+        block = shared_memory.SharedMemory(name=block_name)
+        blocks.append(block)
+        layer = np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+        layer.flags.writeable = False
+        environment[layer_name] = layer
+    return environment, blocks
+
+# Per-worker state, set once by _init_worker when the pool starts
+_worker_state = {}
+
+def _init_worker(layout, grid, global_bounds=None, depth_bins=None, store_path=None):
+    global_environment = None
+    blocks = []
+    environment = None
+    if store_path is not None:
+        # The store is memory-mapped again in each worker; the OS page cache shares the pages
+        global_environment = open_environment_store(store_path)
+    else:
+        environment, blocks = attach_shared_environment(layout)
+        if global_bounds is not None:
+            global_environment = GlobalEnvironment(environment, global_bounds, depth_bins)
+            environment = None
+    _worker_state.update(environment=environment, global_environment=global_environment, blocks=blocks,
+                         grid=grid, species_predictions={})
+
+def _predict_chunk(chunk):
+    return list(predict_positions(
+        chunk,
+        environment=_worker_state["environment"],
+        grid=_worker_state["grid"],
+        species_predictions=_worker_state["species_predictions"],
+        global_environment=_worker_state["global_environment"],
+    ))
+
+def iter_chunks(iterable, chunk_size):
+    """Splits an iterable into lists of at most `chunk_size` items."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+def predict_positions_parallel(positions, workers=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                               environment=None, seed=None, grid=DEFAULT_GRID, global_environment=None):
+    """
+    Parallel version of predict_positions: positions are split into chunks of `chunk_size`
+    and scored by a pool of `workers` processes (default: one per CPU). The environment is
+    shared with the workers through shared memory, read-only. Records are yielded in input order.
+    An EnvironmentStore is not copied at all: each worker memory-maps the same files.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers < 1:
+        raise ValueError(f"Worker count must be at least 1, got {workers}.")
+    if chunk_size < 1:
+        raise ValueError(f"Chunk size must be at least 1, got {chunk_size}.")
+    blocks, layout = [], None
+    if isinstance(global_environment, EnvironmentStore):
+        initargs = (layout, grid, None, None, global_environment.path)
+    elif global_environment is not None:
+        global_layers = {layer_name: global_environment.layer(layer_name) for layer_name in LAYER_NAMES}
+        blocks, layout = share_environment(global_layers)
+        initargs = (layout, grid, global_environment.bounds, global_environment.depth_bins)
+    else:
+        if environment is None:
+            environment = generate_simulated_environment(grid.size, grid.depth_layers, rng=seed, depth_bins=grid.depth_bins)
+        blocks, layout = share_environment(environment)
+        initargs = (layout, grid)
+    
+    try:
+        with multiprocessing.Pool(workers, initializer=_init_worker, initargs=initargs) as pool:
+            # imap (not imap_unordered) keeps the output in input order
+            for records in pool.imap(_predict_chunk, iter_chunks(positions, chunk_size)):
+                yield from records
+    finally:
+        release_shared_environment(blocks)
+
+# --- OUTPUT ---
+
+def write_predictions(records, path):
+    """Streams prediction records to a CSV or Parquet file as they arrive. Returns the number written."""
+    count = 0
+    if get_file_format(path) == "csv":
+        with open(path, "w", newline="", encoding="utf-8") as handle:
+            writer = csv.DictWriter(handle, fieldnames=OUTPUT_COLUMNS)
+            writer.writeheader()
+            for record in records:
+                writer.writerow(record)
+                count += 1
+        return count
+    
+    pyarrow, parquet = _import_pyarrow()
+    writer = None
+    buffer = []
+    try:
+        for record in records:
+            buffer.append(record)
+            count += 1
+            if len(buffer) >= PARQUET_BATCH_ROWS:
+                table = pyarrow.Table.from_pylist(buffer)
+                writer = writer or parquet.ParquetWriter(path, table.schema)
+                writer.write_table(table)
+                buffer = []
+        if buffer or writer is None:
+            table = pyarrow.Table.from_pylist(buffer) if buffer else pyarrow.table({column: [] for column in OUTPUT_COLUMNS})
+            writer = writer or parquet.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+    return count
+
+def run_batch(input_path, output_path, seed=None, grid=DEFAULT_GRID, workers=1, chunk_size=DEFAULT_CHUNK_SIZE,
+              store_path=None):
+    """
+    Predicts every position in `input_path` and writes the results to `output_path`.
+    `workers` > 1 (or None for one per CPU) scores the rows with a process pool, and `store_path`
+    scores each row on its own window of an environment store. Returns the row count.
+    """
+    positions = read_positions(input_path, grid)
+    global_environment = open_environment_store(store_path) if store_path else None
+    if workers == 1:
+        records = predict_positions(positions, seed=seed, grid=grid, global_environment=global_environment)
+    else:
+        records = predict_positions_parallel(positions, workers=workers, chunk_size=chunk_size, seed=seed, grid=grid,
+                                             global_environment=global_environment)
+    return write_predictions(records, output_path)
+
+# --- COMMAND LINE ---
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Run 6-month migration predictions for a file of shark positions.")
+    parser.add_argument("input", help="CSV or Parquet file with species, lat, lon, depth columns")
+    parser.add_argument("output", help="CSV or Parquet file to write the predictions to")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the simulated environment (reproducible runs)")
+    parser.add_argument("--grid-size", type=int, default=DEFAULT_GRID.size, help="horizontal cells per side of the local grid")
+    parser.add_argument("--depth-layers", type=int, default=DEFAULT_GRID.depth_layers, help="number of depth layers")
+    parser.add_argument("--degree-span", type=float, default=DEFAULT_GRID.degree_span, help="degrees covered by the local grid")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes (0 = one per CPU, 1 = no pool)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="positions per worker task")
+    parser.add_argument("--environment-store", default=None, help="environment store to cut each row's window from")
+    return parser
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    try:
+        grid = GridConfig(args.grid_size, args.depth_layers, args.degree_span)
+        workers = args.workers or None
+        count = run_batch(args.input, args.output, seed=args.seed, grid=grid,
+                          workers=workers, chunk_size=args.chunk_size, store_path=args.environment_store)
+    except (ValueError, ImportError, OSError) as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+    print(f"Wrote {count} predictions to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
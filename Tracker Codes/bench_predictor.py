@@ -0,0 +1,248 @@
+"""
+Benchmarks for the predictor hot paths, with a regression check against a stored baseline.
+
+Every case runs over a parameter matrix of grid sizes, depth layer counts and species counts:
+
+    generate_environment    generate_simulated_environment(size, depth)
+    predict_next_location   one species on one local grid
+    predict_all_species     `species` species scored in one pass
+    map_lat_lon_to_grid     vectorized mapping of 100,000 positions
+    map_grid_to_lat_lon     vectorized mapping of 100,000 grid cells
+    calculate_max_hsi       max HSI of `species` profiles
+
+Each case is timed over several samples (each sample long enough to be measured reliably) and
+reports latency percentiles, throughput and peak traced memory (measured in a separate run, so
+tracing does not distort the timings). Results go to a JSON file; with --baseline, every case's
+median latency is compared with the baseline's and the run fails (exit code 1) if any case got
+slower by more than --threshold.
+
+Usage:
+    python bench_predictor.py --output bench_baseline.json
+    python bench_predictor.py --baseline bench_baseline.json --threshold 0.2
+    python bench_predictor.py --sizes 20 100 --depths 3 12 --species 1 42 --output bench.json
+"""
+import argparse
+import itertools
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from Predictor import (
+    SHARK_PROFILES,
+    GridConfig,
+    calculate_max_hsi,
+    generate_simulated_environment,
+    get_profile_table,
+    map_grid_to_lat_lon_relative,
+    map_lat_lon_to_grid,
+    predict_all_species,
+    predict_next_location,
+)
+
+BENCH_FORMAT_VERSION = 1
+DEFAULT_SIZES = [20, 50, 100]
+DEFAULT_DEPTHS = [3, 12]
+DEFAULT_SPECIES_COUNTS = [1, 42]
+DEFAULT_SAMPLES = 15
+DEFAULT_THRESHOLD = 0.20  # Fail when a case's median latency grows by more than 20%
+MIN_SAMPLE_SECONDS = 0.01  # Each sample repeats the call until it lasts at least this long
+MAPPED_POSITIONS = 100_000
+
+# --- CASES ---
+
+def build_cases(sizes, depths, species_counts, seed=0):
+    """
+    Yields (name, params, items, setup) for the whole parameter matrix. `setup()` returns the
+    zero-argument callable to time; `items` is how many units of work one call does (for
+    throughput).
+    """
+    names = list(get_profile_table().names)
+    for species_count in species_counts:
+        if not 1 <= species_count <= len(names):
+            raise ValueError(f"Species count must be between 1 and {len(names)} (the loaded profiles), got {species_count}.")
+    for size, depth in itertools.product(sizes, depths):
+        grid = GridConfig(size, depth)
+        params = {"size": size, "depth": depth}
+
+        def generate(size=size, depth=depth):
+            rng = np.random.default_rng(seed)
+            return lambda: generate_simulated_environment(size, depth, rng=rng)
+        yield "generate_environment", params, size * size * depth, generate
+
+        def predict_one(size=size, depth=depth, grid=grid):
+            environment = generate_simulated_environment(size, depth, rng=seed)
+            return lambda: predict_next_location(names[0], environment, grid)
+        yield "predict_next_location", params, 1, predict_one
+
+        for species_count in species_counts:
+            def predict_many(size=size, depth=depth, grid=grid, species_count=species_count):
+                environment = generate_simulated_environment(size, depth, rng=seed)
+                species_names = names[:species_count]
+                return lambda: predict_all_species(environment, species_names, grid)
+            yield "predict_all_species", {**params, "species": species_count}, species_count, predict_many
+
+    for size in sizes:
+        grid = GridConfig(size)
+
+        def map_positions(grid=grid):
+            rng = np.random.default_rng(seed)
+            lats = rng.uniform(-grid.half_span, grid.half_span, MAPPED_POSITIONS) + 20.0
+            lons = rng.uniform(-grid.half_span, grid.half_span, MAPPED_POSITIONS) + 30.0
+            return lambda: map_lat_lon_to_grid(lats, lons, 20.0, 30.0, grid)
+        yield "map_lat_lon_to_grid", {"size": size}, MAPPED_POSITIONS, map_positions
+
+        def map_cells(grid=grid):
+            rng = np.random.default_rng(seed)
+            rows = rng.integers(0, grid.size, MAPPED_POSITIONS)
+            cols = rng.integers(0, grid.size, MAPPED_POSITIONS)
+            return lambda: map_grid_to_lat_lon_relative(rows, cols, 20.0, 30.0, grid)
+        yield "map_grid_to_lat_lon", {"size": size}, MAPPED_POSITIONS, map_cells
+
+    for species_count in species_counts:
+        def max_hsi(species_count=species_count):
+            profiles = [SHARK_PROFILES[name] for name in names[:species_count]]
+            return lambda: [calculate_max_hsi(profile) for profile in profiles]
+        yield "calculate_max_hsi", {"species": species_count}, species_count, max_hsi
+
+def case_key(name, params):
+    """Stable identifier of a case, e.g. 'predict_all_species[size=20,depth=3,species=42]'."""
+    return f"{name}[{','.join(f'{key}={value}' for key, value in params.items())}]"
+
+# --- MEASUREMENT ---
+
+def _calls_per_sample(function):
+    """Like timeit's autorange: how many calls make one sample last at least MIN_SAMPLE_SECONDS."""
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            function()
+        if time.perf_counter() - started >= MIN_SAMPLE_SECONDS:
+            return number
+        number *= 2
+
+def peak_memory(function):
+    """Peak bytes traced by tracemalloc during one call (NumPy reports its buffers to it)."""
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def measure(function, items, samples=DEFAULT_SAMPLES):
+    """Latency percentiles (seconds per call), throughput (items per second) and peak memory of one case."""
+    function()  # Warm-up (caches, lazy tables)
+    number = _calls_per_sample(function)
+    latencies = np.empty(samples)
+    for i in range(samples):
+        started = time.perf_counter()
+        for _ in range(number):
+            function()
+        latencies[i] = (time.perf_counter() - started) / number
+    p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+    return {
+        "calls_per_sample": number,
+        "samples": samples,
+        "latency_p50": float(p50),
+        "latency_p90": float(p90),
+        "latency_p99": float(p99),
+        "latency_mean": float(latencies.mean()),
+        "throughput": items / float(p50),
+        "peak_memory_bytes": peak_memory(function),
+    }
+
+def run_benchmarks(sizes=DEFAULT_SIZES, depths=DEFAULT_DEPTHS, species_counts=DEFAULT_SPECIES_COUNTS,
+                   samples=DEFAULT_SAMPLES, pattern=None, log=None):
+    """Runs every case (optionally only those whose key contains `pattern`) and returns the results document."""
+    results = {}
+    for name, params, items, setup in build_cases(sizes, depths, species_counts):
+        key = case_key(name, params)
+        if pattern and pattern not in key:
+            continue
+        results[key] = {"case": name, "params": params, "items": items, **measure(setup(), items, samples)}
+        if log:
+            log(f"{key:<60} p50 {results[key]['latency_p50'] * 1e3:10.3f} ms  "
+                f"{results[key]['throughput']:14.1f} items/s  {results[key]['peak_memory_bytes'] / 1e6:8.2f} MB")
+    return {
+        "format_version": BENCH_FORMAT_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+# --- BASELINE COMPARISON ---
+
+def compare_to_baseline(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compares median latencies case by case. Returns a list of (key, baseline_p50, current_p50,
+    ratio, regressed) for every case present in both documents.
+    """
+    comparison = []
+    for key, result in current["results"].items():
+        reference = baseline.get("results", {}).get(key)
+        if reference is None:
+            continue
+        ratio = result["latency_p50"] / reference["latency_p50"]
+        comparison.append((key, reference["latency_p50"], result["latency_p50"], ratio, ratio > 1.0 + threshold))
+    return comparison
+
+# --- ENTRY POINT ---
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Benchmark the predictor hot paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="grid sizes")
+    parser.add_argument("--depths", type=int, nargs="+", default=DEFAULT_DEPTHS, help="depth layer counts")
+    parser.add_argument("--species", type=int, nargs="+", default=DEFAULT_SPECIES_COUNTS, help="species counts")
+    parser.add_argument("--samples", type=int, default=DEFAULT_SAMPLES, help="timed samples per case")
+    parser.add_argument("--filter", default=None, help="only run cases whose name contains this text")
+    parser.add_argument("--output", default=None, help="JSON file to write the results to")
+    parser.add_argument("--baseline", default=None, help="JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed median latency growth before a case counts as a regression (0.2 = 20%%)")
+    return parser
+
+def main(argv=None):
+    parser = build_arg_parser()
+    args = parser.parse_args(argv)
+    species_total = len(get_profile_table().names)
+    for species_count in args.species:
+        if not 1 <= species_count <= species_total:
+            # A larger count would be silently truncated yet still recorded in the case key
+            parser.error(f"--species counts must be between 1 and {species_total} (the loaded profiles), got {species_count}")
+    try:
+        baseline = None
+        if args.baseline:
+            with open(args.baseline, encoding="utf-8") as handle:
+                baseline = json.load(handle)
+        current = run_benchmarks(args.sizes, args.depths, args.species, args.samples, args.filter, log=print)
+    except (ValueError, OSError) as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(current, handle, indent=2)
+
+    if baseline is None:
+        return 0
+    comparison = compare_to_baseline(current, baseline, args.threshold)
+    print(f"\nCompared with {args.baseline} ({len(comparison)} common cases, threshold +{args.threshold:.0%}):")
+    for key, reference, latest, ratio, regressed in comparison:
+        flag = "REGRESSION" if regressed else ""
+        print(f"  {key:<60} {reference * 1e3:10.3f} -> {latest * 1e3:10.3f} ms  x{ratio:5.2f} {flag}")
+    regressions = sum(regressed for *_, regressed in comparison)
+    if regressions:
+        print(f"{regressions} case(s) regressed beyond the threshold.", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,300 @@
+"""
+Memory-mapped on-disk environment store for large regional grids.
+
+A store is a directory holding one .npy file per environment layer plus a metadata.json header:
+
+    region_store/
+        metadata.json                 bounds, resolution, depth bins, shape, dtype, layer names
+        coastal_map.npy               (rows, cols, depth) raster, row 0 = northern edge
+        phytoplankton_abundance.npy
+        eddy_strength.npy
+
+Layers are opened lazily as read-only memory maps, so a raster far larger than RAM can be used:
+window() slices the local prediction grid around a position as a view, and only the pages of
+that window are ever read from disk.
+
+GlobalEnvironment provides the same windowed lookup for rasters already in memory; a store
+covering all 360° of longitude wraps windows across the antimeridian.
+"""
+import json
+import math
+import os
+
+import numpy as np
+
+from Predictor import (
+    DEFAULT_DEPTH_BINS,
+    DEFAULT_GRID,
+    HSI_FACTORS,
+    build_prediction_record,
+    predict_next_location,
+)
+
+STORE_FORMAT_VERSION = 1
+METADATA_FILE = "metadata.json"
+
+# The layers every store must provide, in the order the HSI uses them
+LAYER_NAMES = tuple(layer_name for layer_name, _ in HSI_FACTORS)
+
+# --- WRITING ---
+
+def create_environment_store(path, bounds, resolution, depth_bins=DEFAULT_DEPTH_BINS, dtype="float64"):
+    """
+    Creates an empty store at `path` covering `bounds` = (lat_min, lat_max, lon_min, lon_max)
+    at `resolution` degrees per cell, with one layer per depth bin.
+    Returns the store opened for writing so the layers can be filled region by region.
+    """
+    lat_min, lat_max, lon_min, lon_max = (float(value) for value in bounds)
+    if lat_min >= lat_max or lon_min >= lon_max:
+        raise ValueError(f"Invalid bounds {bounds}: expected (lat_min, lat_max, lon_min, lon_max).")
+    if resolution <= 0:
+        raise ValueError(f"Resolution must be positive, got {resolution}.")
+
+    rows = round((lat_max - lat_min) / resolution)
+    cols = round((lon_max - lon_min) / resolution)
+    if not (math.isclose(rows * resolution, lat_max - lat_min) and math.isclose(cols * resolution, lon_max - lon_min)):
+        raise ValueError(f"Bounds {bounds} are not a whole number of {resolution}° cells.")
+
+    metadata = {
+        "format_version": STORE_FORMAT_VERSION,
+        "layers": list(LAYER_NAMES),
+        "shape": [rows, cols, len(depth_bins)],
+        "dtype": np.dtype(dtype).str,
+        "bounds": {"lat_min": lat_min, "lat_max": lat_max, "lon_min": lon_min, "lon_max": lon_max},
+        "resolution": float(resolution),
+        "depth_bins": [list(depth_bin) for depth_bin in depth_bins],
+    }
+    os.makedirs(path, exist_ok=True)
+    for layer_name in LAYER_NAMES:
+        layer = np.lib.format.open_memmap(
+            os.path.join(path, f"{layer_name}.npy"), mode="w+", dtype=dtype, shape=tuple(metadata["shape"])
+        )
+        del layer  # Flushes the header and allocates the file
+    with open(os.path.join(path, METADATA_FILE), "w", encoding="utf-8") as handle:
+        json.dump(metadata, handle, indent=2)
+    return EnvironmentStore(path, mode="r+")
+
+def write_environment_store(path, environment, bounds, depth_bins=DEFAULT_DEPTH_BINS):
+    """Writes an in-memory environment dict (row 0 = northern edge) to a new store at `path`."""
+    shape = environment[LAYER_NAMES[0]].shape
+    resolution = (bounds[1] - bounds[0]) / shape[0]
+    if len(depth_bins) != shape[2]:
+        raise ValueError(f"Environment has {shape[2]} depth layers but {len(depth_bins)} depth bins were given.")
+
+    store = create_environment_store(path, bounds, resolution, depth_bins, dtype=environment[LAYER_NAMES[0]].dtype)
+    if store.shape != shape:
+        raise ValueError(f"Environment shape {shape} does not match the bounds and resolution ({store.shape}).")
+    for layer_name in LAYER_NAMES:
+        layer = store.layer(layer_name)
+        layer[...] = environment[layer_name]
+        layer.flush()
+    return store
+
+# --- GLOBAL ENVIRONMENT WINDOWS ---
+
+class GlobalEnvironment:
+    """
+    A georeferenced environment raster covering a region (or the whole globe), with row 0 at the
+    northern edge. window() cuts the local prediction grid around any position out of it, so
+    thousands of predictions can share one loaded environment instead of allocating a grid each.
+    """
+
+    def __init__(self, layers, bounds, depth_bins=DEFAULT_DEPTH_BINS):
+        missing = set(LAYER_NAMES) - set(layers)
+        if missing:
+            raise ValueError(f"Global environment is missing layers: {', '.join(sorted(missing))}.")
+        self._layers = dict(layers)
+        self._shape = tuple(self._layers[LAYER_NAMES[0]].shape)
+        lat_min, lat_max, lon_min, lon_max = (float(value) for value in bounds)
+        self._bounds = (lat_min, lat_max, lon_min, lon_max)
+        self._resolution = (lat_max - lat_min) / self._shape[0]
+        if not math.isclose(self._resolution * self._shape[1], lon_max - lon_min):
+            raise ValueError(f"Bounds {bounds} do not give square cells for a {self._shape[:2]} raster.")
+        self._depth_bins = [list(depth_bin) for depth_bin in depth_bins]
+
+    @property
+    def shape(self):
+        return self._shape
+
+    @property
+    def bounds(self):
+        return self._bounds
+
+    @property
+    def resolution(self):
+        return self._resolution
+
+    @property
+    def depth_bins(self):
+        return self._depth_bins
+
+    @property
+    def wraps_longitude(self):
+        """True when the raster covers all 360° of longitude, so windows wrap across the antimeridian."""
+        return math.isclose(self._bounds[3] - self._bounds[2], 360.0)
+
+    def layer(self, layer_name):
+        """Returns the full (rows, cols, depth) array of one layer."""
+        return self._layers[layer_name]
+
+    def cell_index(self, lat, lon):
+        """Row/Col of the raster cell containing (lat, lon). Row 0 is the northern edge."""
+        lat_min, lat_max, lon_min, lon_max = self.bounds
+        if self.wraps_longitude:
+            # Any longitude maps onto the raster: fold it into [lon_min, lon_min + 360)
+            lon = (lon - lon_min) % 360.0 + lon_min
+        if not (lat_min <= lat <= lat_max and lon_min <= lon <= lon_max):
+            raise ValueError(f"Position ({lat}, {lon}) is outside the environment bounds {self.bounds}.")
+        row = min(int((lat_max - lat) / self.resolution), self.shape[0] - 1)
+        col = min(int((lon - lon_min) / self.resolution), self.shape[1] - 1)
+        return row, col
+
+    def cell_indices(self, lat, lon):
+        """Vectorized cell_index for arrays of positions; returns (rows, cols) index arrays."""
+        lat_min, lat_max, lon_min, lon_max = self.bounds
+        lat = np.asarray(lat, dtype=float)
+        lon = np.asarray(lon, dtype=float)
+        if self.wraps_longitude:
+            lon = (lon - lon_min) % 360.0 + lon_min
+        outside = (lat < lat_min) | (lat > lat_max) | (lon < lon_min) | (lon > lon_max)
+        if np.any(outside):
+            first = np.flatnonzero(outside)[0]
+            raise ValueError(f"Position ({lat.flat[first]}, {lon.flat[first]}) is outside the environment bounds {self.bounds}.")
+        rows = np.minimum(((lat_max - lat) / self.resolution).astype(int), self.shape[0] - 1)
+        cols = np.minimum(((lon - lon_min) / self.resolution).astype(int), self.shape[1] - 1)
+        return rows, cols
+
+    def check_grid(self, grid):
+        """Raises a ValueError when local grids of this configuration cannot be cut from the raster."""
+        if not math.isclose(grid.degrees_per_cell, self.resolution):
+            raise ValueError(f"Grid resolution {grid.degrees_per_cell}° does not match the environment resolution {self.resolution}°.")
+        if grid.depth_layers != self.shape[2]:
+            raise ValueError(f"Grid has {grid.depth_layers} depth layers, the environment has {self.shape[2]}.")
+        if grid.size > self.shape[0] or grid.size > self.shape[1]:
+            raise ValueError(f"Grid of {grid.size} cells is larger than the environment {self.shape[:2]}.")
+
+    def grid_for(self, grid):
+        """
+        `grid` with this environment's depth bins, so every tool weights the species' depth
+        preferences at the same depths in meters. Bins that do not describe the grid's layers
+        are left out (check_grid reports such a grid).
+        """
+        if len(self.depth_bins) != grid.depth_layers:
+            return grid
+        return grid.with_depth_bins(self.depth_bins)
+
+    def window_origin(self, lat, lon, grid=DEFAULT_GRID):
+        """
+        Raster Row/Col of the top-left cell of the local grid around (lat, lon). The position
+        lands on grid.center_index, except near the poles and the edges of a regional raster,
+        where the window is shifted inwards. On a 360° raster the column may fall outside
+        0..cols-1; it wraps across the antimeridian.
+        """
+        row, col = self.cell_index(lat, lon)
+        rows, cols = self.shape[:2]
+        row0 = min(max(row - grid.center_index, 0), rows - grid.size)
+        col0 = col - grid.center_index
+        if not self.wraps_longitude:
+            col0 = min(max(col0, 0), cols - grid.size)
+        return row0, col0
+
+    def window_cell(self, lat, lon, grid=DEFAULT_GRID):
+        """
+        Row/Col of (lat, lon) within its window (see window_origin): grid.center_index on both
+        axes, unless the window was shifted inwards near a pole or a regional edge.
+        """
+        row, col = self.cell_index(lat, lon)
+        row0, col0 = self.window_origin(lat, lon, grid)
+        local_col = (col - col0) % self.shape[1] if self.wraps_longitude else col - col0
+        return row - row0, local_col
+
+    def region(self, row0, col0, row_count, col_count):
+        """
+        The raster block of `row_count` x `col_count` cells starting at (row0, col0), as an
+        environment dict. Each layer is a view into the global arrays (no copy, O(1) regardless
+        of the raster size). A block straddling the antimeridian of a 360° raster is stitched
+        from the two edge strips instead, which copies only that block.
+        """
+        rows, cols = self.shape[:2]
+        if not (0 <= row0 and row0 + row_count <= rows):
+            raise ValueError(f"Rows {row0}-{row0 + row_count - 1} are outside the environment (0-{rows - 1}).")
+        row_slice = slice(row0, row0 + row_count)
+        if self.wraps_longitude:
+            col0 %= cols
+        elif not (0 <= col0 and col0 + col_count <= cols):
+            raise ValueError(f"Columns {col0}-{col0 + col_count - 1} are outside the environment (0-{cols - 1}).")
+
+        if col0 + col_count > cols:
+            # Crosses the antimeridian: join the eastern and western edge strips
+            east = slice(col0, cols)
+            west = slice(0, col_count - (cols - col0))
+            return {
+                layer_name: np.concatenate(
+                    (self.layer(layer_name)[row_slice, east], self.layer(layer_name)[row_slice, west]), axis=1
+                )
+                for layer_name in LAYER_NAMES
+            }
+        block = (row_slice, slice(col0, col0 + col_count))
+        return {layer_name: self.layer(layer_name)[block] for layer_name in LAYER_NAMES}
+
+    def window(self, lat, lon, grid=DEFAULT_GRID):
+        """
+        Returns the local grid around (lat, lon) as an environment dict, with the position on
+        grid.center_index (see window_origin). Each layer is a view into the global arrays, except
+        for windows straddling the antimeridian, which are stitched into a window-sized copy.
+        """
+        self.check_grid(grid)
+        row0, col0 = self.window_origin(lat, lon, grid)
+        return self.region(row0, col0, grid.size, grid.size)
+
+# --- READING ---
+
+class EnvironmentStore(GlobalEnvironment):
+    """
+    A lazily opened on-disk environment. Only metadata.json is read on open; each layer is
+    memory-mapped the first time it is used.
+    """
+
+    def __init__(self, path, mode="r"):
+        self.path = path
+        self.mode = mode
+        with open(os.path.join(path, METADATA_FILE), encoding="utf-8") as handle:
+            self.metadata = json.load(handle)
+        if self.metadata.get("format_version") != STORE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported environment store version {self.metadata.get('format_version')} in {path}.")
+        missing = set(LAYER_NAMES) - set(self.metadata["layers"])
+        if missing:
+            raise ValueError(f"Environment store {path} is missing layers: {', '.join(sorted(missing))}.")
+        bounds = self.metadata["bounds"]
+        self._layers = {}
+        self._shape = tuple(self.metadata["shape"])
+        self._bounds = (bounds["lat_min"], bounds["lat_max"], bounds["lon_min"], bounds["lon_max"])
+        self._resolution = self.metadata["resolution"]
+        self._depth_bins = self.metadata["depth_bins"]
+
+    def layer(self, layer_name):
+        """Returns the (rows, cols, depth) memory map of one layer, opening it on first use."""
+        layer = self._layers.get(layer_name)
+        if layer is None:
+            layer = np.load(os.path.join(self.path, f"{layer_name}.npy"), mmap_mode=self.mode)
+            if layer.shape != self.shape:
+                raise ValueError(f"Layer {layer_name} has shape {layer.shape}, metadata says {self.shape}.")
+            self._layers[layer_name] = layer
+        return layer
+
+def open_environment_store(path):
+    """Opens an existing store read-only. Layers are memory-mapped lazily."""
+    return EnvironmentStore(path, mode="r")
+
+# --- PREDICTION ---
+
+def predict_from_store(store, shark_type, lat, lon, depth, grid=DEFAULT_GRID):
+    """
+    Runs the migration prediction on the window around (lat, lon) of a store or any other
+    GlobalEnvironment and returns a prediction record. The current HSI is read at the shark's own
+    cell, which is off-center where the window is shifted at a pole or a regional edge.
+    """
+    grid = store.grid_for(grid)
+    prediction = predict_next_location(shark_type, store.window(lat, lon, grid), grid,
+                                       current_cell=store.window_cell(lat, lon, grid))
+    return build_prediction_record(shark_type, lat, lon, depth, prediction)
@@ -0,0 +1,326 @@
+"""
+Top-K habitat hotspot search.
+
+Finds the N best cells of a species' HSI field (e.g., candidate sites for deploying acoustic
+receivers) rather than only the single best cell inside the winning sector. Works on the local
+prediction grid around a position or on a whole GlobalEnvironment / EnvironmentStore, over
+every cell or only inside a region, optionally keeping only local maxima and suppressing cells
+closer than a minimum separation to a better hotspot.
+
+Selection is a partial sort: np.argpartition picks the K best candidates in linear time and only
+those K are sorted, so taking K of millions of cells costs about one pass over the scores. With
+a minimum separation, a small pool of the best candidates is selected the same way and grown
+only when suppression leaves fewer than K.
+
+Usage:
+    python hotspots.py --species "Tiger shark" --lat 20 --lon 30 --k 10 --min-separation 2
+    python hotspots.py --species "Tiger shark" --lat 20 --lon 30 --region North --volume
+    python hotspots.py --species "Tiger shark" --environment-store region_store --k 25 --bounds 10 30 20 40
+"""
+import argparse
+import itertools
+import json
+import sys
+
+import numpy as np
+
+from environment_store import open_environment_store
+from Predictor import (
+    DEFAULT_GRID,
+    GridConfig,
+    SectorEngine,
+    WedgeSector,
+    calculate_species_hsi_volume,
+    check_environment_grid,
+    generate_simulated_environment,
+    get_profile_table,
+    map_grid_to_lat_lon_relative,
+    score_column_max,
+)
+
+DEFAULT_K = 10
+CANDIDATE_POOL_FACTOR = 4  # With a minimum separation, first try K x this many candidates
+SCORING_BAND_ROWS = 256    # Raster rows scored at once by global_hotspots
+
+# --- SELECTION ---
+
+def top_k_indices(values, k):
+    """
+    Indices of the `k` largest entries of a 1-D array, best first, using a partial sort.
+    Ties are broken by the lower index, so the result does not depend on argpartition's order.
+    """
+    k = min(k, len(values))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if k < len(values):
+        # The k-th largest value; everything above it is in, ties at it are filled by lowest index
+        threshold = values[np.argpartition(values, len(values) - k)[len(values) - k]]
+        above = np.flatnonzero(values > threshold)
+        tied = np.flatnonzero(values == threshold)[:k - len(above)]
+        selected = np.concatenate((above, tied))
+    else:
+        selected = np.arange(len(values))
+    order = np.lexsort((selected, -values[selected]))
+    return selected[order]
+
+def local_maxima_mask(scores):
+    """
+    True where a cell scores at least as high as every neighbor (8 neighbors on a (rows, cols)
+    field, 26 on a (rows, cols, depth) volume). Cells on a flat plateau all count as maxima.
+    """
+    padded = np.pad(scores, 1, mode="constant", constant_values=-np.inf)
+    mask = np.ones(scores.shape, dtype=bool)
+    for offset in itertools.product((-1, 0, 1), repeat=scores.ndim):
+        if any(offset):
+            neighbor = tuple(slice(1 + shift, 1 + shift + length) for shift, length in zip(offset, scores.shape))
+            mask &= scores >= padded[neighbor]
+    return mask
+
+def find_hotspots(scores, k=DEFAULT_K, region=None, min_separation=0.0, local_maxima=False):
+    """
+    The `k` best cells of a (rows, cols) or (rows, cols, depth) score array.
+    `region` is an optional boolean mask over (rows, cols), or over every axis, limiting the search.
+    `local_maxima` keeps only cells that are local maxima of the whole field. With a positive
+    `min_separation` (horizontal distance in cells), a cell closer than that to a better hotspot
+    is skipped, so the K results spread out instead of clustering on one peak (cells of the same
+    water column are 0 cells apart).
+    Returns (cells, values): an (n, scores.ndim) index array and the n scores, best first; n < k
+    when fewer cells qualify.
+    """
+    if k < 1:
+        raise ValueError(f"Need at least 1 hotspot, got k={k}.")
+    if min_separation < 0:
+        raise ValueError(f"Minimum separation must not be negative, got {min_separation}.")
+    eligible = None
+    if region is not None:
+        region = np.asarray(region, dtype=bool)
+        if region.shape != scores.shape[:region.ndim]:
+            raise ValueError(f"Region of shape {region.shape} does not fit scores of shape {scores.shape}.")
+        eligible = np.broadcast_to(region.reshape(region.shape + (1,) * (scores.ndim - region.ndim)), scores.shape)
+    if local_maxima:
+        maxima = local_maxima_mask(scores)
+        eligible = maxima if eligible is None else eligible & maxima
+
+    flat_scores = scores.ravel()
+    candidates = None if eligible is None else np.flatnonzero(eligible)
+    values = flat_scores if candidates is None else flat_scores[candidates]
+
+    if min_separation <= 0:
+        chosen = top_k_indices(values, k)
+    else:
+        chosen = _separated_top_k(values, candidates, scores.shape, k, min_separation)
+    flat_cells = chosen if candidates is None else candidates[chosen]
+    cells = np.stack(np.unravel_index(flat_cells, scores.shape), axis=1)
+    return cells, flat_scores[flat_cells]
+
+def _separated_top_k(values, candidates, shape, k, min_separation):
+    """Greedy suppression over a growing pool of the best candidates; returns positions into `values`."""
+    pool_size = k * CANDIDATE_POOL_FACTOR
+    while True:
+        pool = top_k_indices(values, pool_size)
+        flat_cells = pool if candidates is None else candidates[pool]
+        rows, cols = np.unravel_index(flat_cells, shape)[:2]
+        kept = []
+        for i in range(len(pool)):
+            if kept:
+                distances = np.hypot(rows[kept] - rows[i], cols[kept] - cols[i])
+                if np.any(distances < min_separation):
+                    continue
+            kept.append(i)
+            if len(kept) == k:
+                break
+        # The greedy pass only looks at the pool; widen it until K are kept or every candidate was seen
+        if len(kept) == k or len(pool) == len(values):
+            return pool[kept]
+        pool_size *= CANDIDATE_POOL_FACTOR
+
+# --- LOCAL GRID ---
+
+def region_mask(region, grid=DEFAULT_GRID):
+    """
+    Boolean (rows, cols) mask of a search region on the local grid: a sector name ("North", ...),
+    a WedgeSector, a (row slice, col slice) pair or a boolean mask.
+    """
+    if isinstance(region, str):
+        if region not in grid.sectors:
+            raise ValueError(f"Unknown sector '{region}', expected one of {', '.join(grid.sectors)}.")
+        region = grid.sectors[region]
+    if isinstance(region, WedgeSector):
+        return SectorEngine(np.zeros((grid.size, grid.size))).wedge_mask(region)
+    if isinstance(region, tuple) and all(isinstance(part, slice) for part in region):
+        mask = np.zeros((grid.size, grid.size), dtype=bool)
+        mask[region] = True
+        return mask
+    mask = np.asarray(region, dtype=bool)
+    if mask.shape != (grid.size, grid.size):
+        raise ValueError(f"Region mask has shape {mask.shape}, expected {(grid.size, grid.size)}.")
+    return mask
+
+def local_hotspots(shark_type, environment, lat, lon, k=DEFAULT_K, grid=DEFAULT_GRID, region=None,
+                   min_separation=0.0, local_maxima=False, volume=False):
+    """
+    The `k` best cells of the local grid centered on (lat, lon), as records with the cell's
+    position, depth layer and HSI. By default each water column counts once, at its best layer;
+    `volume=True` ranks every (row, col, depth) cell instead. `region` is anything region_mask
+    accepts; the other options work as in find_hotspots.
+    """
+    check_environment_grid(environment, grid)
+    if volume:
+        scores = calculate_species_hsi_volume(shark_type, environment, depth_bins=grid.depth_bins)
+        best_layers = None
+    else:
+        scores, best_layers = score_column_max(shark_type, environment, depth_bins=grid.depth_bins)
+    mask = None if region is None else region_mask(region, grid)
+    cells, values = find_hotspots(scores, k, mask, min_separation, local_maxima)
+
+    rows, cols = cells[:, 0], cells[:, 1]
+    depths = cells[:, 2] if volume else best_layers[rows, cols]
+    lats, lons = map_grid_to_lat_lon_relative(rows, cols, lat, lon, grid)
+    return _hotspot_records(shark_type, lats, lons, rows, cols, depths, values, grid)
+
+def _hotspot_records(shark_type, lats, lons, rows, cols, depths, values, grid):
+    table = get_profile_table()
+    max_hsi = float(table.max_hsi[table.species_index(shark_type)])
+    return [
+        {
+            "rank": rank,
+            "lat": float(lat_value),
+            "lon": float(lon_value),
+            "row": int(row),
+            "col": int(col),
+            "depth": int(depth),
+            "depth_label": grid.depth_label(int(depth)),
+            "hsi": float(value),
+            "max_hsi": max_hsi,
+        }
+        for rank, (lat_value, lon_value, row, col, depth, value)
+        in enumerate(zip(np.atleast_1d(lats), np.atleast_1d(lons), rows, cols, depths, values), start=1)
+    ]
+
+# --- GLOBAL ENVIRONMENT ---
+
+def bounds_block(global_environment, bounds):
+    """(row0, col0, row_count, col_count) of the raster cells whose centers lie inside bounds."""
+    lat_min, lat_max, lon_min, lon_max = global_environment.bounds
+    query_lat_min, query_lat_max, query_lon_min, query_lon_max = bounds
+    if query_lat_min >= query_lat_max or query_lon_min >= query_lon_max:
+        raise ValueError(f"Bounds must be (lat_min, lat_max, lon_min, lon_max) with min < max, got {bounds}.")
+    rows, cols = global_environment.shape[:2]
+    resolution = global_environment.resolution
+    # Cell centers sit at lat_max - (row + 0.5) * resolution and lon_min + (col + 0.5) * resolution
+    row0 = max(int(np.ceil((lat_max - query_lat_max) / resolution - 0.5)), 0)
+    row1 = min(int(np.floor((lat_max - query_lat_min) / resolution - 0.5)), rows - 1)
+    col0 = max(int(np.ceil((query_lon_min - lon_min) / resolution - 0.5)), 0)
+    col1 = min(int(np.floor((query_lon_max - lon_min) / resolution - 0.5)), cols - 1)
+    if row1 < row0 or col1 < col0:
+        raise ValueError(f"Bounds {bounds} hold no cell center of the environment {global_environment.bounds}.")
+    return row0, col0, row1 - row0 + 1, col1 - col0 + 1
+
+def _block_local_maxima(shark_type, global_environment, block, best_scores, depth_bins):
+    """
+    local_maxima_mask of a raster block's best scores, judged against the real neighbors around
+    the block: the one-cell halo is scored too (across the antimeridian on a 360° raster), so
+    only cells at the edges of the raster itself compare against nothing.
+    """
+    row0, col0, row_count, col_count = block
+    rows, cols = global_environment.shape[:2]
+
+    def halo_scores(halo_row0, halo_col0, halo_rows, halo_cols):
+        band = global_environment.region(halo_row0, halo_col0, halo_rows, halo_cols)
+        return score_column_max(shark_type, band, depth_bins=depth_bins)[0]
+
+    padded = np.full((row_count + 2, col_count + 2), -np.inf)
+    padded[1:-1, 1:-1] = best_scores
+    if row0 > 0:
+        padded[0, 1:-1] = halo_scores(row0 - 1, col0, 1, col_count)[0]
+    if row0 + row_count < rows:
+        padded[-1, 1:-1] = halo_scores(row0 + row_count, col0, 1, col_count)[0]
+    # The side columns include the corners, where the rows above and below exist
+    halo_row0, halo_row1 = max(row0 - 1, 0), min(row0 + row_count + 1, rows)
+    side_rows = slice(halo_row0 - row0 + 1, halo_row1 - row0 + 1)
+    if global_environment.wraps_longitude or col0 > 0:
+        padded[side_rows, 0] = halo_scores(halo_row0, col0 - 1, halo_row1 - halo_row0, 1)[:, 0]
+    if global_environment.wraps_longitude or col0 + col_count < cols:
+        padded[side_rows, -1] = halo_scores(halo_row0, col0 + col_count, halo_row1 - halo_row0, 1)[:, 0]
+    return local_maxima_mask(padded)[1:-1, 1:-1]
+
+def global_hotspots(shark_type, global_environment, k=DEFAULT_K, bounds=None, min_separation=0.0,
+                    local_maxima=False, band_rows=SCORING_BAND_ROWS):
+    """
+    The `k` best water columns of a GlobalEnvironment / EnvironmentStore (optionally only inside
+    `bounds` = (lat_min, lat_max, lon_min, lon_max)), each at its best depth layer. The raster is
+    scored in bands of rows, streaming over depth (see score_column_max), so only the 2-D best
+    scores are kept. `min_separation` is in raster cells. `local_maxima` compares each column with
+    its neighbors in the whole raster, including those just outside `bounds`.
+    """
+    rows, cols, depth_layers = global_environment.shape
+    row0, col0, row_count, col_count = (0, 0, rows, cols) if bounds is None else bounds_block(global_environment, bounds)
+    grid = global_environment.grid_for(GridConfig(depth_layers=depth_layers))
+
+    best_scores = np.empty((row_count, col_count))
+    best_layers = np.empty((row_count, col_count), dtype=np.intp)
+    for band_start in range(0, row_count, band_rows):
+        band_count = min(band_rows, row_count - band_start)
+        band = global_environment.region(row0 + band_start, col0, band_count, col_count)
+        best_scores[band_start:band_start + band_count], best_layers[band_start:band_start + band_count] = (
+            score_column_max(shark_type, band, depth_bins=grid.depth_bins)
+        )
+    maxima = None
+    if local_maxima:
+        maxima = _block_local_maxima(shark_type, global_environment, (row0, col0, row_count, col_count),
+                                     best_scores, grid.depth_bins)
+    cells, values = find_hotspots(best_scores, k, region=maxima, min_separation=min_separation)
+
+    rows_found, cols_found = cells[:, 0], cells[:, 1]
+    lat_max, lon_min = global_environment.bounds[1], global_environment.bounds[2]
+    lats = lat_max - (row0 + rows_found + 0.5) * global_environment.resolution
+    lons = lon_min + (col0 + cols_found + 0.5) * global_environment.resolution
+    return _hotspot_records(shark_type, lats, lons, row0 + rows_found, col0 + cols_found,
+                            best_layers[rows_found, cols_found], values, grid)
+
+# --- ENTRY POINT ---
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="List the top-K habitat hotspots of a species.")
+    parser.add_argument("--species", required=True, help="species name, as in SHARK_PROFILES")
+    parser.add_argument("--k", type=int, default=DEFAULT_K, help="number of hotspots to return")
+    parser.add_argument("--min-separation", type=float, default=0.0, help="minimum distance between hotspots, in cells")
+    parser.add_argument("--local-maxima", action="store_true", help="only return local maxima of the HSI field")
+    parser.add_argument("--lat", type=float, default=None, help="latitude of the local grid center")
+    parser.add_argument("--lon", type=float, default=None, help="longitude of the local grid center")
+    parser.add_argument("--region", default=None, help="only search this sector of the local grid (North, South, East, West)")
+    parser.add_argument("--volume", action="store_true", help="rank every depth layer of the local grid, not just each column's best")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the simulated environment (reproducible runs)")
+    parser.add_argument("--grid-size", type=int, default=DEFAULT_GRID.size, help="horizontal cells per side of the local grid")
+    parser.add_argument("--depth-layers", type=int, default=DEFAULT_GRID.depth_layers, help="number of depth layers")
+    parser.add_argument("--degree-span", type=float, default=DEFAULT_GRID.degree_span, help="degrees covered by the local grid")
+    parser.add_argument("--environment-store", default=None, help="search a whole environment store instead of a local grid")
+    parser.add_argument("--bounds", type=float, nargs=4, default=None, metavar=("LAT_MIN", "LAT_MAX", "LON_MIN", "LON_MAX"),
+                        help="only search this part of the environment store")
+    return parser
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    try:
+        if args.species not in get_profile_table().index:
+            raise ValueError(f"Unknown shark type '{args.species}'.")
+        if args.environment_store:
+            store = open_environment_store(args.environment_store)
+            hotspots = global_hotspots(args.species, store, args.k, args.bounds, args.min_separation, args.local_maxima)
+        else:
+            if args.lat is None or args.lon is None:
+                raise ValueError("--lat and --lon are needed without --environment-store.")
+            grid = GridConfig(args.grid_size, args.depth_layers, args.degree_span)
+            environment = generate_simulated_environment(grid.size, grid.depth_layers, rng=args.seed)
+            hotspots = local_hotspots(args.species, environment, args.lat, args.lon, args.k, grid, args.region,
+                                      args.min_separation, args.local_maxima, args.volume)
+    except (ValueError, OSError) as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+    json.dump(hotspots, sys.stdout, indent=2)
+    print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
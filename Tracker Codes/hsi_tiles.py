@@ -0,0 +1,360 @@
+"""
+Pre-rendered HSI map tiles for the Leaflet map (HTMl/Map.html).
+
+Scores a GlobalEnvironment / EnvironmentStore once per species and depth layer, then cuts the
+scored raster into a pyramid of 256x256 Web Mercator PNG tiles that Leaflet loads statically:
+
+    tiles/
+        manifest.json                         content hash of every tile written
+        tiger-shark/max/3/4/2.png             {species}/{depth}/{z}/{x}/{y}.png
+
+`depth` is a depth layer index, or "max" for the best layer of each water column. Colors run
+from deep blue (unsuitable) to red (the species' maximum HSI); cells outside the raster are
+transparent. PNGs are written with zlib/struct only (8-bit palette + transparency), so no
+imaging library is needed.
+
+Regeneration is incremental: each tile's content hash is kept in manifest.json and a tile is
+only re-encoded and rewritten when its pixels change. The color raster of every species and
+depth is kept next to the tiles (rasters/{species}/{depth}.npy); pass `changed_bounds` after
+updating part of the environment and only the cells of that region (plus a one-cell margin)
+are rescored into the kept raster, and tiles outside the region are not even resampled. A region
+crossing the antimeridian is given with lon_min > lon_max.
+
+Usage:
+    python hsi_tiles.py region_store ../HTMl/tiles --species "Tiger shark" --max-zoom 6
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import re
+import struct
+import sys
+import zlib
+
+import numpy as np
+
+from environment_store import open_environment_store
+from Predictor import GridConfig, get_profile_table, score_column_max, score_hsi_volume
+
+TILE_SIZE = 256
+MAX_MERCATOR_LAT = 85.0511287798  # Latitude where Web Mercator tiles end
+MANIFEST_FILE = "manifest.json"
+RASTER_DIR = "rasters"  # Color rasters kept for incremental regeneration
+CHANGED_MARGIN_CELLS = 1  # Cells rescored around changed_bounds (cells only partly inside it)
+TILE_FORMAT_VERSION = 1
+SCORING_BAND_ROWS = 256  # Raster rows scored at a time, to bound memory on large stores
+
+# Color ramp stops (fraction of the species' max HSI -> RGBA)
+COLOR_STOPS = [
+    (0.00, (8, 29, 88, 60)),
+    (0.25, (34, 94, 168, 110)),
+    (0.50, (65, 182, 196, 150)),
+    (0.75, (254, 217, 118, 190)),
+    (1.00, (227, 26, 28, 220)),
+]
+
+# --- PNG ENCODING ---
+
+def build_palette():
+    """256-entry RGBA palette: index 0 is transparent (no data), 1..255 follow COLOR_STOPS."""
+    positions = np.linspace(0.0, 1.0, 255)
+    stops = np.array([position for position, _ in COLOR_STOPS])
+    colors = np.array([color for _, color in COLOR_STOPS], dtype=float)
+    palette = np.zeros((256, 4), dtype=np.uint8)
+    for channel in range(4):
+        palette[1:, channel] = np.round(np.interp(positions, stops, colors[:, channel]))
+    return palette
+
+PALETTE = build_palette()
+
+def _png_chunk(chunk_type, data):
+    return struct.pack(">I", len(data)) + chunk_type + data + struct.pack(">I", zlib.crc32(chunk_type + data) & 0xFFFFFFFF)
+
+def encode_palette_png(indices, palette=PALETTE, level=6):
+    """Encodes a (height, width) uint8 array of palette indices as an 8-bit palette PNG."""
+    height, width = indices.shape
+    # Filter type 0 (None) at the start of each scanline
+    scanlines = np.zeros((height, width + 1), dtype=np.uint8)
+    scanlines[:, 1:] = indices
+    return b"".join((
+        b"\x89PNG\r\n\x1a\n",
+        _png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 3, 0, 0, 0)),
+        _png_chunk(b"PLTE", palette[:, :3].tobytes()),
+        _png_chunk(b"tRNS", palette[:, 3].tobytes()),
+        _png_chunk(b"IDAT", zlib.compress(scanlines.tobytes(), level)),
+        _png_chunk(b"IEND", b""),
+    ))
+
+# --- SCORING ---
+
+def species_slug(shark_type):
+    """Directory name of a species ("Tiger shark" -> "tiger-shark")."""
+    return re.sub(r"[^a-z0-9]+", "-", shark_type.lower()).strip("-")
+
+def score_raster(global_environment, shark_type, depth="max", band_rows=SCORING_BAND_ROWS, block=None):
+    """
+    (rows, cols) float32 HSI raster of one species over the environment, or over `block` =
+    (row0, col0, row_count, col_count) of it, for one depth layer or the best layer of each
+    column ("max"). Scored in bands of rows; "max" streams over depth (score_column_max) and a
+    single layer scores only that layer, so no band's full 3-D volume is built.
+    """
+    rows, cols, depth_layers = global_environment.shape
+    if depth != "max" and not 0 <= int(depth) < depth_layers:
+        raise ValueError(f"Depth layer must be 'max' or between 0 and {depth_layers - 1}, got {depth}.")
+    row0, col0, row_count, col_count = (0, 0, rows, cols) if block is None else block
+    depth_bins = global_environment.grid_for(GridConfig(depth_layers=depth_layers)).depth_bins
+    table = get_profile_table()
+    i = table.species_index(shark_type)
+    if depth != "max":
+        layer = slice(int(depth), int(depth) + 1)
+        layer_weights = table.depth_weights_for(depth_layers, depth_bins)[i][layer]
+
+    raster = np.empty((row_count, col_count), dtype=np.float32)
+    for band_start in range(0, row_count, band_rows):
+        band_count = min(band_rows, row_count - band_start)
+        band = global_environment.region(row0 + band_start, col0, band_count, col_count)
+        if depth == "max":
+            scores = score_column_max(shark_type, band, table, depth_bins)[0]
+        else:
+            scores = score_hsi_volume(table.factor_weights[i], layer_weights,
+                                      {name: values[:, :, layer] for name, values in band.items()})[:, :, 0]
+        raster[band_start:band_start + band_count] = scores
+    return raster
+
+def split_antimeridian(bounds):
+    """
+    Bounds = (lat_min, lat_max, lon_min, lon_max) as a list of non-crossing bounds: unchanged,
+    or split in two at 180° when lon_min > lon_max (the region crosses the antimeridian).
+    """
+    lat_min, lat_max, lon_min, lon_max = bounds
+    if lon_min <= lon_max:
+        return [tuple(bounds)]
+    return [(lat_min, lat_max, lon_min, 180.0), (lat_min, lat_max, -180.0, lon_max)]
+
+def changed_blocks(global_environment, bounds, margin=CHANGED_MARGIN_CELLS):
+    """
+    The (row0, col0, row_count, col_count) blocks of raster cells overlapping bounds = (lat_min,
+    lat_max, lon_min, lon_max), grown by `margin` cells: one block, or two when the bounds cross
+    the antimeridian (lon_min > lon_max). Blocks missing the raster are left out.
+    """
+    lat_min, lat_max, lon_min, lon_max = global_environment.bounds
+    if bounds[0] > bounds[1]:
+        raise ValueError(f"Changed bounds must be (lat_min, lat_max, lon_min, lon_max) with lat_min <= lat_max, got {bounds}.")
+    rows, cols = global_environment.shape[:2]
+    resolution = global_environment.resolution
+    blocks = []
+    for query_lat_min, query_lat_max, query_lon_min, query_lon_max in split_antimeridian(bounds):
+        row0 = max(math.floor((lat_max - query_lat_max) / resolution) - margin, 0)
+        row1 = min(math.floor((lat_max - query_lat_min) / resolution) + margin, rows - 1)
+        col0 = max(math.floor((query_lon_min - lon_min) / resolution) - margin, 0)
+        col1 = min(math.floor((query_lon_max - lon_min) / resolution) + margin, cols - 1)
+        if row1 >= row0 and col1 >= col0:
+            blocks.append((row0, col0, row1 - row0 + 1, col1 - col0 + 1))
+    return blocks
+
+def color_indices(raster, max_hsi):
+    """Maps HSI values onto palette indices 1..255 (0 stays free for no-data pixels)."""
+    if max_hsi <= 0:
+        return np.ones(raster.shape, dtype=np.uint8)  # A species without any preference: all unsuitable
+    fraction = np.clip(raster / max_hsi, 0.0, 1.0)
+    return (1 + np.round(fraction * 254)).astype(np.uint8)
+
+# --- TILE PYRAMID ---
+
+def tile_range(bounds, zoom):
+    """Inclusive (x_min, x_max, y_min, y_max) of the zoom-level tiles covering bounds."""
+    lat_min, lat_max, lon_min, lon_max = bounds
+    n = 2 ** zoom
+
+    def tile_x(lon):
+        return min(max(int((lon + 180.0) / 360.0 * n), 0), n - 1)
+
+    def tile_y(lat):
+        lat = math.radians(min(max(lat, -MAX_MERCATOR_LAT), MAX_MERCATOR_LAT))
+        return min(max(int((1.0 - math.asinh(math.tan(lat)) / math.pi) / 2.0 * n), 0), n - 1)
+
+    return tile_x(lon_min), tile_x(lon_max), tile_y(lat_max), tile_y(lat_min)
+
+def tile_pixel_coordinates(zoom, x, y):
+    """Latitudes of the pixel rows and longitudes of the pixel columns of tile (zoom, x, y)."""
+    n = 2 ** zoom
+    offsets = (np.arange(TILE_SIZE) + 0.5) / TILE_SIZE
+    lons = (x + offsets) / n * 360.0 - 180.0
+    lats = np.degrees(np.arctan(np.sinh(np.pi * (1.0 - 2.0 * (y + offsets) / n))))
+    return lats, lons
+
+def sample_tile(color_raster, global_environment, zoom, x, y):
+    """
+    Nearest-cell sample of a color-index raster for one tile. Web Mercator is separable in
+    lat/lon, so each tile needs one row lookup per pixel row and one column lookup per column.
+    """
+    lat_min, lat_max, lon_min, lon_max = global_environment.bounds
+    resolution = global_environment.resolution
+    rows, cols = color_raster.shape
+    lats, lons = tile_pixel_coordinates(zoom, x, y)
+    if global_environment.wraps_longitude:
+        lons = (lons - lon_min) % 360.0 + lon_min
+    row_valid = (lats >= lat_min) & (lats <= lat_max)
+    col_valid = (lons >= lon_min) & (lons <= lon_max)
+    row_index = np.clip(((lat_max - lats) / resolution).astype(int), 0, rows - 1)
+    col_index = np.clip(((lons - lon_min) / resolution).astype(int), 0, cols - 1)
+    tile = color_raster[row_index[:, None], col_index[None, :]]
+    tile[~(row_valid[:, None] & col_valid[None, :])] = 0
+    return tile
+
+def tile_bounds(zoom, x, y):
+    """(lat_min, lat_max, lon_min, lon_max) covered by a tile."""
+    n = 2 ** zoom
+    lat_top = math.degrees(math.atan(math.sinh(math.pi * (1.0 - 2.0 * y / n))))
+    lat_bottom = math.degrees(math.atan(math.sinh(math.pi * (1.0 - 2.0 * (y + 1) / n))))
+    return lat_bottom, lat_top, x / n * 360.0 - 180.0, (x + 1) / n * 360.0 - 180.0
+
+def _overlaps(a, b):
+    return a[0] <= b[1] and b[0] <= a[1] and a[2] <= b[3] and b[2] <= a[3]
+
+def load_manifest(output_dir):
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {"format_version": TILE_FORMAT_VERSION, "tiles": {}}
+    with open(path, encoding="utf-8") as handle:
+        manifest = json.load(handle)
+    if manifest.get("format_version") != TILE_FORMAT_VERSION:
+        return {"format_version": TILE_FORMAT_VERSION, "tiles": {}}  # Regenerate everything
+    return manifest
+
+def save_manifest(output_dir, manifest):
+    """Writes manifest.json atomically, so an interrupted run never leaves a torn manifest."""
+    path = os.path.join(output_dir, MANIFEST_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as handle:
+        json.dump(manifest, handle, indent=1, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+def _raster_path(output_dir, layer_key):
+    return os.path.join(output_dir, RASTER_DIR, f"{layer_key}.npy")
+
+def load_color_raster(output_dir, layer_key, layer_info, shape, bounds, max_hsi):
+    """The color raster kept by the last run of a layer, or None if missing or made for another raster."""
+    path = _raster_path(output_dir, layer_key)
+    if layer_info is None or not os.path.exists(path):
+        return None
+    if (layer_info.get("raster_shape") != list(shape) or layer_info.get("bounds") != list(bounds)
+            or layer_info.get("max_hsi") != max_hsi):
+        return None
+    color_raster = np.load(path)
+    return color_raster if color_raster.shape == tuple(shape) else None
+
+def save_color_raster(output_dir, layer_key, color_raster):
+    """Writes a layer's color raster atomically."""
+    path = _raster_path(output_dir, layer_key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".tmp", "wb") as handle:
+        np.save(handle, color_raster)
+    os.replace(path + ".tmp", path)
+
+def layer_color_raster(global_environment, output_dir, manifest, shark_type, depth, max_hsi, changed_bounds=None):
+    """
+    The color raster of one species and depth. With `changed_bounds` and a raster kept from the
+    last run, only the changed blocks are rescored into it; otherwise the whole raster is scored.
+    """
+    layer_key = f"{species_slug(shark_type)}/{depth}"
+    shape = global_environment.shape[:2]
+    color_raster = None
+    if changed_bounds is not None:
+        color_raster = load_color_raster(output_dir, layer_key, manifest.get("layers", {}).get(layer_key),
+                                         shape, global_environment.bounds, max_hsi)
+    if color_raster is None:
+        color_raster = color_indices(score_raster(global_environment, shark_type, depth), max_hsi)
+    else:
+        for block in changed_blocks(global_environment, changed_bounds):
+            row0, col0, row_count, col_count = block
+            color_raster[row0:row0 + row_count, col0:col0 + col_count] = color_indices(
+                score_raster(global_environment, shark_type, depth, block=block), max_hsi)
+    save_color_raster(output_dir, layer_key, color_raster)
+    return color_raster
+
+def generate_tiles(global_environment, output_dir, species_names, depths=("max",), min_zoom=0, max_zoom=5,
+                   changed_bounds=None):
+    """
+    Writes the tile pyramid of every species and depth into `output_dir`, rewriting only tiles
+    whose pixels changed since the last run. With `changed_bounds` = (lat_min, lat_max, lon_min,
+    lon_max), only the cells of that region are rescored (into the raster kept by the last run)
+    and tiles outside it are left untouched without being resampled.
+    Returns {"written": n, "unchanged": n, "skipped": n}.
+    """
+    if not 0 <= min_zoom <= max_zoom:
+        raise ValueError(f"Invalid zoom range {min_zoom}-{max_zoom}.")
+    table = get_profile_table()
+    manifest = load_manifest(output_dir)
+    palette_hash = hashlib.blake2b(PALETTE.tobytes(), digest_size=8).hexdigest()
+    counts = {"written": 0, "unchanged": 0, "skipped": 0}
+
+    for shark_type in species_names:
+        max_hsi = float(table.max_hsi[table.species_index(shark_type)])
+        for depth in depths:
+            # Score each species and depth once; every zoom level samples the same raster
+            color_raster = layer_color_raster(global_environment, output_dir, manifest, shark_type, depth,
+                                              max_hsi, changed_bounds)
+            for zoom in range(min_zoom, max_zoom + 1):
+                x_min, x_max, y_min, y_max = tile_range(global_environment.bounds, zoom)
+                for x in range(x_min, x_max + 1):
+                    for y in range(y_min, y_max + 1):
+                        key = f"{species_slug(shark_type)}/{depth}/{zoom}/{x}/{y}"
+                        if changed_bounds is not None and key in manifest["tiles"] \
+                                and not any(_overlaps(tile_bounds(zoom, x, y), part)
+                                            for part in split_antimeridian(changed_bounds)):
+                            counts["skipped"] += 1
+                            continue
+                        tile = sample_tile(color_raster, global_environment, zoom, x, y)
+                        digest = palette_hash + hashlib.blake2b(tile.tobytes(), digest_size=16).hexdigest()
+                        path = os.path.join(output_dir, f"{key}.png")
+                        if manifest["tiles"].get(key) == digest and os.path.exists(path):
+                            counts["unchanged"] += 1
+                            continue
+                        os.makedirs(os.path.dirname(path), exist_ok=True)
+                        with open(path, "wb") as handle:
+                            handle.write(encode_palette_png(tile))
+                        manifest["tiles"][key] = digest
+                        counts["written"] += 1
+            manifest.setdefault("layers", {})[f"{species_slug(shark_type)}/{depth}"] = {
+                "species": shark_type, "depth": depth, "min_zoom": min_zoom, "max_zoom": max_zoom,
+                "raster_shape": list(color_raster.shape), "bounds": list(global_environment.bounds),
+                "max_hsi": max_hsi,
+            }
+    os.makedirs(output_dir, exist_ok=True)
+    save_manifest(output_dir, manifest)
+    return counts
+
+# --- ENTRY POINT ---
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Render HSI map tiles for the Leaflet map.")
+    parser.add_argument("store", help="environment store to score")
+    parser.add_argument("output", help="directory to write the tile pyramid to (e.g., ../HTMl/tiles)")
+    parser.add_argument("--species", action="append", default=None, help="species to render (repeatable; default: all)")
+    parser.add_argument("--depth", action="append", default=None, help="depth layer index or 'max' (repeatable; default: max)")
+    parser.add_argument("--min-zoom", type=int, default=0, help="lowest zoom level")
+    parser.add_argument("--max-zoom", type=int, default=5, help="highest zoom level")
+    parser.add_argument("--changed-bounds", type=float, nargs=4, default=None,
+                        metavar=("LAT_MIN", "LAT_MAX", "LON_MIN", "LON_MAX"), help="only refresh tiles in this region")
+    return parser
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    try:
+        store = open_environment_store(args.store)
+        species_names = args.species or list(get_profile_table().names)
+        for shark_type in species_names:
+            get_profile_table().species_index(shark_type)
+        counts = generate_tiles(store, args.output, species_names, args.depth or ["max"],
+                                args.min_zoom, args.max_zoom, args.changed_bounds)
+    except (ValueError, KeyError, OSError) as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+    print(f"Tiles written: {counts['written']}, unchanged: {counts['unchanged']}, skipped: {counts['skipped']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
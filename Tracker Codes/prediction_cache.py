@@ -0,0 +1,216 @@
+"""
+Cached prediction service for repeated position queries.
+
+The map frontend polls the same few tagged sharks over and over, and each poll would rerun
+predict_next_location from scratch. PredictionService puts a bounded LRU/TTL cache in front of
+the predictor, keyed by
+
+    (species, snapped latitude cell, snapped longitude cell, depth layer, environment version,
+     profile table version)
+
+Positions are snapped to the grid resolution (DEGREES_PER_CELL by default), so every query
+falling inside the same cell reuses one prediction; the record returned is still built from the
+exact position. refresh_environment() bumps the environment version and clears the cache, so a
+stale prediction is never served after the environment changes. Likewise, a reloaded profile
+table (see profile_registry.py) has a new version, so predictions made with the old profiles
+stop matching and age out of the cache.
+
+predict() and predict_many() share one scorer (predict_all_species, a batched matrix product), so
+a cached prediction is the same whichever of them filled it. It matches predict_next_location up to
+floating-point rounding.
+
+Usage:
+    service = PredictionService(seed=42)
+    record = service.predict("Tiger shark", 20.0, 30.0, depth=0)
+    print(service.stats())
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from Predictor import (
+    DEFAULT_GRID,
+    build_prediction_record,
+    generate_simulated_environment,
+    get_profile_table,
+    normalize_lat_lon,
+    predict_all_species,
+)
+
+DEFAULT_MAX_ENTRIES = 4096
+
+# --- LRU / TTL CACHE ---
+
+class LRUCache:
+    """
+    A bounded mapping that evicts the least recently used entry when full. With a `ttl`
+    (seconds), entries older than that are dropped on lookup. `clock` is injectable for tests.
+    Safe to share between threads.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=None, clock=time.monotonic):
+        if max_entries < 1:
+            raise ValueError(f"max_entries must be at least 1, got {max_entries}.")
+        if ttl is not None and ttl <= 0:
+            raise ValueError(f"ttl must be positive, got {ttl}.")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (stored_at, value), oldest first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        """Returns the cached value for `key` (marking it recently used) or `default`."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl is not None and self.clock() - entry[0] > self.ttl:
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        """Stores `value` under `key`, evicting the least recently used entry if the cache is full."""
+        with self._lock:
+            self._entries[key] = (self.clock(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """Drops every entry. The counters are kept."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Hit/miss counters and the current size."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+# --- PREDICTION SERVICE ---
+
+def snap_position(lat, lon, grid=DEFAULT_GRID):
+    """Row/Col of the grid.degrees_per_cell cell containing (lat, lon), counted from (0°, 0°)."""
+    lat, lon = normalize_lat_lon(lat, lon)
+    return math.floor(lat / grid.degrees_per_cell), math.floor(lon / grid.degrees_per_cell)
+
+class PredictionService:
+    """
+    Serves prediction records through an LRUCache. The environment is either a GlobalEnvironment
+    (or EnvironmentStore), whose window around each position is used, or a simulated local
+    environment generated from `seed`, shared by every position as in run_predictor.
+    """
+
+    def __init__(self, global_environment=None, seed=None, grid=DEFAULT_GRID,
+                 max_entries=DEFAULT_MAX_ENTRIES, ttl=None, clock=time.monotonic):
+        self.grid = grid
+        self.cache = LRUCache(max_entries, ttl, clock)
+        self.environment_version = 0
+        self._set_environment(global_environment, seed)
+
+    def _set_environment(self, global_environment, seed):
+        if global_environment is not None:
+            global_environment.check_grid(self.grid)
+            self.grid = global_environment.grid_for(self.grid)
+            self._local_environment = None
+        else:
+            self._local_environment = generate_simulated_environment(
+                self.grid.size, self.grid.depth_layers, rng=seed, depth_bins=self.grid.depth_bins)
+        self.global_environment = global_environment
+        self.seed = seed
+
+    def refresh_environment(self, global_environment=None, seed=None):
+        """
+        Swaps in a new environment (same arguments as the constructor), bumps the environment
+        version and clears the cache. Returns the new version.
+        """
+        self._set_environment(global_environment, seed)
+        self.environment_version += 1
+        self.cache.clear()
+        return self.environment_version
+
+    def cache_key(self, shark_type, lat, lon, depth, table=None):
+        """The cache key of a query: species, snapped cell, depth layer, environment and profile versions."""
+        if self.global_environment is not None:
+            # Windows are cut on the raster's own cells, so snap to those
+            row, col = self.global_environment.cell_index(lat, lon)
+        else:
+            row, col = snap_position(lat, lon, self.grid)
+        table = table or get_profile_table()
+        return (shark_type, row, col, int(depth), self.environment_version, table.version)
+
+    def predict(self, shark_type, lat, lon, depth=0):
+        """
+        Returns the prediction record for a shark at (lat, lon) in depth layer `depth`. Scored
+        through predict_many, so a cached entry is the same whichever method filled it.
+        """
+        return self.predict_many([(shark_type, lat, lon, depth)])[0]
+
+    def predict_many(self, queries):
+        """
+        Batch form of predict for a list of (shark_type, lat, lon, depth) queries, returning the
+        records in query order. Cache misses are grouped by environment window, and every window
+        scores all of its species in one predict_all_species pass. The whole batch uses one
+        profile table, even if the profiles are reloaded while it is being scored.
+        """
+        table = get_profile_table()
+        predictions = {}
+        misses = {}  # window -> {species: [(key, lat, lon)]}
+        for shark_type, lat, lon, depth in queries:
+            if not 0 <= depth < self.grid.depth_layers:
+                raise ValueError(f"Depth layer must be between 0 and {self.grid.depth_layers - 1}, got {depth}.")
+            key = self.cache_key(shark_type, lat, lon, depth, table)
+            if key in predictions:
+                continue
+            prediction = self.cache.get(key)
+            predictions[key] = prediction
+            if prediction is None:
+                # The simulated local environment is shared, a global one has a window per cell
+                window_key = key[1:3] if self.global_environment is not None else None
+                misses.setdefault(window_key, {}).setdefault(shark_type, []).append((key, lat, lon))
+
+        for species_keys in misses.values():
+            _, lat, lon = next(iter(species_keys.values()))[0]
+            if self.global_environment is not None:
+                environment = self.global_environment.window(lat, lon, self.grid)
+            else:
+                environment = self._local_environment
+            for shark_type, result in predict_all_species(environment, list(species_keys), self.grid, table).items():
+                prediction = (result["migration_delta"], result["optimal_depth"], result["max_sector_score"],
+                              result["best_direction"], result["current_scores"])
+                for key, _, _ in species_keys[shark_type]:
+                    predictions[key] = prediction
+                    self.cache.put(key, prediction)
+
+        return [
+            build_prediction_record(shark_type, lat, lon, depth,
+                                    predictions[self.cache_key(shark_type, lat, lon, depth, table)], table)
+            for shark_type, lat, lon, depth in queries
+        ]
+
+    def stats(self):
+        """Cache counters plus the current environment and profile table versions."""
+        return {**self.cache.stats(), "environment_version": self.environment_version,
+                "profile_version": get_profile_table().version}
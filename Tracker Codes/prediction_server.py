@@ -0,0 +1,314 @@
+"""
+Asynchronous local HTTP prediction service.
+
+Serves migration predictions to the web map and the tag-ingest pipeline without going through
+the interactive run_predictor. Requests arriving within a short batching window (BATCH_WINDOW
+seconds) are collected and scored together through PredictionService.predict_many, so hundreds
+of clients polling at once cost one vectorized pass per window instead of one prediction each.
+Predictions are cached per grid cell (see prediction_cache.py). The species profiles are
+reloaded whenever their files change (see profile_registry.py), without restarting the server.
+
+Routes:
+    GET  /health                                           liveness and environment version
+    GET  /metrics                                          request, batch, cache and profile counters
+                                                           (plus stage timings with --instrument)
+    GET  /predict?species=Tiger%20shark&lat=20&lon=30&depth=0
+    POST /predict    {"species": ..., "lat": ..., "lon": ..., "depth": ...} or a list of them
+
+Usage:
+    python prediction_server.py --seed 42 --port 8765
+    python prediction_server.py --environment-store region_store
+    python prediction_server.py --profiles shark_profiles.json profiles.d --reload-interval 5
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from urllib.parse import parse_qsl, urlsplit
+
+from batch_predictor import parse_position
+from environment_store import open_environment_store
+from prediction_cache import DEFAULT_MAX_ENTRIES, PredictionService
+from Predictor import DEFAULT_GRID, INSTRUMENTATION, PROFILES_FILE, GridConfig
+from profile_registry import DEFAULT_POLL_INTERVAL, ProfileRegistry
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+BATCH_WINDOW = 0.005  # Seconds to wait for more requests after the first one of a batch
+MAX_BATCH_SIZE = 1024  # Queries scored in one batch at most
+MAX_BODY_BYTES = 1 << 20
+LISTEN_BACKLOG = 1024  # Pending connections; hundreds of clients may connect at once
+
+HTTP_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+# --- REQUEST BATCHING ---
+
+class PredictionBatcher:
+    """
+    Collects the queries submitted within BATCH_WINDOW seconds of each other and scores them
+    as one predict_many batch in a worker thread, keeping the event loop free for I/O.
+    """
+
+    def __init__(self, service, window=BATCH_WINDOW, max_batch_size=MAX_BATCH_SIZE):
+        self.service = service
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._queue = asyncio.Queue()
+        self.requests = 0
+        self.queries = 0
+        self.batches = 0
+        self.scoring_seconds = 0.0
+
+    async def submit(self, queries):
+        """Queues a list of (species, lat, lon, depth) queries and waits for their records."""
+        future = asyncio.get_running_loop().create_future()
+        self.requests += 1
+        self.queries += len(queries)
+        await self._queue.put((queries, future))
+        return await future
+
+    async def _collect_batch(self):
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        size = len(batch[0][0])
+        deadline = loop.time() + self.window
+        while size < self.max_batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    def _score(self, batch):
+        """Scores a whole batch; if it fails, scores each submission alone so one bad query fails only its own request."""
+        try:
+            records = self.service.predict_many([query for queries, _ in batch for query in queries])
+        except ValueError:
+            results = []
+            for queries, _ in batch:
+                try:
+                    results.append(self.service.predict_many(queries))
+                except ValueError as exc:
+                    results.append(exc)
+            return results
+        results, start = [], 0
+        for queries, _ in batch:
+            results.append(records[start:start + len(queries)])
+            start += len(queries)
+        return results
+
+    async def run(self):
+        """Scores batches until cancelled."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect_batch()
+            started = time.perf_counter()
+            try:
+                results = await loop.run_in_executor(None, self._score, batch)
+            except Exception as exc:  # Unexpected failure: fail every request of the batch, keep serving
+                results = [exc] * len(batch)
+            self.scoring_seconds += time.perf_counter() - started
+            self.batches += 1
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue  # The client went away
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def metrics(self):
+        return {
+            "requests": self.requests,
+            "queries": self.queries,
+            "batches": self.batches,
+            "mean_batch_size": self.queries / self.batches if self.batches else 0.0,
+            "scoring_seconds": self.scoring_seconds,
+            "pending": self._queue.qsize(),
+        }
+
+# --- HTTP ---
+
+async def read_request(reader):
+    """Reads one HTTP/1.1 request. Returns (method, target, headers, body), or None at end of stream."""
+    request_line = await reader.readline()
+    if not request_line.strip():
+        return None
+    try:
+        method, target, _ = request_line.decode("latin-1").split()
+    except ValueError:
+        raise ValueError("Malformed request line.") from None
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0))
+    if length > MAX_BODY_BYTES:
+        raise OverflowError(f"Request body of {length} bytes exceeds {MAX_BODY_BYTES} bytes.")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, headers, body
+
+def encode_response(status, payload, keep_alive, headers=None):
+    """Encodes a JSON response; `headers` adds extra header fields (e.g., Retry-After)."""
+    body = json.dumps(payload).encode("utf-8")
+    extra = "".join(f"{name}: {value}\r\n" for name, value in (headers or {}).items())
+    head = (
+        f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n"
+        "Content-Type: application/json\r\n"
+        "Access-Control-Allow-Origin: *\r\n"
+        f"{extra}"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return head.encode("latin-1") + body
+
+class PredictionServer:
+    """
+    Routes HTTP requests to a PredictionBatcher around one PredictionService. `registry`, if
+    given, is the ProfileRegistry keeping the profiles up to date (reported on /metrics).
+    """
+
+    def __init__(self, service, window=BATCH_WINDOW, max_batch_size=MAX_BATCH_SIZE, registry=None):
+        self.service = service
+        self.registry = registry
+        self.batcher = PredictionBatcher(service, window, max_batch_size)
+        self.started_at = time.time()
+
+    def parse_queries(self, method, query_string, body):
+        """Validates the query parameters or JSON body into a list of queries and whether it was a list."""
+        if method == "GET":
+            rows, is_list = [dict(parse_qsl(query_string))], False
+        else:
+            try:
+                payload = json.loads(body or b"null")
+            except json.JSONDecodeError as exc:
+                raise ValueError(f"Invalid JSON body: {exc}.") from None
+            is_list = isinstance(payload, list)
+            rows = payload if is_list else [payload]
+            if not rows or not all(isinstance(row, dict) for row in rows):
+                raise ValueError("Expected a JSON object or a non-empty list of objects with species, lat, lon, depth.")
+        if len(rows) > self.batcher.max_batch_size:
+            raise ValueError(f"At most {self.batcher.max_batch_size} queries per request, got {len(rows)}.")
+        rows = [{"depth": 0, **row} for row in rows]  # Surface layer unless given
+        return [parse_position(row, number, self.service.grid) for number, row in enumerate(rows, start=1)], is_list
+
+    async def route(self, method, target, body):
+        """Returns (status, payload) for one request."""
+        url = urlsplit(target)
+        if url.path == "/health":
+            return 200, {"status": "ok", "environment_version": self.service.environment_version,
+                         "uptime_seconds": time.time() - self.started_at}
+        if url.path == "/metrics":
+            metrics = {**self.batcher.metrics(), "cache": self.service.stats()}
+            if self.registry is not None:
+                metrics["profiles"] = self.registry.stats()
+            if INSTRUMENTATION.enabled:
+                metrics["instrumentation"] = INSTRUMENTATION.report()
+            return 200, metrics
+        if url.path != "/predict":
+            return 404, {"error": f"Unknown route {url.path}."}
+        if method not in ("GET", "POST"):
+            return 405, {"error": f"Method {method} is not allowed on /predict."}
+        queries, is_list = self.parse_queries(method, url.query, body)
+        records = await self.batcher.submit(queries)
+        return 200, records if is_list else records[0]
+
+    async def serve_connection(self, reader, writer):
+        """Answers requests on one connection until the client closes it or asks to."""
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except OverflowError as exc:
+                    writer.write(encode_response(413, {"error": str(exc)}, keep_alive=False))
+                    break
+                except (ValueError, asyncio.IncompleteReadError) as exc:
+                    writer.write(encode_response(400, {"error": str(exc) or "Incomplete request."}, keep_alive=False))
+                    break
+                if request is None:
+                    break
+                method, target, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                try:
+                    response = await self.route(method, target, body)
+                except ValueError as exc:
+                    response = 400, {"error": str(exc)}
+                except Exception as exc:
+                    response = 500, {"error": f"{type(exc).__name__}: {exc}"}
+                writer.write(encode_response(*response, keep_alive=keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass  # The client disconnected mid-request
+        finally:
+            writer.close()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT, ready=None):
+        """Runs the server until cancelled. `ready`, if given, is an asyncio.Event set once listening."""
+        batch_task = asyncio.create_task(self.batcher.run())
+        server = await asyncio.start_server(self.serve_connection, host, port, backlog=LISTEN_BACKLOG)
+        self.port = server.sockets[0].getsockname()[1]
+        if ready is not None:
+            ready.set()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batch_task.cancel()
+
+# --- ENTRY POINT ---
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Serve migration predictions over HTTP with request batching.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="port to listen on (0 = any free port)")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the simulated environment (reproducible runs)")
+    parser.add_argument("--grid-size", type=int, default=DEFAULT_GRID.size, help="horizontal cells per side of the local grid")
+    parser.add_argument("--depth-layers", type=int, default=DEFAULT_GRID.depth_layers, help="number of depth layers")
+    parser.add_argument("--degree-span", type=float, default=DEFAULT_GRID.degree_span, help="degrees covered by the local grid")
+    parser.add_argument("--environment-store", default=None, help="environment store to cut each position's window from")
+    parser.add_argument("--batch-window", type=float, default=BATCH_WINDOW, help="seconds to collect requests into one batch")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_MAX_ENTRIES, help="predictions kept in the cache")
+    parser.add_argument("--cache-ttl", type=float, default=None, help="seconds before a cached prediction expires")
+    parser.add_argument("--instrument", action="store_true", help="collect per-stage timings and report them on /metrics")
+    parser.add_argument("--profiles", nargs="+", default=[PROFILES_FILE], help="profile files or directories of *.json files")
+    parser.add_argument("--reload-interval", type=float, default=DEFAULT_POLL_INTERVAL,
+                        help="seconds between checks for changed profile files (0 = never reload)")
+    return parser
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    try:
+        registry = ProfileRegistry(args.profiles, poll_interval=args.reload_interval)
+        registry.load()
+        grid = GridConfig(args.grid_size, args.depth_layers, args.degree_span)
+        store = open_environment_store(args.environment_store) if args.environment_store else None
+        service = PredictionService(store, seed=args.seed, grid=grid, max_entries=args.cache_size, ttl=args.cache_ttl)
+    except (ValueError, OSError) as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+    if args.reload_interval > 0:
+        registry.start()
+    INSTRUMENTATION.enabled = args.instrument
+    server = PredictionServer(service, window=args.batch_window, registry=registry)
+    print(f"Serving predictions on http://{args.host}:{args.port}/predict")
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,225 @@
+"""
+Species profile registry: profiles loaded from data files, hot-reloaded on change.
+
+The species the predictor knows come from JSON data files in the shark_profiles.json format
+(an object keyed by species name; see PROFILES_FILE). A registry reads one or more paths, each a
+file or a directory of *.json files (read in name order); a species defined again in a later
+file replaces the earlier definition, so regional overrides can sit next to the shared file:
+
+    ProfileRegistry([PROFILES_FILE, "profiles.d"])
+
+Every load validates all entries and compiles them into the predictor's ProfileTable before
+anything changes; a file with an error leaves the current table in place. A good load is
+installed with set_profile_table, which swaps the table in one step: batches already being
+scored keep the table they took, new ones get the new table, and no batch ever sees a
+half-updated species set. The table's version is part of the PredictionService cache key, so
+predictions made with old profiles are not served after a reload.
+
+start() polls the files' modification times and sizes in a background thread and reloads on
+change, so a long-running prediction server or telemetry ingester picks up edited profiles
+without a restart.
+
+Each profile may carry a "tracker" entry linking it to Tracker001.ino's SHARK_PROFILES[] array
+(id, short name, ecological type, primary diet). Telemetry maps tracker ids through it, and
+--tracker-array prints the firmware array from the same data, so the two lists cannot drift.
+
+Usage:
+    python profile_registry.py                                  validate shark_profiles.json
+    python profile_registry.py shark_profiles.json profiles.d   validate a merged set
+    python profile_registry.py --tracker-array > tracker_profiles.inc
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import threading
+import time
+
+from Predictor import PROFILES_FILE, compile_profile_table, set_profile_table
+
+DEFAULT_POLL_INTERVAL = 2.0  # Seconds between checks for changed profile files
+
+# --- READING ---
+
+def profile_files(paths):
+    """The profile files named by `paths` (files, or directories of *.json files), in load order."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "*.json"))))
+        elif os.path.exists(path):
+            files.append(path)
+        else:
+            raise FileNotFoundError(f"Profile path {path} does not exist.")
+    if not files:
+        raise ValueError(f"No profile files found in {', '.join(map(str, paths))}.")
+    return files
+
+def files_fingerprint(paths):
+    """(file, mtime_ns, size) of every profile file; changes whenever a file is edited, added or removed."""
+    fingerprint = []
+    for file_name in profile_files(paths):
+        stat = os.stat(file_name)
+        fingerprint.append((file_name, stat.st_mtime_ns, stat.st_size))
+    return tuple(fingerprint)
+
+def read_profiles(paths):
+    """
+    Merges the profiles of every file, later files replacing earlier definitions of a species.
+    Returns (profiles, files). Raises ValueError naming the file when one is not valid JSON.
+    """
+    profiles = {}
+    files = profile_files(paths)
+    for file_name in files:
+        try:
+            with open(file_name, encoding="utf-8") as handle:
+                data = json.load(handle)
+        except json.JSONDecodeError as exc:
+            raise ValueError(f"{file_name}: invalid JSON ({exc}).") from None
+        if not isinstance(data, dict):
+            raise ValueError(f"{file_name}: expected a JSON object keyed by species name.")
+        profiles.update(data)
+    return profiles, files
+
+# --- REGISTRY ---
+
+class ProfileRegistry:
+    """
+    Loads, validates and compiles the profile files, installs the result as the predictor's
+    profile table, and (after start()) reloads it whenever the files change.
+    """
+
+    def __init__(self, paths=(PROFILES_FILE,), poll_interval=DEFAULT_POLL_INTERVAL):
+        self.paths = [os.fspath(path) for path in paths]
+        self.poll_interval = poll_interval
+        self.table = None
+        self.files = []
+        self.loads = 0
+        self.failures = 0
+        self.last_error = None
+        self.loaded_at = None
+        self._fingerprint = None
+        self._lock = threading.Lock()  # One load at a time
+        self._stop = threading.Event()
+        self._thread = None
+
+    def load(self):
+        """
+        Reads, validates and compiles every file, then installs the new table. Returns it.
+        On error (ValueError / OSError) the current table stays installed and the error is raised.
+        """
+        with self._lock:
+            # Fingerprint first: a file edited during the read is then seen as changed next time
+            fingerprint = None
+            try:
+                fingerprint = files_fingerprint(self.paths)
+                profiles, files = read_profiles(self.paths)
+                table = compile_profile_table(profiles)
+            except (ValueError, OSError) as exc:
+                self._fingerprint = fingerprint  # Retried once the files change again
+                self.failures += 1
+                self.last_error = str(exc)
+                raise
+            self.table = set_profile_table(table, profiles)
+            self.files = files
+            self._fingerprint = fingerprint
+            self.loads += 1
+            self.last_error = None
+            self.loaded_at = time.time()
+            return self.table
+
+    def changed(self):
+        """True when a profile file was edited, added or removed since the last load attempt."""
+        try:
+            return files_fingerprint(self.paths) != self._fingerprint
+        except (ValueError, OSError):
+            return self._fingerprint is not None  # Files went missing: report it through load()
+
+    def reload_if_changed(self):
+        """
+        Reloads when the files changed. Returns True if a new table was installed. Errors are
+        recorded in last_error rather than raised, so a bad edit never takes the service down.
+        """
+        if not self.changed():
+            return False
+        try:
+            self.load()
+        except (ValueError, OSError):
+            return False
+        return True
+
+    def _watch(self):
+        while not self._stop.wait(self.poll_interval):
+            self.reload_if_changed()
+
+    def start(self):
+        """Loads the profiles if not done yet and starts polling for changes in a daemon thread."""
+        if self.table is None:
+            self.load()
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name="profile-registry", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops polling."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def stats(self):
+        return {
+            "profile_version": self.table.version if self.table is not None else None,
+            "species": len(self.table.names) if self.table is not None else 0,
+            "files": list(self.files),
+            "loads": self.loads,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "loaded_at": self.loaded_at,
+        }
+
+# --- TRACKER FIRMWARE ---
+
+def tracker_profiles_array(profiles):
+    """
+    The C initializer of Tracker001.ino's SHARK_PROFILES[] for every profile with a "tracker"
+    entry, ordered by tracker id.
+    """
+    entries = sorted((profile["tracker"] for profile in profiles.values() if "tracker" in profile),
+                     key=lambda tracker: tracker["id"])
+    lines = [
+        f'    {{{json.dumps(tracker["id"])}, {json.dumps(tracker.get("name", ""))}, '
+        f'{json.dumps(tracker.get("type", ""))}, {json.dumps(tracker.get("diet", ""))}}}'
+        for tracker in entries
+    ]
+    return "const SharkProfile SHARK_PROFILES[] = {\n" + ",\n".join(lines) + "\n};\n"
+
+# --- ENTRY POINT ---
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Validate the species profile files or export the tracker's profile array.")
+    parser.add_argument("paths", nargs="*", default=[PROFILES_FILE], help="profile files or directories of *.json files")
+    parser.add_argument("--tracker-array", action="store_true", help="print Tracker001.ino's SHARK_PROFILES[] array")
+    return parser
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    try:
+        profiles, files = read_profiles(args.paths)
+        table = compile_profile_table(profiles)
+    except (ValueError, OSError) as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+    if args.tracker_array:
+        sys.stdout.write(tracker_profiles_array(profiles))
+    else:
+        print(f"{len(table.names)} species from {len(files)} file(s) are valid "
+              f"({len(table.tracker_species)} linked to tracker ids).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
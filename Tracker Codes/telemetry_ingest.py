@@ -0,0 +1,402 @@
+"""
+Streaming ingestion of the tracker telemetry posted by Tracker001.ino.
+
+Every DATA_SEND_INTERVAL, sendDataToSheet() POSTs one JSON fix per tag:
+
+    {"shark_id": "S39", "shark_name": "Tiger Shark", "primary_diet": "...",
+     "latitude": 20.123456, "longitude": 30.654321, "depth": 15.0,
+     "diet_status": "...", "eating_count": 3}
+
+TelemetryIngester parses those payloads (one object, a JSON list or newline-delimited JSON, so
+a gateway can forward many fixes at once), maps the tracker IDs S01-S42 onto the profiles' species,
+converts the depth in meters into a depth layer, and scores the fixes incrementally as they
+arrive: fixes are queued and scored in batches through PredictionService.predict_many, and a
+shark that has not left its grid cell is served from the prediction cache.
+
+The queue is bounded. When it is full the stand-in endpoint answers 503 with Retry-After, so a
+fleet of tags reporting faster than the process can score is slowed down instead of growing
+memory without limit. Only the latest record per shark is kept; pass `on_record` to forward
+every record elsewhere.
+
+Usage (local stand-in for GOOGLE_SCRIPT_URL):
+    python telemetry_ingest.py --seed 42 --port 8080
+    python telemetry_ingest.py --seed 42 --replay fixes.ndjson
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+from environment_store import DEFAULT_DEPTH_BINS, open_environment_store
+from prediction_cache import PredictionService
+from prediction_server import encode_response, read_request
+from Predictor import DEFAULT_GRID, PROFILES_FILE, GridConfig, get_profile_table
+from profile_registry import DEFAULT_POLL_INTERVAL, ProfileRegistry
+
+DEFAULT_PORT = 8080
+DEFAULT_QUEUE_SIZE = 10000  # Fixes waiting to be scored
+DEFAULT_BATCH_SIZE = 512  # Fixes scored per batch at most
+RETRY_AFTER_SECONDS = 5
+
+def tracker_species():
+    """
+    Tracker001.ino profile id ("S01"-"S42") -> Predictor species name, from the "tracker" entry
+    of each profile in shark_profiles.json (the tracker uses shorter names). Follows profile reloads.
+    """
+    return get_profile_table().tracker_species
+
+# --- PARSING ---
+
+@dataclass(frozen=True)
+class TelemetryFix:
+    """One parsed tracker fix. `depth_layer` is the model layer containing `depth_m`."""
+    shark_id: str
+    species: str
+    lat: float
+    lon: float
+    depth_m: float
+    depth_layer: int
+    diet_status: str
+    eating_count: int
+    received_at: float
+
+def depth_layer_for(depth_m, depth_bins=DEFAULT_DEPTH_BINS):
+    """Index of the depth bin ([top, bottom) meters, None = open-ended) containing `depth_m`."""
+    for layer, (top, bottom) in enumerate(depth_bins):
+        if depth_m >= top and (bottom is None or depth_m < bottom):
+            return layer
+    if depth_m < depth_bins[0][0]:
+        return 0  # Slightly above the first bin (sensor noise at the surface)
+    return len(depth_bins) - 1
+
+def parse_payload(payload, depth_bins=DEFAULT_DEPTH_BINS, received_at=None):
+    """Validates one tracker payload dict and returns it as a TelemetryFix."""
+    if not isinstance(payload, dict):
+        raise ValueError(f"Expected a JSON object per fix, got {type(payload).__name__}.")
+    shark_id = str(payload.get("shark_id", "")).strip().upper()
+    species_by_id = tracker_species()
+    if shark_id not in species_by_id:
+        raise ValueError(f"Unknown tracker shark_id '{shark_id}'.")
+    try:
+        lat = float(payload["latitude"])
+        lon = float(payload["longitude"])
+        depth_m = float(payload.get("depth", 0.0))
+        eating_count = int(payload.get("eating_count", 0))
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(f"Fix from {shark_id}: latitude/longitude/depth must be numbers and eating_count an integer.") from None
+    if not -90.0 <= lat <= 90.0:
+        raise ValueError(f"Fix from {shark_id}: latitude {lat} is outside -90.0 to 90.0.")
+    if not -180.0 <= lon <= 180.0:
+        raise ValueError(f"Fix from {shark_id}: longitude {lon} is outside -180.0 to 180.0.")
+    return TelemetryFix(
+        shark_id=shark_id,
+        species=species_by_id[shark_id],
+        lat=lat,
+        lon=lon,
+        depth_m=depth_m,
+        depth_layer=depth_layer_for(depth_m, depth_bins),
+        diet_status=str(payload.get("diet_status", "")),
+        eating_count=eating_count,
+        received_at=time.time() if received_at is None else received_at,
+    )
+
+def parse_payloads(body, depth_bins=DEFAULT_DEPTH_BINS):
+    """
+    Parses a request body holding one fix, a JSON list of fixes or newline-delimited fixes.
+    Returns (fixes, errors) so a single bad fix does not drop the rest of a bulk upload.
+    """
+    text = body.decode("utf-8") if isinstance(body, bytes) else body
+    try:
+        payload = json.loads(text)
+        payloads = payload if isinstance(payload, list) else [payload]
+    except json.JSONDecodeError:
+        payloads = []
+        for number, line in enumerate(text.splitlines(), start=1):
+            if line.strip():
+                try:
+                    payloads.append(json.loads(line))
+                except json.JSONDecodeError as exc:
+                    payloads.append(ValueError(f"Line {number}: invalid JSON ({exc})."))
+
+    received_at = time.time()
+    fixes, errors = [], []
+    for payload in payloads:
+        try:
+            if isinstance(payload, ValueError):
+                raise payload
+            fixes.append(parse_payload(payload, depth_bins, received_at))
+        except ValueError as exc:
+            errors.append(str(exc))
+    return fixes, errors
+
+# --- INGESTION ---
+
+class TelemetryIngester:
+    """
+    Scores queued TelemetryFix objects in batches. `on_record`, if given, is called with every
+    scored record (e.g., to append it to a track store).
+    """
+
+    def __init__(self, service, depth_bins=DEFAULT_DEPTH_BINS, queue_size=DEFAULT_QUEUE_SIZE,
+                 batch_size=DEFAULT_BATCH_SIZE, on_record=None):
+        if len(depth_bins) != service.grid.depth_layers:
+            raise ValueError(f"{len(depth_bins)} depth bins given for a grid with {service.grid.depth_layers} depth layers.")
+        self.service = service
+        self.depth_bins = depth_bins
+        self.batch_size = batch_size
+        self.on_record = on_record
+        self._queue = asyncio.Queue(maxsize=queue_size)
+        self.latest = {}  # shark_id -> latest scored record
+        self.received = 0
+        self.rejected = 0
+        self.invalid = 0
+        self.scored = 0
+        self.batches = 0
+
+    def offer(self, fixes):
+        """
+        Queues as many `fixes` as fit without waiting and returns how many were accepted;
+        the caller should ask the sender to retry the rest later.
+        """
+        accepted = 0
+        for fix in fixes:
+            try:
+                self._queue.put_nowait(fix)
+            except asyncio.QueueFull:
+                break
+            accepted += 1
+        self.received += accepted
+        self.rejected += len(fixes) - accepted
+        return accepted
+
+    async def put(self, fix):
+        """Queues one fix, waiting while the queue is full (backpressure for in-process producers)."""
+        await self._queue.put(fix)
+        self.received += 1
+
+    def _next_batch(self):
+        batch = []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    def score_batch(self, fixes):
+        """Scores a list of fixes in one predict_many pass and returns their records."""
+        predictions = self.service.predict_many(
+            [(fix.species, fix.lat, fix.lon, fix.depth_layer) for fix in fixes]
+        )
+        return self._emit(fixes, predictions)
+
+    def _emit(self, fixes, predictions):
+        """Builds the records of scored fixes, publishes them (latest, on_record) and counts the batch."""
+        records = []
+        for fix, prediction in zip(fixes, predictions):
+            record = {
+                **prediction,
+                "shark_id": fix.shark_id,
+                "depth_m": fix.depth_m,
+                "diet_status": fix.diet_status,
+                "eating_count": fix.eating_count,
+                "received_at": fix.received_at,
+            }
+            records.append(record)
+            self.latest[fix.shark_id] = record
+            if self.on_record is not None:
+                self.on_record(record)
+        self.scored += len(records)
+        self.batches += 1
+        return records
+
+    def _score_or_isolate(self, fixes):
+        """
+        Scores a batch; if a fix cannot be scored (e.g., outside a regional environment, or an
+        unexpected scoring failure), predicts the fixes one by one and drops the bad ones, so one
+        fix never stops the ingester. Records are only built and published once every prediction
+        of the batch is in, so none is published twice.
+        """
+        queries = [(fix.species, fix.lat, fix.lon, fix.depth_layer) for fix in fixes]
+        try:
+            predictions = self.service.predict_many(queries)
+        except Exception:
+            scored_fixes, predictions = [], []
+            for fix, query in zip(fixes, queries):
+                try:
+                    predictions.append(self.service.predict_many([query])[0])
+                except ValueError as exc:
+                    self.invalid += 1
+                    print(f"Dropped fix from {fix.shark_id}: {exc}", file=sys.stderr)
+                    continue
+                except Exception as exc:  # Unexpected failure: drop the fix, keep ingesting
+                    self.invalid += 1
+                    print(f"Dropped fix from {fix.shark_id}: {type(exc).__name__}: {exc}", file=sys.stderr)
+                    continue
+                scored_fixes.append(fix)
+            fixes = scored_fixes
+        if fixes:
+            self._emit(fixes, predictions)
+
+    async def run(self):
+        """Scores fixes as they arrive, until cancelled. Scoring runs in a worker thread."""
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            batch += self._next_batch()
+            try:
+                await loop.run_in_executor(None, self._score_or_isolate, batch)
+            except Exception as exc:  # Unexpected failure outside scoring: drop the batch, keep ingesting
+                self.invalid += len(batch)
+                print(f"Dropped {len(batch)} fixes: {type(exc).__name__}: {exc}", file=sys.stderr)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def drain(self):
+        """Waits until every queued fix has been scored."""
+        await self._queue.join()
+
+    def metrics(self):
+        return {
+            "received": self.received,
+            "rejected": self.rejected,
+            "invalid": self.invalid,
+            "scored": self.scored,
+            "batches": self.batches,
+            "queued": self._queue.qsize(),
+            "sharks": len(self.latest),
+            "cache": self.service.stats(),
+        }
+
+# --- STAND-IN ENDPOINT ---
+
+class TelemetryEndpoint:
+    """
+    A local HTTP stand-in for the tracker's GOOGLE_SCRIPT_URL.
+    POST / (or /telemetry) accepts fixes; GET /latest returns the latest record per shark;
+    GET /metrics returns the ingestion counters.
+    """
+
+    def __init__(self, ingester):
+        self.ingester = ingester
+
+    def route(self, method, target, body):
+        path = urlsplit(target).path
+        if method == "POST" and path in ("/", "/telemetry"):
+            fixes, errors = parse_payloads(body, self.ingester.depth_bins)
+            self.ingester.invalid += len(errors)
+            accepted = self.ingester.offer(fixes)
+            if accepted < len(fixes):
+                return 503, {"status": "busy", "accepted": accepted, "retry_after": RETRY_AFTER_SECONDS, "errors": errors}
+            if errors and not fixes:
+                return 400, {"status": "error", "errors": errors}
+            return 200, {"status": "success", "accepted": accepted, "errors": errors}
+        if method == "GET" and path == "/latest":
+            return 200, self.ingester.latest
+        if method == "GET" and path == "/metrics":
+            return 200, self.ingester.metrics()
+        return 404, {"error": f"Unknown route {method} {path}."}
+
+    async def serve_connection(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                except (ValueError, OverflowError, asyncio.IncompleteReadError) as exc:
+                    writer.write(encode_response(400, {"error": str(exc) or "Incomplete request."}, keep_alive=False))
+                    break
+                if request is None:
+                    break
+                method, target, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                status, payload = self.route(method, target, body)
+                extra_headers = {"Retry-After": RETRY_AFTER_SECONDS} if status == 503 else None
+                writer.write(encode_response(status, payload, keep_alive, extra_headers))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=DEFAULT_PORT, ready=None):
+        """Runs the endpoint and the ingester until cancelled."""
+        ingest_task = asyncio.create_task(self.ingester.run())
+        server = await asyncio.start_server(self.serve_connection, host, port)
+        self.port = server.sockets[0].getsockname()[1]
+        if ready is not None:
+            ready.set()
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            ingest_task.cancel()
+
+async def replay(ingester, path):
+    """Ingests a newline-delimited or JSON-list file of recorded payloads and returns how many were scored."""
+    with open(path, encoding="utf-8") as handle:
+        fixes, errors = parse_payloads(handle.read(), ingester.depth_bins)
+    ingester.invalid += len(errors)
+    for error in errors:
+        print(f"Skipped: {error}", file=sys.stderr)
+    ingest_task = asyncio.create_task(ingester.run())
+    try:
+        for fix in fixes:
+            await ingester.put(fix)
+        await ingester.drain()
+    finally:
+        ingest_task.cancel()
+    return ingester.scored
+
+# --- ENTRY POINT ---
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Ingest and score the tracker's telemetry stream.")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="port to listen on (0 = any free port)")
+    parser.add_argument("--replay", default=None, help="score a file of recorded payloads instead of listening")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the simulated environment (reproducible runs)")
+    parser.add_argument("--grid-size", type=int, default=DEFAULT_GRID.size, help="horizontal cells per side of the local grid")
+    parser.add_argument("--degree-span", type=float, default=DEFAULT_GRID.degree_span, help="degrees covered by the local grid")
+    parser.add_argument("--environment-store", default=None, help="environment store to cut each fix's window from")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE, help="fixes buffered before senders are told to retry")
+    parser.add_argument("--profiles", nargs="+", default=[PROFILES_FILE], help="profile files or directories of *.json files")
+    parser.add_argument("--reload-interval", type=float, default=DEFAULT_POLL_INTERVAL,
+                        help="seconds between checks for changed profile files (0 = never reload)")
+    return parser
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    try:
+        registry = ProfileRegistry(args.profiles, poll_interval=args.reload_interval)
+        registry.load()
+        store = open_environment_store(args.environment_store) if args.environment_store else None
+        depth_bins = store.depth_bins if store is not None else DEFAULT_DEPTH_BINS
+        grid = GridConfig(args.grid_size, len(depth_bins), args.degree_span, store.depth_bins if store is not None else None)
+        service = PredictionService(store, seed=args.seed, grid=grid)
+        on_record = (lambda record: print(json.dumps(record))) if args.replay else None
+        ingester = TelemetryIngester(service, depth_bins, queue_size=args.queue_size, on_record=on_record)
+        if args.replay:
+            asyncio.run(replay(ingester, args.replay))
+            return 0
+    except (ValueError, OSError) as exc:
+        print(f"Error: {exc}", file=sys.stderr)
+        return 1
+    if args.reload_interval > 0:
+        registry.start()
+    endpoint = TelemetryEndpoint(ingester)
+    print(f"Accepting tracker telemetry on http://{args.host}:{args.port}/")
+    try:
+        asyncio.run(endpoint.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,25 @@
+"""
+Shared fixtures. The tracker modules are plain scripts importing one another by name
+(`from Predictor import ...`), so their directory is put on sys.path first.
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import Predictor  # noqa: E402
+from Predictor import GridConfig  # noqa: E402
+
+@pytest.fixture
+def small_grid():
+    """A 12x12 grid with the default 3 depth layers, fast enough for every test."""
+    return GridConfig(12)
+
+@pytest.fixture
+def restore_profiles():
+    """Puts the original profile table back after a test that installs another one."""
+    profiles, table = Predictor.get_shark_profiles(), Predictor.get_profile_table()
+    yield
+    Predictor.set_profile_table(table, profiles)
@@ -0,0 +1,32 @@
+import pytest
+
+from batch_predictor import predict_positions, predict_positions_parallel
+from environment_store import GlobalEnvironment
+from Predictor import GridConfig, calculate_species_hsi_volume, generate_simulated_environment
+
+SPECIES = "Tiger shark"
+GRID = GridConfig(12, 3, 6.0)
+# Window corners of a regional raster, an off-center edge and the center
+POSITIONS = [(SPECIES, 8.9, -8.9, 0), (SPECIES, -8.9, 8.9, 1), (SPECIES, 0.2, 8.6, 2), (SPECIES, 0.2, 0.2, 0)]
+
+@pytest.fixture(scope="module")
+def regional_environment():
+    environment = generate_simulated_environment(36, 3, rng=5)
+    return environment, GlobalEnvironment(environment, (-9, 9, -9, 9))
+
+def expected_current_hsi(environment, global_environment):
+    volume = calculate_species_hsi_volume(SPECIES, environment)
+    return [volume[global_environment.cell_index(lat, lon) + (depth,)] for _, lat, lon, depth in POSITIONS]
+
+def test_current_hsi_is_read_at_each_rows_cell(regional_environment):
+    environment, global_environment = regional_environment
+    records = list(predict_positions(POSITIONS, grid=GRID, global_environment=global_environment))
+    assert [record["current_hsi"] for record in records] == pytest.approx(
+        expected_current_hsi(environment, global_environment))
+
+def test_parallel_rows_match_serial_rows(regional_environment):
+    _, global_environment = regional_environment
+    serial = list(predict_positions(POSITIONS, grid=GRID, global_environment=global_environment))
+    parallel = list(predict_positions_parallel(POSITIONS, workers=2, chunk_size=1, grid=GRID,
+                                               global_environment=global_environment))
+    assert parallel == serial
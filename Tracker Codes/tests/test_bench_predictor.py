@@ -0,0 +1,17 @@
+import pytest
+
+from bench_predictor import build_cases, main
+from Predictor import get_profile_table
+
+@pytest.mark.parametrize("count", [0, len(get_profile_table().names) + 1])
+def test_species_counts_beyond_the_profiles_are_rejected(count):
+    with pytest.raises(SystemExit) as exit_info:
+        main(["--species", str(count), "--sizes", "20"])
+    assert exit_info.value.code == 2
+    with pytest.raises(ValueError):
+        list(build_cases([20], [3], [count]))
+
+def test_case_keys_record_the_species_scored():
+    count = len(get_profile_table().names)
+    keys = [params for name, params, items, _ in build_cases([20], [3], [count]) if name == "predict_all_species"]
+    assert keys == [{"size": 20, "depth": 3, "species": count}]
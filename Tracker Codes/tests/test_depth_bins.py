@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from batch_predictor import predict_positions
+from environment_store import GlobalEnvironment, predict_from_store
+from hotspots import global_hotspots
+from hsi_tiles import score_raster
+from prediction_cache import PredictionService
+from Predictor import (
+    GridConfig,
+    build_prediction_record,
+    calculate_species_hsi_volume,
+    generate_simulated_environment,
+    make_depth_bins,
+    predict_next_location,
+)
+from track_store import TrackStore, habitat_scores
+
+SPECIES = "Tiger shark"
+DEPTH_BINS = make_depth_bins(300, 50)  # 7 layers placed in meters
+
+@pytest.fixture(scope="module")
+def binned_environment():
+    environment = generate_simulated_environment(36, len(DEPTH_BINS), rng=2, depth_bins=DEPTH_BINS)
+    return environment, GlobalEnvironment(environment, (-9, 9, -9, 9), DEPTH_BINS)
+
+def test_every_tool_uses_the_environment_depth_bins(binned_environment):
+    environment, global_environment = binned_environment
+    reference = calculate_species_hsi_volume(SPECIES, environment, depth_bins=DEPTH_BINS)
+    unbinned = calculate_species_hsi_volume(SPECIES, environment)
+    assert not np.allclose(reference, unbinned)  # The bins matter for this environment
+
+    assert np.array_equal(score_raster(global_environment, SPECIES), reference.max(axis=2).astype(np.float32))
+
+    best = global_hotspots(SPECIES, global_environment, k=1)[0]
+    assert best["hsi"] == reference.max()
+    assert best["depth"] == np.unravel_index(reference.argmax(), reference.shape)[2]
+
+    store = TrackStore()
+    store.append(0.0, 1.2, -3.4, 120.0, 39, SPECIES)
+    row, col = global_environment.cell_index(1.2, -3.4)
+    layer = 120 // 50
+    assert habitat_scores(store.query(), global_environment, store.species_names)[0] == reference[row, col, layer]
+
+def test_prediction_paths_agree_on_binned_store(binned_environment):
+    _, global_environment = binned_environment
+    grid = GridConfig(12, len(DEPTH_BINS), 6.0)
+    binned_grid = grid.with_depth_bins(DEPTH_BINS)
+    prediction = predict_next_location(SPECIES, global_environment.window(1.0, 2.0, grid), binned_grid)
+    expected = build_prediction_record(SPECIES, 1.0, 2.0, 0, prediction)
+
+    assert predict_from_store(global_environment, SPECIES, 1.0, 2.0, 0, grid) == expected
+    assert next(predict_positions([(SPECIES, 1.0, 2.0, 0)], grid=grid, global_environment=global_environment)) == expected
+    assert PredictionService(global_environment, grid=grid).predict(SPECIES, 1.0, 2.0, 0) == expected
@@ -0,0 +1,27 @@
+import pytest
+
+from environment_store import GlobalEnvironment, predict_from_store
+from Predictor import GridConfig, calculate_species_hsi_volume, generate_simulated_environment
+
+SPECIES = "Tiger shark"
+GRID = GridConfig(12, 3, 6.0)
+
+@pytest.fixture(scope="module")
+def regional_environment():
+    environment = generate_simulated_environment(36, 3, rng=5)
+    return environment, GlobalEnvironment(environment, (-9, 9, -9, 9))
+
+def test_window_cell_is_off_center_at_regional_edges(regional_environment):
+    _, global_environment = regional_environment
+    assert global_environment.window_cell(0.2, 0.2, GRID) == (GRID.center_index, GRID.center_index)
+    assert global_environment.window_cell(8.9, -8.9, GRID) == (0, 0)
+    assert global_environment.window_cell(-8.9, 8.9, GRID) == (GRID.size - 1, GRID.size - 1)
+
+@pytest.mark.parametrize("lat, lon", [(8.9, -8.9), (-8.9, 8.9), (0.2, 8.6)])
+def test_current_hsi_is_read_at_the_sharks_cell(regional_environment, lat, lon):
+    environment, global_environment = regional_environment
+    volume = calculate_species_hsi_volume(SPECIES, environment)
+    row, col = global_environment.cell_index(lat, lon)
+    for depth in range(3):
+        record = predict_from_store(global_environment, SPECIES, lat, lon, depth, GRID)
+        assert record["current_hsi"] == pytest.approx(volume[row, col, depth])
@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+
+from environment_store import GlobalEnvironment
+from hotspots import find_hotspots, global_hotspots, local_maxima_mask, top_k_indices
+from Predictor import calculate_species_hsi_volume, generate_simulated_environment
+
+def brute_force_hotspots(scores, k, region=None, min_separation=0.0, local_maxima=False):
+    """Full sort (best first, lower flat index on ties) and a greedy pass over every candidate."""
+    eligible = np.ones(scores.shape, dtype=bool)
+    if region is not None:
+        eligible &= np.broadcast_to(region.reshape(region.shape + (1,) * (scores.ndim - region.ndim)), scores.shape)
+    if local_maxima:
+        eligible &= local_maxima_mask(scores)
+    candidates = np.flatnonzero(eligible)
+    order = candidates[np.lexsort((candidates, -scores.ravel()[candidates]))]
+    kept = []
+    for flat_cell in order:
+        cell = np.unravel_index(flat_cell, scores.shape)
+        if all(np.hypot(cell[0] - other[0], cell[1] - other[1]) >= min_separation for other in kept):
+            kept.append(cell)
+            if len(kept) == k:
+                break
+    return np.array(kept, dtype=np.intp).reshape(-1, scores.ndim)
+
+def test_top_k_indices_is_a_stable_full_sort_prefix():
+    rng = np.random.default_rng(0)
+    values = rng.integers(0, 20, 500).astype(float)  # Many ties
+    expected = np.lexsort((np.arange(values.size), -values))
+    for k in (1, 7, 100, 500, 600):
+        assert np.array_equal(top_k_indices(values, k), expected[:k])
+
+@pytest.mark.parametrize("shape", [(40, 40), (25, 30, 4)])
+@pytest.mark.parametrize("min_separation", [0.0, 1.5, 3.0, 8.0])
+@pytest.mark.parametrize("local_maxima", [False, True])
+def test_find_hotspots_matches_brute_force(shape, min_separation, local_maxima):
+    rng = np.random.default_rng(len(shape) * 100 + int(min_separation * 10))
+    scores = np.round(rng.random(shape), 2)  # Rounded, so ties occur
+    region = rng.random(shape[:2]) < 0.7
+    for k in (1, 10, 60):
+        for mask in (None, region):
+            cells, values = find_hotspots(scores, k, mask, min_separation, local_maxima)
+            expected = brute_force_hotspots(scores, k, mask, min_separation, local_maxima)
+            assert np.array_equal(cells, expected)
+            assert np.array_equal(values, scores[tuple(expected.T)])
+
+def test_separation_pool_grows_until_k_found():
+    # One plateau of near-equal cells fills the first candidate pool; the rest are far apart
+    scores = np.zeros((50, 50))
+    scores[:10, :10] = 1.0
+    scores[::12, ::12] += 0.5
+    cells, _ = find_hotspots(scores, 12, min_separation=11.0)
+    assert len(cells) == 12
+    assert np.array_equal(cells, brute_force_hotspots(scores, 12, min_separation=11.0))
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError):
+        find_hotspots(np.zeros((4, 4)), 0)
+    with pytest.raises(ValueError):
+        find_hotspots(np.zeros((4, 4)), 1, min_separation=-1.0)
+    with pytest.raises(ValueError):
+        find_hotspots(np.zeros((4, 4)), 1, region=np.ones((3, 3), dtype=bool))
+
+@pytest.mark.parametrize("raster_bounds, bounds", [
+    ((-9, 9, -9, 9), (-4, 4, -3, 5)),          # Regional raster, block inside it
+    ((-9, 9, -9, 9), (-9, 4, -9, 5)),          # Block on the raster's own edges
+    ((-90, 90, -180, 180), (-40, 40, 100, 180)),  # 360° raster: the halo wraps to the west edge
+])
+def test_global_local_maxima_look_past_the_bounds(raster_bounds, bounds):
+    environment = generate_simulated_environment(36, 3, rng=8)
+    if raster_bounds[3] - raster_bounds[2] == 360:
+        environment = {name: np.concatenate((layer, layer[:, ::-1]), axis=1) for name, layer in environment.items()}
+    global_environment = GlobalEnvironment(environment, raster_bounds)
+    best = calculate_species_hsi_volume("Tiger shark", environment).max(axis=2)
+    # Reference: local maxima of the whole raster, with longitude wrapping on a 360° raster
+    if global_environment.wraps_longitude:
+        maxima = local_maxima_mask(np.pad(best, ((0, 0), (1, 1)), mode="wrap"))[:, 1:-1]
+    else:
+        maxima = local_maxima_mask(best)
+
+    hotspots = global_hotspots("Tiger shark", global_environment, k=1000, bounds=bounds, local_maxima=True)
+    found = {(hotspot["row"], hotspot["col"]) for hotspot in hotspots}
+    lats = raster_bounds[1] - (np.arange(best.shape[0]) + 0.5) * global_environment.resolution
+    lons = raster_bounds[2] + (np.arange(best.shape[1]) + 0.5) * global_environment.resolution
+    inside = ((lats >= bounds[0]) & (lats <= bounds[1]))[:, None] & ((lons >= bounds[2]) & (lons <= bounds[3]))[None, :]
+    assert found == set(zip(*np.nonzero(maxima & inside)))
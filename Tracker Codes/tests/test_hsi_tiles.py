@@ -0,0 +1,82 @@
+import os
+
+import numpy as np
+
+import hsi_tiles
+from environment_store import write_environment_store
+from hsi_tiles import color_indices, generate_tiles, score_raster
+from Predictor import calculate_species_hsi_volume, generate_simulated_environment
+
+SPECIES = "Tiger shark"
+BOUNDS = (-90, 90, -180, 180)
+
+def global_layers(seed=1):
+    half = generate_simulated_environment(36, 3, rng=seed)
+    return {name: np.concatenate([values, values], axis=1) for name, values in half.items()}
+
+def tile_files(output_dir):
+    files = {}
+    for root, _, names in os.walk(output_dir):
+        for name in names:
+            if name.endswith(".png"):
+                path = os.path.join(root, name)
+                with open(path, "rb") as handle:
+                    files[os.path.relpath(path, output_dir)] = handle.read()
+    return files
+
+def test_score_raster_matches_full_volume(tmp_path):
+    layers = global_layers()
+    store = write_environment_store(tmp_path / "store", layers, BOUNDS)
+    volume = calculate_species_hsi_volume(SPECIES, layers)
+    assert np.array_equal(score_raster(store, SPECIES, band_rows=7), volume.max(axis=2).astype(np.float32))
+    assert np.array_equal(score_raster(store, SPECIES, 1, band_rows=7), volume[:, :, 1].astype(np.float32))
+    block = (5, 10, 8, 20)
+    assert np.array_equal(score_raster(store, SPECIES, block=block), volume[5:13, 10:30].max(axis=2).astype(np.float32))
+
+def test_incremental_regeneration_matches_full_build(tmp_path, monkeypatch):
+    layers = global_layers()
+    store = write_environment_store(tmp_path / "store", layers, BOUNDS)
+    generate_tiles(store, tmp_path / "tiles", [SPECIES], ["max", 1], 0, 3)
+
+    store.layer("eddy_strength")[20:24, 40:44] += 0.8  # Cells of lat -10..-30, lon 20..40 (5° cells)
+    store.layer("eddy_strength").flush()
+    changed_bounds = (-30.0, -10.0, 20.0, 40.0)
+    blocks = []
+    original_score_raster = hsi_tiles.score_raster
+
+    def recording_score_raster(*args, block=None, **kwargs):
+        blocks.append(block)
+        return original_score_raster(*args, block=block, **kwargs)
+    monkeypatch.setattr(hsi_tiles, "score_raster", recording_score_raster)
+    counts = generate_tiles(store, tmp_path / "tiles", [SPECIES], ["max", 1], 0, 3, changed_bounds)
+    assert blocks == [(19, 39, 7, 7)] * 2  # Only the changed cells plus the margin are rescored
+    assert counts["written"] > 0 and counts["skipped"] > 0
+
+    monkeypatch.setattr(hsi_tiles, "score_raster", original_score_raster)
+    generate_tiles(store, tmp_path / "full", [SPECIES], ["max", 1], 0, 3)
+    assert tile_files(tmp_path / "tiles") == tile_files(tmp_path / "full")
+
+def test_changed_bounds_across_the_antimeridian(tmp_path, monkeypatch):
+    layers = global_layers()
+    store = write_environment_store(tmp_path / "store", layers, BOUNDS)
+    generate_tiles(store, tmp_path / "tiles", [SPECIES], ["max"], 0, 2)
+
+    store.layer("eddy_strength")[20:24, 70:72] += 0.8  # Cells of lat -10..-30, lon 170..180
+    store.layer("eddy_strength")[20:24, 0:2] += 0.8    # and lon -180..-170 (5° cells)
+    store.layer("eddy_strength").flush()
+    blocks = []
+    original_score_raster = hsi_tiles.score_raster
+
+    def recording_score_raster(*args, block=None, **kwargs):
+        blocks.append(block)
+        return original_score_raster(*args, block=block, **kwargs)
+    monkeypatch.setattr(hsi_tiles, "score_raster", recording_score_raster)
+    generate_tiles(store, tmp_path / "tiles", [SPECIES], ["max"], 0, 2, (-30.0, -10.0, 170.0, -170.0))
+    assert blocks == [(19, 69, 7, 3), (19, 0, 7, 4)]  # The east and west edges, each with the margin
+
+    monkeypatch.setattr(hsi_tiles, "score_raster", original_score_raster)
+    generate_tiles(store, tmp_path / "full", [SPECIES], ["max"], 0, 2)
+    assert tile_files(tmp_path / "tiles") == tile_files(tmp_path / "full")
+
+def test_color_indices_without_preferences():
+    assert np.array_equal(color_indices(np.zeros((2, 2)), 0.0), np.ones((2, 2), dtype=np.uint8))
@@ -0,0 +1,112 @@
+import numpy as np
+import pytest
+
+from prediction_cache import LRUCache, PredictionService
+from Predictor import (
+    GridConfig,
+    calculate_multi_species_hsi,
+    compile_profile_table,
+    generate_simulated_environment,
+    get_profile_table,
+    get_shark_profiles,
+    predict_all_species,
+    predict_next_location,
+    score_multi_species_column_max,
+    set_profile_table,
+)
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+QUERIES = [("Tiger shark", 20.0, 30.0, 0), ("Bull shark", 20.0, 30.0, 1), ("Great white shark", -33.9, 18.4, 2)]
+
+def test_single_and_batch_queries_fill_identical_entries(small_grid):
+    single = PredictionService(seed=3, grid=small_grid)
+    batch = PredictionService(seed=3, grid=small_grid)
+    assert [single.predict(*query) for query in QUERIES] == batch.predict_many(QUERIES)
+    # Whichever method filled an entry, the other one serves the same record from it
+    assert single.predict_many(QUERIES) == [batch.predict(*query) for query in QUERIES]
+    assert single.cache.hits == batch.cache.hits == len(QUERIES)
+
+def test_batch_scores_match_single_species_predictions(small_grid):
+    environment = generate_simulated_environment(small_grid.size, small_grid.depth_layers, rng=4)
+    names = list(get_profile_table().names)
+    everyone = predict_all_species(environment, names, small_grid)
+    for name in names:
+        alone = predict_all_species(environment, [name], small_grid)[name]
+        migration_delta, optimal_depth, max_sector_score, best_direction, current_scores = (
+            predict_next_location(name, environment, small_grid))
+        # The batch is one matrix product, so values agree up to floating-point rounding
+        assert np.isclose(alone["max_sector_score"], max_sector_score)
+        assert np.isclose(everyone[name]["max_sector_score"], max_sector_score)
+        assert alone["best_direction"] == everyone[name]["best_direction"] == best_direction
+        assert alone["optimal_depth"] == everyone[name]["optimal_depth"] == optimal_depth
+        assert np.allclose(everyone[name]["current_scores"], current_scores)
+
+def test_batched_column_max_streams_over_depth():
+    grid = GridConfig(size=9, depth_layers=7)
+    environment = generate_simulated_environment(grid.size, grid.depth_layers, rng=6)
+    names = list(get_profile_table().names)[:5]
+    volume = calculate_multi_species_hsi(names, environment)
+    best_scores, best_layers = score_multi_species_column_max(names, environment, chunk_layers=3)
+    assert np.allclose(best_scores, volume.max(axis=3))
+    assert np.array_equal(best_layers, volume.argmax(axis=3))
+    for name, prediction in predict_all_species(environment, names, grid).items():
+        migration_delta, optimal_depth, max_sector_score, best_direction, current_scores = (
+            predict_next_location(name, environment, grid))
+        assert prediction["best_direction"] == best_direction and prediction["optimal_depth"] == optimal_depth
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now the least recently used
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.stats()["evictions"] == 1 and len(cache) == 2
+
+def test_ttl_expires_entries():
+    clock = FakeClock()
+    cache = LRUCache(max_entries=4, ttl=10.0, clock=clock)
+    cache.put("a", 1)
+    clock.now = 10.0
+    assert cache.get("a") == 1
+    clock.now = 10.5
+    assert cache.get("a", "missing") == "missing"
+    assert cache.stats()["expirations"] == 1 and len(cache) == 0
+
+@pytest.mark.parametrize("options", [{"max_entries": 0}, {"ttl": 0}, {"ttl": -1.0}])
+def test_invalid_cache_options(options):
+    with pytest.raises(ValueError):
+        LRUCache(**options)
+
+def test_queries_in_one_cell_share_an_entry(small_grid):
+    service = PredictionService(seed=3, grid=small_grid)
+    first = service.predict("Tiger shark", 20.01, 30.01, 0)
+    second = service.predict("Tiger shark", 20.02, 30.02, 0)  # Same cell, exact position kept in the record
+    assert service.cache.stats()["hits"] == 1
+    assert (second["lat"], second["lon"]) == (20.02, 30.02)
+    assert (second["direction"], second["sector_hsi"]) == (first["direction"], first["sector_hsi"])
+
+def test_environment_refresh_invalidates(small_grid):
+    service = PredictionService(seed=3, grid=small_grid)
+    key = service.cache_key("Tiger shark", 20.0, 30.0, 0)
+    before = service.predict("Tiger shark", 20.0, 30.0, 0)
+    assert service.refresh_environment(seed=4) == 1
+    assert len(service.cache) == 0 and service.cache_key("Tiger shark", 20.0, 30.0, 0) != key
+    assert service.predict("Tiger shark", 20.0, 30.0, 0) != before
+
+def test_profile_reload_invalidates(small_grid, restore_profiles):
+    service = PredictionService(seed=3, grid=small_grid)
+    before = service.predict("Tiger shark", 20.0, 30.0, 0)
+    profiles = {name: dict(profile) for name, profile in get_shark_profiles().items()}
+    profiles["Tiger shark"]["preferences"] = {**profiles["Tiger shark"]["preferences"], "is_coastal": 0.1}
+    set_profile_table(compile_profile_table(profiles), profiles)
+    after = service.predict("Tiger shark", 20.0, 30.0, 0)
+    assert service.cache.stats()["misses"] == 2
+    assert after["max_hsi"] != before["max_hsi"]
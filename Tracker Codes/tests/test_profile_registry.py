@@ -0,0 +1,82 @@
+import json
+import os
+
+import pytest
+
+import Predictor
+from Predictor import get_profile_table, get_shark_profiles
+from profile_registry import ProfileRegistry, read_profiles, tracker_profiles_array
+
+def write_json(path, data):
+    with open(path, "w", encoding="utf-8") as handle:
+        json.dump(data, handle)
+    stat = os.stat(path)  # Make every write visible to the fingerprint, however coarse the clock
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+@pytest.fixture
+def profiles_file(tmp_path, restore_profiles):
+    path = tmp_path / "profiles.json"
+    write_json(path, get_shark_profiles())
+    return path
+
+def test_load_installs_a_new_table_version(profiles_file):
+    previous = get_profile_table().version
+    registry = ProfileRegistry([profiles_file])
+    table = registry.load()
+    assert get_profile_table() is table and table.version > previous
+    assert registry.stats()["loads"] == 1 and registry.stats()["species"] == len(table.names)
+
+def test_bad_file_keeps_the_old_table(profiles_file):
+    registry = ProfileRegistry([profiles_file])
+    table = registry.load()
+    with open(profiles_file, "w", encoding="utf-8") as handle:
+        handle.write("{ not json")
+    assert registry.changed()
+    assert registry.reload_if_changed() is False
+    assert get_profile_table() is table
+    assert registry.failures == 1 and "invalid JSON" in registry.last_error
+    assert not registry.changed()  # The bad version is not retried until it changes again
+
+    profiles = get_shark_profiles()
+    broken = {**profiles, "Tiger shark": {**profiles["Tiger shark"], "preferences": {"is_coastal": 2.0}}}
+    write_json(profiles_file, broken)
+    with pytest.raises(ValueError):
+        registry.load()
+    assert get_profile_table() is table and registry.failures == 2
+
+def test_reload_if_changed(profiles_file):
+    registry = ProfileRegistry([profiles_file])
+    first = registry.load()
+    assert registry.reload_if_changed() is False  # Nothing changed
+
+    profiles = get_shark_profiles()
+    profiles = {name: profile for name, profile in profiles.items() if name != "Bull shark"}
+    write_json(profiles_file, profiles)
+    assert registry.reload_if_changed() is True
+    table = get_profile_table()
+    assert table.version > first.version and "Bull shark" not in table.index
+    assert registry.last_error is None and registry.loads == 2
+
+def test_later_files_override_earlier_ones(tmp_path, profiles_file):
+    overrides = tmp_path / "profiles.d"
+    overrides.mkdir()
+    tiger = {**get_shark_profiles()["Tiger shark"], "description": "Regional override."}
+    write_json(overrides / "tiger.json", {"Tiger shark": tiger})
+    profiles, files = read_profiles([profiles_file, overrides])
+    assert files[-1].endswith("tiger.json")
+    assert profiles["Tiger shark"]["description"] == "Regional override."
+    assert len(profiles) == len(get_shark_profiles())
+
+def test_duplicate_tracker_ids_are_rejected(profiles_file):
+    profiles = get_shark_profiles()
+    bull = profiles["Bull shark"]
+    write_json(profiles_file, {**profiles, "Bull shark": {**bull, "tracker": {**bull["tracker"], "id": "S39"}}})
+    with pytest.raises(ValueError, match="S39"):
+        ProfileRegistry([profiles_file]).load()
+
+def test_tracker_array_matches_firmware():
+    firmware = os.path.join(os.path.dirname(Predictor.__file__), "Tracker001", "Tracker001.ino")
+    with open(firmware, encoding="utf-8") as handle:
+        source = handle.read().replace("\r\n", "\n")
+    for line in tracker_profiles_array(get_shark_profiles()).splitlines()[1:-1]:
+        assert line.rstrip(",") in source
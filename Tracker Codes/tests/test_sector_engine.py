@@ -0,0 +1,24 @@
+import numpy as np
+
+from Predictor import DEFAULT_GRID, SectorEngine, compass_sectors
+
+def random_field(seed):
+    return np.random.default_rng(seed).random((DEFAULT_GRID.size, DEFAULT_GRID.size)) * 3.0
+
+def test_rectangle_means_match_np_mean():
+    for seed in range(20):
+        field = random_field(seed)
+        engine = SectorEngine(field)
+        for r_slice, c_slice in DEFAULT_GRID.sectors.values():
+            # Summed-area sums round differently from np.mean, by a few ulps
+            assert np.isclose(engine.rectangle_mean(r_slice, c_slice), np.mean(field[r_slice, c_slice]),
+                              rtol=0, atol=1e-14)
+        assert np.isclose(engine.rectangle_sum(slice(3, 7), slice(0, 20)), field[3:7].sum())
+
+def test_wedge_means_match_their_masks():
+    field = random_field(1)
+    engine = SectorEngine(field)
+    for wedge in compass_sectors(8):
+        mask = engine.wedge_mask(wedge)
+        assert engine.wedge_count(wedge) == mask.sum()
+        assert np.isclose(engine.wedge_mean(wedge), field[mask].mean())
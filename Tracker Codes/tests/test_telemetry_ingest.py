@@ -0,0 +1,40 @@
+import asyncio
+
+from prediction_cache import PredictionService
+from telemetry_ingest import TelemetryIngester, parse_payload
+
+DRAIN_TIMEOUT = 10.0  # A stopped ingester never drains; fail instead of hanging
+
+def make_fix(shark_id="S39", lat=20.0, lon=30.0):
+    return parse_payload({"shark_id": shark_id, "latitude": lat, "longitude": lon, "depth": 5.0})
+
+def test_unexpected_scoring_failure_drops_only_that_fix(small_grid):
+    service = PredictionService(seed=1, grid=small_grid)
+    predict_many = service.predict_many
+
+    def flaky_predict_many(queries):
+        if any(lat == -45.0 for _, lat, _, _ in queries):
+            raise KeyError("corrupt environment cell")
+        return predict_many(queries)
+    service.predict_many = flaky_predict_many
+
+    published = []
+
+    async def scenario():
+        ingester = TelemetryIngester(service, on_record=lambda record: published.append(record["shark_id"]))
+        task = asyncio.create_task(ingester.run())
+        try:
+            for fix in (make_fix("S39"), make_fix("S01", lat=-45.0), make_fix("S02")):
+                await ingester.put(fix)
+            await asyncio.wait_for(ingester.drain(), DRAIN_TIMEOUT)
+            await ingester.put(make_fix("S03"))  # The ingester keeps running after the failure
+            await asyncio.wait_for(ingester.drain(), DRAIN_TIMEOUT)
+        finally:
+            task.cancel()
+        return ingester
+
+    ingester = asyncio.run(scenario())
+    assert ingester.invalid == 1
+    assert ingester.scored == 3
+    assert set(ingester.latest) == {"S39", "S02", "S03"}
+    assert sorted(published) == ["S02", "S03", "S39"]  # Isolating the bad fix publishes no record twice
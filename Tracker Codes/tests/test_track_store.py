@@ -0,0 +1,73 @@
+import numpy as np
+
+from environment_store import GlobalEnvironment
+from Predictor import (
+    DEFAULT_DEPTH_BINS,
+    calculate_species_hsi_volume,
+    compile_profile_table,
+    generate_simulated_environment,
+    get_shark_profiles,
+    set_profile_table,
+)
+from track_store import TrackStore, habitat_scores
+
+SPECIES = ["Tiger shark", "Bull shark", "Shortfin mako shark"]
+
+def filled_store(rows=300, chunk_rows=64):
+    rng = np.random.default_rng(0)
+    store = TrackStore(chunk_rows=chunk_rows)
+    store.append_columns(
+        timestamp=np.arange(rows, dtype=float),
+        lat=rng.uniform(-5, 5, rows),
+        lon=rng.uniform(-5, 5, rows),
+        depth_m=rng.uniform(0, 300, rows),
+        tag=rng.integers(1, 43, rows),
+        species=np.array(SPECIES)[rng.integers(0, len(SPECIES), rows)],
+    )
+    return store
+
+def install_reordered_profiles(drop=None):
+    """Installs the profiles in reverse order (optionally without `drop`), as a reload could."""
+    profiles = {name: profile for name, profile in reversed(get_shark_profiles().items()) if name != drop}
+    return set_profile_table(compile_profile_table(profiles), profiles)
+
+def test_species_survive_profile_reload(restore_profiles):
+    store = filled_store()
+    before = {name: store.query(species=name)["timestamp"] for name in SPECIES}
+    install_reordered_profiles(drop="Bull shark")
+    for name in ("Tiger shark", "Shortfin mako shark"):
+        assert np.array_equal(store.query(species=name)["timestamp"], before[name])
+    store.append(1e6, 0.0, 0.0, 5.0, 39, "Tiger shark")
+    assert store.query(species="Tiger shark")["timestamp"][-1] == 1e6
+
+def test_save_and_load_under_another_table(tmp_path, restore_profiles):
+    store = filled_store()
+    store.save(tmp_path)
+    install_reordered_profiles()
+    loaded = TrackStore.load(tmp_path)
+    assert len(loaded) == len(store)
+    for name in SPECIES:
+        assert np.array_equal(loaded.query(species=name)["lat"], store.query(species=name)["lat"])
+
+def test_habitat_scores_follow_the_current_table(restore_profiles):
+    store = filled_store()
+    environment = generate_simulated_environment(36, 3, rng=1)
+    global_environment = GlobalEnvironment(environment, (-9, 9, -9, 9))
+    install_reordered_profiles()
+    fixes = store.query()
+    scores = habitat_scores(fixes, global_environment, store.species_names)
+    rows, cols = global_environment.cell_indices(fixes["lat"], fixes["lon"])
+    for i in range(0, len(scores), 17):
+        layer = np.searchsorted([top for top, _ in DEFAULT_DEPTH_BINS], fixes["depth_m"][i], side="right") - 1
+        cell = {name: layer_values[rows[i]:rows[i] + 1, cols[i]:cols[i] + 1] for name, layer_values in environment.items()}
+        name = store.species_names[fixes["species"][i]]
+        assert scores[i] == calculate_species_hsi_volume(name, cell)[0, 0, layer]
+
+def test_bounds_ending_at_the_antimeridian():
+    store = TrackStore(chunk_rows=4)  # Two sealed chunks plus an open one
+    lons = np.linspace(175.0, 175.7, 8).tolist() + [180.0]
+    store.append_columns(np.arange(9.0), np.full(9, 5.0), lons, np.zeros(9), np.full(9, 39), ["Tiger shark"] * 9)
+    assert len(store.query(bounds=(0, 10, 170, 179.9))["lat"]) == 8
+    assert len(store.query(bounds=(0, 10, 170, 180))["lat"]) == 9
+    assert len(store.query(bounds=(-90, 90, -180, 180))["lat"]) == 9
+    assert len(store.query(bounds=(0, 10, 179, -179))["lat"]) == 1  # Across the antimeridian
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from environment_store import GlobalEnvironment
+from Predictor import GridConfig, generate_simulated_environment, make_depth_bins
+from trajectory import simulate_trajectory
+
+SPECIES = "Basking shark"  # Heads several ways from the start below, across the antimeridian
+
+def simulated_raster(rows, cols, depth_bins=None, seed=5):
+    depth_layers = 3 if depth_bins is None else len(depth_bins)
+    tiles = [generate_simulated_environment(rows, depth_layers, rng=seed + i, depth_bins=depth_bins)
+             for i in range(cols // rows)]
+    return {name: np.concatenate([tile[name] for tile in tiles], axis=1) for name in tiles[0]}
+
+@pytest.fixture(scope="module")
+def global_raster():
+    """A 360° raster of 3° cells, so windows wrap across the antimeridian."""
+    return GlobalEnvironment(simulated_raster(60, 120), (-90, 90, -180, 180))
+
+@pytest.mark.parametrize("sectors", [None, 8])
+@pytest.mark.parametrize("step_degrees", [3.0, 7.5, 40.0])
+def test_incremental_matches_full_rescore(global_raster, sectors, step_degrees):
+    grid = GridConfig(12, 3, 36.0)
+    start = (10.0, 170.0)  # Next to the antimeridian
+    incremental = simulate_trajectory(SPECIES, *start, global_raster, steps=30, step_degrees=step_degrees,
+                                      grid=grid, sectors=sectors)
+    full = simulate_trajectory(SPECIES, *start, global_raster, steps=30, step_degrees=step_degrees,
+                               grid=grid, sectors=sectors, incremental=False)
+    assert incremental["path"] == full["path"]
+    assert len({record["direction"] for record in full["path"]} - {None}) > 1
+    assert full["cells_scored"] == len(full["path"]) * grid.size * grid.size
+    if step_degrees < grid.degree_span:
+        assert incremental["cells_scored"] < full["cells_scored"]
+
+def test_incremental_matches_full_rescore_on_regional_binned_raster():
+    depth_bins = make_depth_bins(200, 40)
+    regional = GlobalEnvironment(simulated_raster(40, 80, depth_bins), (-20, 20, 0, 80), depth_bins)
+    grid = GridConfig(10, len(depth_bins), 10.0)
+    incremental = simulate_trajectory("Tiger shark", 0.0, 40.0, regional, steps=60, step_degrees=2.5, grid=grid)
+    full = simulate_trajectory("Tiger shark", 0.0, 40.0, regional, steps=60, step_degrees=2.5, grid=grid,
+                               incremental=False)
+    assert incremental["path"] == full["path"]
+    assert len(full["path"]) < 61  # The shark leaves the regional raster
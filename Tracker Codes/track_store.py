@@ -0,0 +1,344 @@
+"""
+Compact columnar store for historical tracker fixes.
+
+Months of 5-second fixes do not fit as Python dicts. TrackStore keeps every fix as one row of
+fixed-width NumPy columns (36 bytes per fix):
+
+    timestamp  float64  seconds since the epoch
+    lat, lon   float32  degrees (~1 m precision)
+    depth_m    float32  meters below the surface
+    accel_x/y/z float32  accelerometer reading (m/s^2, NaN when the fix has none)
+    tag        uint16   tracker number (S39 -> 39)
+    species    uint16   code of the species in the store's own species dictionary
+
+Species codes are assigned by the store in order of first appearance and saved with the columns,
+so they stay valid when a profile reload (profile_registry.py) adds, removes or reorders the
+species of the compiled profile table.
+
+Rows are appended into preallocated chunks of DEFAULT_CHUNK_ROWS. A full chunk is sealed: its
+arrays are trimmed and a spatial bucket index is built on the predictor's degree grid (buckets
+of LOCAL_GRID_DEGREE_SPAN degrees by default), along with the chunk's time range. A query for
+"species X in this 2° window this month" visits only the chunks overlapping the time range and,
+inside them, only the rows of the few buckets overlapping the window.
+
+Query results are dicts of column arrays, so they go straight into the vectorized predictor
+functions (map_lat_lon_to_grid, habitat_scores below) without building per-fix objects.
+
+Usage:
+    store = TrackStore()
+    ingester = TelemetryIngester(service, on_record=store.append_record)
+    ...
+    fixes = store.query(species="Tiger shark", bounds=(18, 20, 30, 32), start=t0, end=t1)
+    scores = habitat_scores(fixes, global_environment, store.species_names)
+"""
+import json
+import math
+import os
+import time
+
+import numpy as np
+
+from environment_store import DEFAULT_DEPTH_BINS, GlobalEnvironment
+from Predictor import HSI_FACTORS, LOCAL_GRID_DEGREE_SPAN, get_profile_table
+
+# Column name -> fixed-width dtype, in storage order
+TRACK_COLUMNS = {
+    "timestamp": np.float64,
+    "lat": np.float32,
+    "lon": np.float32,
+    "depth_m": np.float32,
+    "accel_x": np.float32,
+    "accel_y": np.float32,
+    "accel_z": np.float32,
+    "tag": np.uint16,
+    "species": np.uint16,
+}
+DEFAULT_CHUNK_ROWS = 1 << 16
+TRACK_STORE_VERSION = 1
+TRACK_METADATA_FILE = "tracks.json"
+
+def tag_number(shark_id):
+    """Tracker number of a tracker ID ("S39" -> 39)."""
+    try:
+        return int(str(shark_id).strip().upper().lstrip("S"))
+    except ValueError:
+        raise ValueError(f"Invalid tracker shark_id '{shark_id}'.") from None
+
+def _empty_columns(rows):
+    return {name: np.empty(rows, dtype=dtype) for name, dtype in TRACK_COLUMNS.items()}
+
+# --- CHUNKS ---
+
+class _TrackChunk:
+    """A block of rows. Open chunks are appended to; sealed chunks are trimmed and indexed."""
+
+    def __init__(self, capacity):
+        self.columns = _empty_columns(capacity)
+        self.capacity = capacity
+        self.size = 0
+        self.sealed = False
+
+    def append_columns(self, columns, start, count):
+        """Copies rows start..start+count of `columns` into the chunk."""
+        for name in TRACK_COLUMNS:
+            self.columns[name][self.size:self.size + count] = columns[name][start:start + count]
+        self.size += count
+
+    def seal(self, bucket_index):
+        """Trims the arrays to the rows used and builds the time range and the bucket index."""
+        self.columns = {name: column[:self.size].copy() for name, column in self.columns.items()}
+        self.sealed = True
+        timestamps = self.columns["timestamp"]
+        self.time_range = (timestamps.min(), timestamps.max()) if self.size else (math.inf, -math.inf)
+        keys = bucket_index.keys(self.columns["lat"], self.columns["lon"])
+        # Rows sorted by bucket; bucket k's rows are order[starts[k]:starts[k + 1]]
+        self.order = np.argsort(keys, kind="stable")
+        self.bucket_keys, self.bucket_starts = np.unique(keys[self.order], return_index=True)
+        self.bucket_starts = np.append(self.bucket_starts, self.size)
+
+    def candidate_rows(self, keys):
+        """Rows of a sealed chunk that fall in any of the bucket `keys` (sorted)."""
+        positions = np.searchsorted(self.bucket_keys, keys)
+        found = positions < len(self.bucket_keys)
+        positions, keys = positions[found], keys[found]
+        positions = positions[self.bucket_keys[positions] == keys]
+        if positions.size == 0:
+            return np.empty(0, dtype=np.intp)
+        return np.concatenate([self.order[self.bucket_starts[p]:self.bucket_starts[p + 1]] for p in positions])
+
+class _BucketIndex:
+    """Square buckets of `degrees` on a side, numbered row-major from (-90°, -180°)."""
+
+    def __init__(self, degrees):
+        self.degrees = degrees
+        self.lat_buckets = math.ceil(180.0 / degrees)
+        self.lon_buckets = math.ceil(360.0 / degrees)
+
+    def keys(self, lat, lon):
+        lat_bucket = np.clip(((np.asarray(lat, dtype=float) + 90.0) // self.degrees).astype(np.int64), 0, self.lat_buckets - 1)
+        lon_bucket = ((np.asarray(lon, dtype=float) + 180.0) // self.degrees).astype(np.int64) % self.lon_buckets
+        return lat_bucket * self.lon_buckets + lon_bucket
+
+    def keys_in(self, bounds):
+        """Sorted keys of every bucket overlapping bounds = (lat_min, lat_max, lon_min, lon_max)."""
+        lat_min, lat_max, lon_min, lon_max = bounds
+        first_lat, last_lat = self.keys([lat_min, lat_max], [0.0, 0.0]) // self.lon_buckets
+        first_lon, last_lon = self.keys([0.0, 0.0], [lon_min, lon_max]) % self.lon_buckets
+        lat_buckets = np.arange(first_lat, last_lat + 1)
+        if lon_min <= lon_max:
+            # Unwrapped, so an east edge at 180° is the last bucket rather than bucket 0
+            first_lon, last_lon = np.clip(np.floor((np.array([lon_min, lon_max]) + 180.0) / self.degrees).astype(np.int64),
+                                          0, self.lon_buckets - 1)
+            lon_buckets = np.arange(first_lon, last_lon + 1)
+            if lon_max >= 180.0:
+                lon_buckets = np.append(lon_buckets, 0)  # Fixes at exactly 180° are stored in bucket 0 (-180°)
+        else:  # The window crosses the antimeridian
+            lon_buckets = np.concatenate((np.arange(first_lon, self.lon_buckets), np.arange(0, last_lon + 1)))
+        return np.unique((lat_buckets[:, None] * self.lon_buckets + lon_buckets[None, :]).ravel())
+
+# --- TRACK STORE ---
+
+class TrackStore:
+    """An append-optimized columnar store of tracker fixes with a time and spatial-bucket index."""
+
+    def __init__(self, chunk_rows=DEFAULT_CHUNK_ROWS, bucket_degrees=LOCAL_GRID_DEGREE_SPAN):
+        if chunk_rows < 1:
+            raise ValueError(f"chunk_rows must be at least 1, got {chunk_rows}.")
+        if not 0 < bucket_degrees <= 180:
+            raise ValueError(f"bucket_degrees must be between 0 and 180, got {bucket_degrees}.")
+        self.chunk_rows = chunk_rows
+        self.bucket_index = _BucketIndex(bucket_degrees)
+        self._chunks = [_TrackChunk(chunk_rows)]
+        self.species_names = []  # Species code -> profile name
+        self._species_codes = {}  # Profile name -> species code
+
+    def species_code(self, name):
+        """Code of species `name` in this store, assigned on first use. Raises KeyError for an unknown species."""
+        code = self._species_codes.get(name)
+        if code is None:
+            get_profile_table().species_index(name)  # Only species the predictor knows are stored
+            if len(self.species_names) > np.iinfo(np.uint16).max:
+                raise ValueError(f"Track store holds more than {np.iinfo(np.uint16).max + 1} species.")
+            code = self._species_codes[name] = len(self.species_names)
+            self.species_names.append(name)
+        return code
+
+    def _species_codes_of(self, species):
+        """Store codes of `species`, given as profile names or rows of the current profile table."""
+        species = np.asarray(species)
+        if species.dtype.kind in "US":
+            names, inverse = np.unique(species, return_inverse=True)
+        else:
+            rows, inverse = np.unique(species, return_inverse=True)
+            table = get_profile_table()
+            names = [table.names[table.species_index(row)] for row in rows.tolist()]
+        codes = np.array([self.species_code(str(name)) for name in names], dtype=np.uint16)
+        return codes[inverse.reshape(species.shape)]
+
+    def __len__(self):
+        return sum(chunk.size for chunk in self._chunks)
+
+    @property
+    def nbytes(self):
+        """Bytes held by the column arrays (including the unused tail of the open chunk)."""
+        return sum(column.nbytes for chunk in self._chunks for column in chunk.columns.values())
+
+    def append_columns(self, timestamp, lat, lon, depth_m, tag, species, accel_x=None, accel_y=None, accel_z=None):
+        """
+        Appends many fixes at once from equal-length arrays. `species` holds profile names or
+        rows of the current profile table; missing accelerometer columns are stored as NaN.
+        """
+        self._append(timestamp, lat, lon, depth_m, tag, self._species_codes_of(species), accel_x, accel_y, accel_z)
+
+    def _append(self, timestamp, lat, lon, depth_m, tag, species, accel_x=None, accel_y=None, accel_z=None):
+        """Appends fixes whose `species` column already holds this store's species codes."""
+        lat = np.asarray(lat, dtype=np.float32)
+        count = lat.shape[0]
+        columns = {
+            "timestamp": np.broadcast_to(np.asarray(timestamp, dtype=np.float64), (count,)),
+            "lat": lat,
+            "lon": np.asarray(lon, dtype=np.float32),
+            "depth_m": np.asarray(depth_m, dtype=np.float32),
+            "accel_x": np.full(count, np.nan, np.float32) if accel_x is None else np.asarray(accel_x, dtype=np.float32),
+            "accel_y": np.full(count, np.nan, np.float32) if accel_y is None else np.asarray(accel_y, dtype=np.float32),
+            "accel_z": np.full(count, np.nan, np.float32) if accel_z is None else np.asarray(accel_z, dtype=np.float32),
+            "tag": np.broadcast_to(np.asarray(tag, dtype=np.uint16), (count,)),
+            "species": np.broadcast_to(np.asarray(species, dtype=np.uint16), (count,)),
+        }
+        for name, column in columns.items():
+            if column.shape != (count,):
+                raise ValueError(f"Column {name} has shape {column.shape}, expected ({count},).")
+
+        start = 0
+        while start < count:
+            chunk = self._chunks[-1]
+            taken = min(count - start, chunk.capacity - chunk.size)
+            chunk.append_columns(columns, start, taken)
+            start += taken
+            if chunk.size == chunk.capacity:
+                chunk.seal(self.bucket_index)
+                self._chunks.append(_TrackChunk(self.chunk_rows))
+
+    def append(self, timestamp, lat, lon, depth_m, tag, species, accel=(np.nan, np.nan, np.nan)):
+        """Appends a single fix."""
+        code = self.species_code(species) if isinstance(species, str) else self._species_codes_of([species])[0]
+        self._append([timestamp], [lat], [lon], [depth_m], [tag], [code], [accel[0]], [accel[1]], [accel[2]])
+
+    def append_record(self, record):
+        """Appends a scored telemetry record (usable as TelemetryIngester's `on_record`)."""
+        self.append(record.get("received_at", time.time()), record["lat"], record["lon"],
+                    record.get("depth_m", 0.0), tag_number(record["shark_id"]), record["species"])
+
+    def query(self, species=None, tag=None, bounds=None, start=None, end=None):
+        """
+        Returns the fixes matching every given filter as a dict of column arrays, in append
+        order. `bounds` = (lat_min, lat_max, lon_min, lon_max), with lon_min > lon_max for a
+        window crossing the antimeridian; `start`/`end` are inclusive timestamps. The species
+        column holds store codes; `species_names` maps them back to names.
+        """
+        species_code = None if species is None else self._species_codes.get(species)
+        if species is not None and species_code is None:
+            get_profile_table().species_index(species)  # Unknown species -> KeyError
+            return {name: column[:0] for name, column in _empty_columns(0).items()}  # Known, but never stored
+        bucket_keys = None if bounds is None else self.bucket_index.keys_in(bounds)
+        parts = []
+        for chunk in self._chunks:
+            if chunk.size == 0:
+                continue
+            if chunk.sealed:
+                low, high = chunk.time_range
+                if (start is not None and high < start) or (end is not None and low > end):
+                    continue
+                rows = np.sort(chunk.candidate_rows(bucket_keys)) if bucket_keys is not None else np.arange(chunk.size)
+            else:
+                rows = np.arange(chunk.size)  # The open chunk is scanned
+            if rows.size == 0:
+                continue
+
+            columns = chunk.columns
+            mask = np.ones(rows.size, dtype=bool)
+            if species_code is not None:
+                mask &= columns["species"][rows] == species_code
+            if tag is not None:
+                mask &= columns["tag"][rows] == tag
+            if start is not None:
+                mask &= columns["timestamp"][rows] >= start
+            if end is not None:
+                mask &= columns["timestamp"][rows] <= end
+            if bounds is not None:
+                lat, lon = columns["lat"][rows], columns["lon"][rows]
+                lat_min, lat_max, lon_min, lon_max = bounds
+                mask &= (lat >= lat_min) & (lat <= lat_max)
+                if lon_min <= lon_max:
+                    mask &= (lon >= lon_min) & (lon <= lon_max)
+                else:
+                    mask &= (lon >= lon_min) | (lon <= lon_max)
+            rows = rows[mask]
+            if rows.size:
+                parts.append({name: column[rows] for name, column in columns.items()})
+
+        if not parts:
+            return {name: column[:0] for name, column in _empty_columns(0).items()}
+        return {name: np.concatenate([part[name] for part in parts]) for name in TRACK_COLUMNS}
+
+    # --- PERSISTENCE ---
+
+    def save(self, path):
+        """Writes every column as one .npy file plus a small JSON header."""
+        os.makedirs(path, exist_ok=True)
+        for name in TRACK_COLUMNS:
+            np.save(os.path.join(path, f"{name}.npy"),
+                    np.concatenate([chunk.columns[name][:chunk.size] for chunk in self._chunks]))
+        metadata = {
+            "format_version": TRACK_STORE_VERSION,
+            "rows": len(self),
+            "chunk_rows": self.chunk_rows,
+            "bucket_degrees": self.bucket_index.degrees,
+            "species": list(self.species_names),
+        }
+        with open(os.path.join(path, TRACK_METADATA_FILE), "w", encoding="utf-8") as handle:
+            json.dump(metadata, handle, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        """Reads a store written by save() and rebuilds its chunks and index."""
+        with open(os.path.join(path, TRACK_METADATA_FILE), encoding="utf-8") as handle:
+            metadata = json.load(handle)
+        if metadata.get("format_version") != TRACK_STORE_VERSION:
+            raise ValueError(f"Unsupported track store version {metadata.get('format_version')} in {path}.")
+        store = cls(metadata["chunk_rows"], metadata["bucket_degrees"])
+        store.species_names = list(metadata["species"])
+        store._species_codes = {name: code for code, name in enumerate(store.species_names)}
+        columns = {name: np.load(os.path.join(path, f"{name}.npy")) for name in TRACK_COLUMNS}
+        store._append(**columns)
+        return store
+
+# --- SCORING ---
+
+def habitat_scores(fixes, global_environment, species_names, depth_bins=None):
+    """
+    HSI of every fix in a query result: each fix's own species scored on the environment cell
+    and depth layer it was recorded in, as one vectorized gather over all fixes. `species_names`
+    is the store's species dictionary (TrackStore.species_names) the species codes refer to.
+    """
+    if not isinstance(global_environment, GlobalEnvironment):
+        raise ValueError("habitat_scores needs a GlobalEnvironment or EnvironmentStore.")
+    depth_bins = depth_bins or global_environment.depth_bins or DEFAULT_DEPTH_BINS
+    rows, cols = global_environment.cell_indices(fixes["lat"], fixes["lon"])
+    tops = np.array([top for top, _ in depth_bins], dtype=float)
+    layers = np.clip(np.searchsorted(tops, fixes["depth_m"], side="right") - 1, 0, len(depth_bins) - 1)
+
+    table = get_profile_table()
+    codes = fixes["species"].astype(np.intp)
+    rows_of_codes = np.zeros(len(species_names), dtype=np.intp)
+    for code in np.unique(codes).tolist():
+        rows_of_codes[code] = table.species_index(species_names[code])  # KeyError if no longer profiled
+    species = rows_of_codes[codes]
+    depth_weights = table.depth_weights_for(len(depth_bins), depth_bins)[species, layers]
+    factor_weights = table.factor_weights[species]
+
+    # Same order as score_hsi_volume: depth preference first, then each factor in turn
+    scores = depth_weights * 1.0
+    for k, (layer_name, _) in enumerate(HSI_FACTORS):
+        scores = scores + factor_weights[:, k] * global_environment.layer(layer_name)[rows, cols, layers]
+    return scores
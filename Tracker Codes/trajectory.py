@@ -0,0 +1,171 @@
+"""
+Multi-step migration trajectory simulator.
+
+Chains migration predictions over many short steps (e.g., weekly steps for a year) across a
+GlobalEnvironment or EnvironmentStore. At every step the shark heads for the best sector of the
+local grid around it, moves `step_degrees` that way, and the grid follows it.
+
+Consecutive windows overlap almost entirely, so the per-column best scores (and best depths)
+of the previous window are shifted and reused; only the strip of cells newly exposed by the
+move is scored. A full rescore happens only when a step jumps further than the grid width.
+
+Usage:
+    from environment_store import open_environment_store
+    from trajectory import simulate_trajectory
+
+    store = open_environment_store("region_store")
+    result = simulate_trajectory("Tiger shark", 20.0, 30.0, store, steps=52)
+"""
+import numpy as np
+
+from Predictor import (
+    DEFAULT_GRID,
+    MIGRATION_DELTAS,
+    MIGRATION_DISTANCE,
+    SectorEngine,
+    compass_angular_resolution,
+    compass_sectors,
+    heading_migration_delta,
+    normalize_lat_lon,
+    score_column_max,
+)
+
+# A 15° migration spread over the 26 weeks of the original 6-month prediction
+WEEKLY_STEP_DEGREES = MIGRATION_DISTANCE / 26
+
+def score_columns(shark_type, environment, depth_bins=None):
+    """Best HSI of every water column and the depth layer it occurs at, as two (rows, cols) arrays."""
+    return score_column_max(shark_type, environment, depth_bins=depth_bins)
+
+class _ColumnScoreWindow:
+    """The column scores of the local grid at one window origin, shifted incrementally as it moves."""
+
+    def __init__(self, shark_type, global_environment, grid):
+        self.shark_type = shark_type
+        self.global_environment = global_environment
+        self.grid = grid
+        self.origin = None
+        self.max_scores = None
+        self.best_depths = None
+        self.cells_scored = 0
+
+    def _score_block(self, row0, col0, row_count, col_count):
+        self.cells_scored += row_count * col_count
+        block = self.global_environment.region(row0, col0, row_count, col_count)
+        return score_columns(self.shark_type, block, self.grid.depth_bins)
+
+    def _column_shift(self, new_col0):
+        """Column offset from the current origin, taken the short way round a 360° raster."""
+        shift = new_col0 - self.origin[1]
+        if self.global_environment.wraps_longitude:
+            cols = self.global_environment.shape[1]
+            shift = (shift + cols // 2) % cols - cols // 2
+        return shift
+
+    def move_to(self, origin, incremental=True):
+        """Updates the column scores for a window starting at raster cell `origin` = (row0, col0)."""
+        size = self.grid.size
+        row0, col0 = origin
+        if self.origin is None or not incremental:
+            dr = dc = size  # Nothing to reuse
+        else:
+            dr = row0 - self.origin[0]
+            dc = self._column_shift(col0)
+
+        if abs(dr) >= size or abs(dc) >= size:
+            self.max_scores, self.best_depths = self._score_block(row0, col0, size, size)
+            self.origin = origin
+            return
+
+        # Copy the overlap of the old and new windows into place (new index = old index - shift)
+        max_scores = np.empty_like(self.max_scores)
+        best_depths = np.empty_like(self.best_depths)
+        new_rows = slice(max(0, -dr), size - max(0, dr))
+        new_cols = slice(max(0, -dc), size - max(0, dc))
+        old_rows = slice(new_rows.start + dr, new_rows.stop + dr)
+        old_cols = slice(new_cols.start + dc, new_cols.stop + dc)
+        max_scores[new_rows, new_cols] = self.max_scores[old_rows, old_cols]
+        best_depths[new_rows, new_cols] = self.best_depths[old_rows, old_cols]
+
+        # Score the newly exposed strips: full-width rows, then the columns of the remaining rows
+        exposed_rows = slice(size - dr, size) if dr > 0 else slice(0, -dr)
+        if dr:
+            block = self._score_block(row0 + exposed_rows.start, col0, abs(dr), size)
+            max_scores[exposed_rows, :], best_depths[exposed_rows, :] = block
+        if dc:
+            exposed_cols = slice(size - dc, size) if dc > 0 else slice(0, -dc)
+            block = self._score_block(row0 + new_rows.start, col0 + exposed_cols.start,
+                                      new_rows.stop - new_rows.start, abs(dc))
+            max_scores[new_rows, exposed_cols], best_depths[new_rows, exposed_cols] = block
+
+        self.max_scores, self.best_depths = max_scores, best_depths
+        self.origin = origin
+
+def simulate_trajectory(shark_type, start_lat, start_lon, global_environment, steps=52,
+                        step_degrees=WEEKLY_STEP_DEGREES, grid=DEFAULT_GRID, sectors=None, incremental=True):
+    """
+    Simulates `steps` migration steps of `step_degrees` each from (start_lat, start_lon).
+    `sectors` chooses the heading resolution as in predict_next_location (None = N/S/E/W halves,
+    an integer = that many compass wedges). Set `incremental=False` to rescore the full window
+    every step (same result, for comparison).
+    Returns {"path": [...], "cells_scored": int}; each path entry holds the step number, position,
+    the shark's column HSI and best depth there, and the heading chosen from it (None on the last).
+    On a regional raster the path ends early if the shark leaves the covered region.
+    """
+    global_environment.check_grid(grid)
+    grid = global_environment.grid_for(grid)
+    wedges = None
+    engine_options = {}
+    if isinstance(sectors, int):
+        engine_options["angular_resolution"] = compass_angular_resolution(sectors)
+    if sectors is not None:
+        wedges = compass_sectors(sectors) if isinstance(sectors, int) else list(sectors)
+        wedges_by_name = {wedge.name: wedge for wedge in wedges}
+
+    window = _ColumnScoreWindow(shark_type, global_environment, grid)
+    lat, lon = start_lat, start_lon
+    path = []
+    for step in range(steps + 1):
+        try:
+            origin = global_environment.window_origin(lat, lon, grid)
+        except ValueError:
+            break  # The shark left the region covered by a regional raster
+        window.move_to(origin, incremental)
+
+        # The shark's own cell in the window (the center, unless the window was shifted at an edge)
+        row, col = global_environment.cell_index(lat, lon)
+        local_row = row - origin[0]
+        local_col = (col - origin[1]) % global_environment.shape[1] if global_environment.wraps_longitude else col - origin[1]
+        record = {
+            "step": step,
+            "lat": float(lat),
+            "lon": float(lon),
+            "hsi": float(window.max_scores[local_row, local_col]),
+            "depth": int(window.best_depths[local_row, local_col]),
+            "direction": None,
+            "sector_hsi": None,
+        }
+        path.append(record)
+        if step == steps:
+            break
+
+        # Pick the best sector of the current window and take one step towards it
+        engine = SectorEngine(window.max_scores, **engine_options)
+        if wedges is None:
+            averages = {
+                direction: engine.rectangle_mean(r_slice, c_slice)
+                for direction, (r_slice, c_slice) in grid.sectors.items()
+            }
+        else:
+            averages = {name: average for name, average in engine.sector_means(wedges).items() if not np.isnan(average)}
+        direction = max(averages, key=averages.get)
+        if wedges is None:
+            lat_delta, lon_delta = (delta * step_degrees / MIGRATION_DISTANCE for delta in MIGRATION_DELTAS[direction])
+        else:
+            lat_delta, lon_delta = heading_migration_delta(wedges_by_name[direction].heading, step_degrees)
+        record["direction"] = direction
+        record["sector_hsi"] = float(averages[direction])
+
+        lat, lon = normalize_lat_lon(lat + lat_delta, lon + lon_delta)
+
+    return {"path": path, "cells_scored": window.cells_scored}